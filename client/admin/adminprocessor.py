@@ -169,6 +169,23 @@ class timekprAdminClient(object):
                 else:
                     # log error
                     log.consoleOut(message)
+        # this gets timing statistics of server work phases
+        elif adminCmd == "--perfstats":
+            # check param len
+            if paramLen != paramIdx + 1:
+                # fail
+                adminCmdIncorrect = True
+            else:
+                # get stats
+                result, message, spanStats = self._timekprAdminConnector.getTimekprPerformanceStatistics()
+
+                # process
+                if result == 0:
+                    # process
+                    self.printPerformanceStatistics(spanStats)
+                else:
+                    # log error
+                    log.consoleOut(message)
         # this sets allowed days for the user
         elif adminCmd == "--setalloweddays":
             # check param len
@@ -344,6 +361,10 @@ class timekprAdminClient(object):
                 if rCmd not in cmds:
                     log.consoleOut(" ", rCmd, rCmdDesc, "\n")
 
+            # print server admin commands
+            for rCmd, rCmdDesc in cons.TK_ADMIN_COMMANDS.items():
+                log.consoleOut(" ", rCmd, rCmdDesc, "\n")
+
     # --------------- parameter execution methods --------------- #
 
     def printUserList(self, pUserList):
@@ -354,6 +375,17 @@ class timekprAdminClient(object):
         for rUser in pUserList:
             log.consoleOut(rUser[0])
 
+    def printPerformanceStatistics(self, pSpanStats):
+        """Format and print timing statistics of server work phases"""
+        # header
+        log.consoleOut("%-40s %8s %10s %10s %10s %10s" % ("PHASE", "COUNT", "P50 (ms)", "P95 (ms)", "P99 (ms)", "MAX (ms)"))
+        # loop and print (phases first, then phases per user)
+        for rName in sorted(pSpanStats, key=lambda rName: ("[" in rName, rName)):
+            # stats
+            cnt, p50, p95, p99, pmax = pSpanStats[rName]
+            # print
+            log.consoleOut("%-40s %8i %10.1f %10.1f %10.1f %10.1f" % (rName, cnt, p50 * 1000, p95 * 1000, p99 * 1000, pmax * 1000))
+
     def printUserConfig(self, pUserName, pPrintUserConfig):
         """Format and print user config"""
         # print to console
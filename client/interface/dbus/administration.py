@@ -50,11 +50,9 @@ class timekprAdminConnector(object):
         if self._timekprObject is None:
             try:
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # timekpr connection stuff
-                self._timekprObject = self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pPrintToConsole=True, pDbusIFName=cons.TK_DBUS_BUS_NAME)
+                with misc.measureDBUSTime(cons.TK_DBUS_BUS_NAME):
+                    # timekpr connection stuff
+                    self._timekprObject = self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH)
             except Exception:
                 self._timekprObject = None
                 # logging
@@ -64,11 +62,9 @@ class timekprAdminConnector(object):
         if self._timekprObject is not None and self._timekprUserAdminDbusInterface is None:
             try:
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # getting interface
-                self._timekprUserAdminDbusInterface = dbus.Interface(self._timekprObject, cons.TK_DBUS_USER_ADMIN_INTERFACE)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pPrintToConsole=True, pDbusIFName=cons.TK_DBUS_USER_ADMIN_INTERFACE)
+                with misc.measureDBUSTime(cons.TK_DBUS_USER_ADMIN_INTERFACE):
+                    # getting interface
+                    self._timekprUserAdminDbusInterface = dbus.Interface(self._timekprObject, cons.TK_DBUS_USER_ADMIN_INTERFACE)
             except Exception:
                 self._timekprUserAdminDbusInterface = None
                 # logging
@@ -78,11 +74,9 @@ class timekprAdminConnector(object):
         if self._timekprObject is not None and self._timekprAdminDbusInterface is None:
             try:
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # getting interface
-                self._timekprAdminDbusInterface = dbus.Interface(self._timekprObject, cons.TK_DBUS_ADMIN_INTERFACE)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pPrintToConsole=True, pDbusIFName=cons.TK_DBUS_ADMIN_INTERFACE)
+                with misc.measureDBUSTime(cons.TK_DBUS_ADMIN_INTERFACE):
+                    # getting interface
+                    self._timekprAdminDbusInterface = dbus.Interface(self._timekprObject, cons.TK_DBUS_ADMIN_INTERFACE)
             except Exception:
                 self._timekprAdminDbusInterface = None
                 # logging
@@ -96,10 +90,15 @@ class timekprAdminConnector(object):
 
                 # if either of this fails, we keep trying to connect
                 GLib.timeout_add_seconds(3, self.initTimekprConnection, pTryOnce)
+                # statistics are reported when connection attempts are over
+                return
             else:
                 # failed
                 self._initFailed = True
 
+        # report slow DBUS calls (if any) once connection succeeded or finally failed
+        misc.logDBUSTimeStatistics(pPrintToConsole=True, pSlowOnly=True)
+
     # --------------- helper methods --------------- #
 
     def isConnected(self):
@@ -592,6 +591,31 @@ class timekprAdminConnector(object):
         # result
         return result, message, timekprConfig
 
+    def getTimekprPerformanceStatistics(self):
+        """Get timing statistics of work phases from server"""
+        # defaults
+        result, message = self.initReturnCodes(pInit=True, pCall=False)
+        spanStats = {}
+
+        # if we have end-point
+        if self._timekprAdminDbusInterface is not None:
+            # defaults
+            result, message = self.initReturnCodes(pInit=False, pCall=True)
+
+            # notify through dbus
+            try:
+                # call dbus method
+                result, message, spanStats = self._timekprAdminDbusInterface.getTimekprPerformanceStatistics()
+            except Exception as ex:
+                # exception
+                result, message = self.formatException(str(ex), __name__, self.getTimekprPerformanceStatistics.__name__)
+
+                # we cannot send notif through dbus, we need to reschedule connecton
+                self.initTimekprConnection(False, True)
+
+        # result
+        return result, message, spanStats
+
     def setTimekprLogLevel(self, pLogLevel):
         """Set the logging level for server"""
         # initial values
@@ -87,6 +87,8 @@ class timekprClient(object):
     def finishTimekpr(self, signal=None, frame=None):
         """Exit timekpr gracefully"""
         log.log(cons.TK_LOG_LEVEL_INFO, "Finishing up")
+        # DBUS performance
+        misc.logDBUSTimeStatistics()
         # exit main loop
         self._mainLoop.quit()
         log.log(cons.TK_LOG_LEVEL_INFO, "Finished")
@@ -123,69 +125,65 @@ class timekprClient(object):
 
         try:
             # dbus performance measurement
-            misc.measureDBUSTimeElapsed(pStart=True)
-
-            # get dbus object
-            self._notificationFromDBUS = self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS)
-
-            # connect to signal
-            self._sessionAttributeVerificationSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveSessionAttributeVerificationRequest,
-                dbus_interface   = cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE,
-                signal_name      = "sessionAttributeVerification")
-
-            # connect to signal
-            self._timeLeftSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeLeft,
-                dbus_interface   = cons.TK_DBUS_USER_LIMITS_INTERFACE,
-                signal_name      = "timeLeft")
-
-            # connect to signal
-            self._timeLimitsSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeLimits,
-                dbus_interface   = cons.TK_DBUS_USER_LIMITS_INTERFACE,
-                signal_name      = "timeLimits")
-
-            # connect to signal
-            self._timeLeftNotificatonSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeLeftNotification,
-                dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
-                signal_name      = "timeLeftNotification")
-
-            # connect to signal
-            self._timeCriticalNotificatonSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeCriticalNotification,
-                dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
-                signal_name      = "timeCriticalNotification")
-
-            # connect to signal
-            self._timeNoLimitNotificationSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeNoLimitNotification,
-                dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
-                signal_name      = "timeNoLimitNotification")
-
-            # connect to signal
-            self._timeLeftChangedNotificationSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeLeftChangedNotification,
-                dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
-                signal_name      = "timeLeftChangedNotification")
-
-            # connect to signal
-            self._timeConfigurationChangedNotificationSignal = self._timekprBus.add_signal_receiver(
-                path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
-                handler_function = self.receiveTimeConfigurationChangedNotification,
-                dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
-                signal_name      = "timeConfigurationChangedNotification")
-
-            # measurement logging
-            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_BUS_NAME)
+            with misc.measureDBUSTime(cons.TK_DBUS_BUS_NAME):
+                # get dbus object
+                self._notificationFromDBUS = self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS)
+
+                # connect to signal
+                self._sessionAttributeVerificationSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveSessionAttributeVerificationRequest,
+                    dbus_interface   = cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE,
+                    signal_name      = "sessionAttributeVerification")
+
+                # connect to signal
+                self._timeLeftSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeLeft,
+                    dbus_interface   = cons.TK_DBUS_USER_LIMITS_INTERFACE,
+                    signal_name      = "timeLeft")
+
+                # connect to signal
+                self._timeLimitsSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeLimits,
+                    dbus_interface   = cons.TK_DBUS_USER_LIMITS_INTERFACE,
+                    signal_name      = "timeLimits")
+
+                # connect to signal
+                self._timeLeftNotificatonSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeLeftNotification,
+                    dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
+                    signal_name      = "timeLeftNotification")
+
+                # connect to signal
+                self._timeCriticalNotificatonSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeCriticalNotification,
+                    dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
+                    signal_name      = "timeCriticalNotification")
+
+                # connect to signal
+                self._timeNoLimitNotificationSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeNoLimitNotification,
+                    dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
+                    signal_name      = "timeNoLimitNotification")
+
+                # connect to signal
+                self._timeLeftChangedNotificationSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeLeftChangedNotification,
+                    dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
+                    signal_name      = "timeLeftChangedNotification")
+
+                # connect to signal
+                self._timeConfigurationChangedNotificationSignal = self._timekprBus.add_signal_receiver(
+                    path             = cons.TK_DBUS_USER_NOTIF_PATH_PREFIX + self._userNameDBUS,
+                    handler_function = self.receiveTimeConfigurationChangedNotification,
+                    dbus_interface   = cons.TK_DBUS_USER_NOTIF_INTERFACE,
+                    signal_name      = "timeConfigurationChangedNotification")
 
             # set status
             self._timekprClientIndicator.setStatus(msg.getTranslation("TK_MSG_STATUS_CONNECTED"))
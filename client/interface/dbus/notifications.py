@@ -99,11 +99,9 @@ class timekprNotifications(object):
                 # go through all possible interfaces
                 try:
                     # dbus performance measurement
-                    misc.measureDBUSTimeElapsed(pStart=True)
-                    # getting interface
-                    self._dbusConnections[self.CL_CONN_NOTIF][self.CL_IF] = dbus.Interface(self._userSessionBus.get_object(iNames[idx], iPaths[idx]), iNames[idx])
-                    # measurement logging
-                    misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=iNames[idx])
+                    with misc.measureDBUSTime(iNames[idx]):
+                        # getting interface
+                        self._dbusConnections[self.CL_CONN_NOTIF][self.CL_IF] = dbus.Interface(self._userSessionBus.get_object(iNames[idx], iPaths[idx]), iNames[idx])
 
                     # first sucess is enough
                     log.log(cons.TK_LOG_LEVEL_DEBUG, "CONNECTED to DBUS %s interface" % (self.CL_CONN_NOTIF))
@@ -199,15 +197,13 @@ class timekprNotifications(object):
                 # go through all possible interfaces
                 try:
                     # dbus performance measurement
-                    misc.measureDBUSTimeElapsed(pStart=True)
-                    # getting interface
-                    self._dbusConnections[self.CL_CONN_SCR][self.CL_IF] = dbus.Interface(self._userSessionBus.get_object(iNames[idx], iPaths[idx]), iNames[idx])
-                    # log
-                    log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to screensaver service through \"%s\"" % (iNames[idx]))
-                    # verification (Gnome has not implemented freedesktop methods, we need to verify this actually works)
-                    self._dbusConnections[self.CL_CONN_SCR][self.CL_IF].GetActive()
-                    # measurement logging
-                    misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=iNames[idx])
+                    with misc.measureDBUSTime(iNames[idx]):
+                        # getting interface
+                        self._dbusConnections[self.CL_CONN_SCR][self.CL_IF] = dbus.Interface(self._userSessionBus.get_object(iNames[idx], iPaths[idx]), iNames[idx])
+                        # log
+                        log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to screensaver service through \"%s\"" % (iNames[idx]))
+                        # verification (Gnome has not implemented freedesktop methods, we need to verify this actually works)
+                        self._dbusConnections[self.CL_CONN_SCR][self.CL_IF].GetActive()
                     # first sucess is enough
                     chosenIdx = idx
                     # finish
@@ -235,21 +231,19 @@ class timekprNotifications(object):
         if self._dbusConnections[self.CL_CONN_TK][self.CL_IF] is None and self._dbusConnections[self.CL_CONN_TK][self.CL_CNT] > 0 and not self._dbusConnections[self.CL_CONN_TK][self.CL_DEL] > 0:
             try:
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # getting interface
-                self._dbusConnections[self.CL_CONN_TK][self.CL_IF] = dbus.Interface(self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH), cons.TK_DBUS_USER_LIMITS_INTERFACE)
-                # log
-                log.log(cons.TK_LOG_LEVEL_DEBUG, "CONNECTED to %s DBUS %s interface" % (self.CL_CONN_TK, self.CL_IF))
-                # log
-                log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to timekpr limits service through \"%s\"" % (cons.TK_DBUS_USER_LIMITS_INTERFACE))
-                # getting interface
-                self._dbusConnections[self.CL_CONN_TK][self.CL_IFA] = dbus.Interface(self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH), cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE)
-                # log
-                log.log(cons.TK_LOG_LEVEL_DEBUG, "CONNECTED to %s DBUS %s interface" % (self.CL_CONN_TK, self.CL_IFA))
-                # log
-                log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to timekpr session attributes service through \"%s\"" % (cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE))
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_USER_LIMITS_INTERFACE)
+                with misc.measureDBUSTime(cons.TK_DBUS_USER_LIMITS_INTERFACE):
+                    # getting interface
+                    self._dbusConnections[self.CL_CONN_TK][self.CL_IF] = dbus.Interface(self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH), cons.TK_DBUS_USER_LIMITS_INTERFACE)
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_DEBUG, "CONNECTED to %s DBUS %s interface" % (self.CL_CONN_TK, self.CL_IF))
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to timekpr limits service through \"%s\"" % (cons.TK_DBUS_USER_LIMITS_INTERFACE))
+                    # getting interface
+                    self._dbusConnections[self.CL_CONN_TK][self.CL_IFA] = dbus.Interface(self._timekprBus.get_object(cons.TK_DBUS_BUS_NAME, cons.TK_DBUS_SERVER_PATH), cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE)
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_DEBUG, "CONNECTED to %s DBUS %s interface" % (self.CL_CONN_TK, self.CL_IFA))
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_INFO, "INFO: connected to timekpr session attributes service through \"%s\"" % (cons.TK_DBUS_USER_SESSION_ATTRIBUTE_INTERFACE))
             except Exception as dbusEx:
                 # reset
                 self._dbusConnections[self.CL_CONN_TK][self.CL_IF] = None
@@ -18,6 +18,7 @@ from datetime import datetime
 TK_VERSION = "0.5.8"
 TK_DEV_ACTIVE = False  # change this accordingly when running in DEV or PROD
 TK_DEV_BUS = "ses"  # this sets up which bus to use for development (sys or ses)
+TK_DEV_L1_BUS = "sys"  # this sets up which bus to look for login1 on in development (sys or ses, ses works only with stand-in login1, e.g. benchmarks)
 TK_DEV_SUPPORT_PAGE = "https://tinyurl.com/yc9x85v2"
 
 # formats
@@ -143,6 +144,12 @@ TK_SCR_XDGCD_OVERRIDE = [
 
 # DBUS performance measurement
 TK_DBUS_ANSWER_TIME = 3
+TK_DBUS_HIST_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 3)  # upper bounds of DBUS call latency histogram buckets in seconds (the last bucket is for everything above)
+
+# worker tick measurement
+TK_TICK_HIST_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 3)  # upper bounds of histogram buckets in seconds (the last bucket is for everything above)
+TK_TICK_STATS_CNT = 100  # how many ticks pass before tick statistics are logged
+TK_SPAN_STATS_CNT = 1000  # how many recent durations of every phase are kept for statistics
 
 # user and their restriction constants
 TK_CTRL_UID = "UID"      # user id
@@ -166,12 +173,22 @@ TK_CTRL_RES_K = "kill"
 TK_CTRL_RES_D = "shutdown"
 # wake up RTC file
 TK_CTRL_WKUPF = "/sys/class/rtc/rtc0/wakealarm"
+# where processes are inspected
+TK_PROC_ROOT = "/proc"
+# cgroup v2 (unified hierarchy) controllers file (exists only if cgroup v2 is mounted)
+TK_CGROUP_CONTROLLERS = "/sys/fs/cgroup/cgroup.controllers"
+# systemd cgroup of all users (exists only if systemd manages user sessions)
+TK_CGROUP_USER_SLICE_ROOT = "/sys/fs/cgroup/user.slice"
+# systemd cgroup of the user (contains all processes of user sessions and user manager)
+TK_CGROUP_USER_SLICE = TK_CGROUP_USER_SLICE_ROOT + "/user-%s.slice"
 
 # session properties
 TK_CTRL_DBUS_SESS_OBJ = "SESSION_OBJECT"
 TK_CTRL_DBUS_SESS_IF = "SESSION_INTERFACE"
 TK_CTRL_DBUS_SESS_PROP_IF = "SESSION_PROPERTIES_INTERFACE"
 TK_CTRL_DBUS_SESS_PROP = "SESSION_STATIC_PROPERTIES"
+TK_CTRL_DBUS_SESS_DPROP = "SESSION_DYNAMIC_PROPERTIES"
+TK_CTRL_DBUS_SESS_SIG = "SESSION_SIGNAL_MATCH"
 
 # limit configuration
 TK_CTRL_NDAY = "NEXTDAY"     # next day idx
@@ -182,6 +199,9 @@ TK_CTRL_LEFT = "LEFT"        # time left idx (continously)
 TK_CTRL_LEFTW = "LEFTW"      # time left for week
 TK_CTRL_LEFTM = "LEFTM"      # time left for month
 TK_CTRL_LCHECK = "LCHK"      # last checked idx
+TK_CTRL_LCHECKM = "LCHKM"    # last checked idx (monotonic clock)
+TK_CTRL_LCHECKB = "LCHKB"    # last checked idx (boot time clock, includes time computer was asleep)
+TK_CTRL_SPENTR = "SPENTR"    # time spent remainder (fractions of a second carried over to next check)
 TK_CTRL_LSAVE = "LSAVE"      # last saved idx
 TK_CTRL_LMOD = "LMOD"        # file modification idx (control)
 TK_CTRL_LCMOD = "LMCOD"      # file modification idx (config)
@@ -260,6 +280,28 @@ TK_PLAYTIME_ENABLED = False
 TK_PLAYTIME_ALLOWED_WEEKDAYS = "1;2;3;4;5;6;7"
 # how much PlayTime is allowed per allowed days
 TK_PLAYTIME_LIMITS_PER_WEEKDAYS = "0;0;0;0;0;0;0"
+# default value for tracking processes by kernel process events (PlayTime)
+TK_PLAYTIME_PROCESS_EVENTS_ENABLED = False
+# how often (in seconds) all processes are re-scanned when process events are used (safety net for missed events)
+TK_PLAYTIME_PROCESS_EVENTS_RESYNC_INTERVAL = 300
+# how many match results (executable / command line) are remembered per user (PlayTime)
+TK_PLAYTIME_MATCH_CACHE_SIZE = 1024
+# default value for caching processes of tracked users only, i.e. logged in users who have PlayTime activities set up (PlayTime)
+TK_PLAYTIME_TRACKED_USERS_ONLY = False
+# how long (in seconds) PlayTime processes are given to finish after terminate signal before they are killed
+TK_PLAYTIME_TERMINATE_GRACE_PERIOD = 9
+# default value for scanning PlayTime processes in background thread
+TK_PLAYTIME_BACKGROUND_SCAN_ENABLED = False
+# min interval (in seconds) between PlayTime process scans (0 - scan on every check)
+TK_PLAYTIME_SCAN_INTERVAL_MIN = 0
+# max interval (in seconds) between PlayTime process scans when nothing is at risk (same as min - adaptive scanning is disabled)
+TK_PLAYTIME_SCAN_INTERVAL_MAX = 0
+# upper bound for PlayTime process scan intervals (PlayTime is accounted by scans, so they must not be too rare)
+TK_PLAYTIME_SCAN_INTERVAL_LIMIT = 60
+# PlayTime left (in seconds) when user is near the limit and processes are scanned as often as possible
+TK_PLAYTIME_SCAN_NEAR_LIMIT = 300
+# load average per CPU when machine is considered heavily loaded and PlayTime processes are scanned less often
+TK_PLAYTIME_SCAN_HIGH_LOAD = 1.0
 
 # ## default values for control ##
 # time control
@@ -267,6 +309,12 @@ TK_PLAYTIME_LIMITS_PER_WEEKDAYS = "0;0;0;0;0;0;0"
 TK_POLLTIME = 3
 # flush interval
 TK_SAVE_INTERVAL = 30
+# how often (in seconds) backup of config file is made when it's saved (0 - on every save)
+TK_CONFIG_BACKUP_INTERVAL = 3600
+# whether config files are synced to disk when saved
+TK_CONFIG_SYNC_ENABLED = False
+# how often (in seconds) user control file is saved when only last checked time changes (day change is saved always)
+TK_CONTROL_LAST_CHECKED_SAVE_INTERVAL = 3600
 # time left for putting user on kill list
 TK_TERMINATION_TIME = 15
 # time left for final warning time
@@ -277,6 +325,18 @@ TK_FINAL_NOTIFICATION_TIME = 60
 TK_TRACK_INACTIVE = False
 # default value for tracking inactive sessions
 TK_HIDE_TRAY_ICON = False
+# default value for tracking session state by login1 events
+TK_SESSION_EVENTS_ENABLED = False
+# how many checks pass before session state tracked by events is fully re-read from login1 (safety net for missed events)
+TK_SESSION_EVENTS_RESYNC_CNT = 20
+# how many users are checked in parallel (1 - one after another)
+TK_USER_WORKERS = 1
+# max users checked in parallel
+TK_USER_WORKERS_MAX = 16
+# max poll time when nothing is about to change for any user (same as poll time - adaptive polling is disabled)
+TK_POLLTIME_MAX = 3
+# upper bound for max poll time (activity is sampled once per check, so checks must not be too rare)
+TK_POLLTIME_MAX_LIMIT = 30
 
 # ## files ##
 # config
@@ -320,6 +380,7 @@ locale.textdomain("timekpr")
 
 # define admin commands
 TK_ADMIN_COMMANDS = {
+    "--perfstats"                           : "%s:\n    %s" % (msg.getTranslation("TK_MSG_ADMIN_CMD_PERFSTATS"), "timekpra --perfstats"),
     # "--setloglevel"             : ""
     # ,"--setpolltime"             : ""
     # ,"--setsavetime"             : ""
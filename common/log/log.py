@@ -7,6 +7,7 @@ Created on Aug 28, 2018
 # imports
 from datetime import datetime
 import os
+import threading
 
 # timekpr imports
 from timekpr.common.constants import constants as cons
@@ -19,6 +20,8 @@ _LOG_FILE = None
 _LOG_PEND_EVT_CNT = 0
 _LOG_PEND_FLUSH_CNT = 0
 _LOG_BUFFER = []
+# logging is done from several threads (buffer must not be changed while it's written)
+_LOG_LOCK = threading.Lock()
 
 # log names
 def _getLogFileName(pWho, pUserName):
@@ -31,12 +34,16 @@ def _getLogFileName(pWho, pUserName):
 
 def _output(pText):
     """Print to console and/or file"""
-    global _LOG_FILE, _LOG_PEND_EVT_CNT, _LOG_BUFFER
+    global _LOG_FILE, _LOG_PEND_EVT_CNT, _LOG_BUFFER, _LOG_LOCK
 
     # format text
     logText = "%s: %s" % (datetime.now().strftime(cons.TK_LOG_DATETIME_FORMAT), pText)
-    # prepare a line for file
-    _LOG_BUFFER.append("%s\n" % (logText))
+    # buffer is shared between threads
+    with _LOG_LOCK:
+        # add to pending event cnt
+        _LOG_PEND_EVT_CNT += 1
+        # prepare a line for file
+        _LOG_BUFFER.append("%s\n" % (logText))
 
     # in development mode, we spit out in console as well
     if cons.TK_DEV_ACTIVE:
@@ -87,11 +94,9 @@ def setLogLevel(pLvl):
 
 def log(pLvl, pText):
     """Print to console"""
-    global _LOG_LEVEL, _LOG_PEND_EVT_CNT
+    global _LOG_LEVEL
     # check debug level and output
     if pLvl <= _LOG_LEVEL:
-        # add to pending event cnt
-        _LOG_PEND_EVT_CNT += 1
         # redirect to output
         _output(pText)
 
@@ -112,21 +117,23 @@ def autoFlushLogFile():
 def flushLogFile():
     """This will flush the log file to file"""
     # iport globals
-    global _LOG_FILE, _LOG_BUFFER, _LOG_PEND_EVT_CNT, _LOG_PEND_FLUSH_CNT
-    # we can only flush if there is a file
-    if _LOG_FILE is not None and len(_LOG_BUFFER) > 0:
-        try:
-            # open log file
-            with open(_LOG_FILE, "a") as logFile:
-                # write whole buffer to log file
-                logFile.writelines(_LOG_BUFFER)
-                # reset
-                _LOG_PEND_EVT_CNT = 0
-                _LOG_PEND_FLUSH_CNT = 0
-                _LOG_BUFFER.clear()
-        except Exception as ex:
-            # spit out to console
-            consoleOut("ERROR, CAN NOT WRITE TO LOG DUE TO:\n%s" % (ex))
+    global _LOG_FILE, _LOG_BUFFER, _LOG_PEND_EVT_CNT, _LOG_PEND_FLUSH_CNT, _LOG_LOCK
+    # lines are not added while buffer is written and flushes do not interleave
+    with _LOG_LOCK:
+        # we can only flush if there is a file
+        if _LOG_FILE is not None and len(_LOG_BUFFER) > 0:
+            try:
+                # open log file
+                with open(_LOG_FILE, "a") as logFile:
+                    # write whole buffer to log file
+                    logFile.writelines(_LOG_BUFFER)
+                    # reset
+                    _LOG_PEND_EVT_CNT = 0
+                    _LOG_PEND_FLUSH_CNT = 0
+                    _LOG_BUFFER.clear()
+            except Exception as ex:
+                # spit out to console
+                consoleOut("ERROR, CAN NOT WRITE TO LOG DUE TO:\n%s" % (ex))
 
 
 def consoleOut(*args):
@@ -11,6 +11,7 @@ import re
 import os
 import shutil
 import getpass
+import tempfile
 
 # timekpr imports
 from timekpr.common.log import log
@@ -22,16 +23,37 @@ from timekpr.common.utils.misc import splitConfigValueNameParam as splitConfigVa
 # key pattern search
 RE_KEYFINDER = re.compile("^ *([A-Z]+[A-Z_]+[0-9]*) *=.*$")
 RE_ARRAYKEYFINDER = re.compile("^##([A-Z]+[A-Z_]+)##.*$")
+# how often (in seconds) config files are backed up when saved and whether they are synced to disk (server sets them from its config)
+_BACKUP_INTERVAL = cons.TK_CONFIG_BACKUP_INTERVAL
+_SYNC_ENABLED = cons.TK_CONFIG_SYNC_ENABLED
+
+
+def setConfigFileSaveOptions(pBackupInterval, pSyncEnabled):
+    """Set how config files are saved: how often (in seconds) backup is made and whether files are synced to disk"""
+    global _BACKUP_INTERVAL, _SYNC_ENABLED
+    # set
+    _BACKUP_INTERVAL = pBackupInterval
+    _SYNC_ENABLED = pSyncEnabled
 
 
 def _saveConfigFile(pConfigFile, pKeyValuePairs):
     """Save the config file using custom helper function"""
     global RE_KEYFINDER, RE_ARRAYKEYFINDER
     # edit control file (using alternate method because configparser looses comments in the process)
-    # make a backup of the file
-    shutil.copy(pConfigFile, pConfigFile + cons.TK_BACK_EXT)
-    # read backup and write actual config file
-    with open(pConfigFile + cons.TK_BACK_EXT, "r") as srcFile, open(pConfigFile, "w") as dstFile:
+    # files are replaced, not changed, so write the real file, not the link
+    configFile = os.path.realpath(pConfigFile)
+    # make a backup of the file (not on every save, file is never left half written anyway)
+    try:
+        # backup is too old
+        isBackupNeeded = _BACKUP_INTERVAL <= 0 or abs(datetime.now().timestamp() - os.path.getmtime(pConfigFile + cons.TK_BACK_EXT)) >= _BACKUP_INTERVAL
+    except OSError:
+        # there is no backup
+        isBackupNeeded = True
+    # backup
+    if isBackupNeeded:
+        shutil.copy(configFile, pConfigFile + cons.TK_BACK_EXT)
+    # read actual config file
+    with open(configFile, "r") as srcFile:
         # destination file
         dstLines = []
         # read line and do manipulations
@@ -73,8 +95,37 @@ def _saveConfigFile(pConfigFile, pKeyValuePairs):
                 # add line
                 dstLines.append(line)
 
-        # save config lines back to file
-        dstFile.writelines(dstLines)
+    # new file is written next to the actual one and replaces it at once (there is either old or new file, never a half written one)
+    tmpFd, tmpFile = tempfile.mkstemp(prefix=".%s." % (os.path.basename(configFile)), suffix=".tmp", dir=os.path.dirname(configFile))
+    try:
+        # write
+        with os.fdopen(tmpFd, "w") as dstFile:
+            # save config lines to file
+            dstFile.writelines(dstLines)
+            # make sure contents are on disk before file is replaced
+            if _SYNC_ENABLED:
+                dstFile.flush()
+                os.fsync(dstFile.fileno())
+        # the same permissions and owner as actual file
+        fileStat = os.stat(configFile)
+        os.chmod(tmpFile, fileStat.st_mode)
+        if os.geteuid() == 0:
+            os.chown(tmpFile, fileStat.st_uid, fileStat.st_gid)
+        # replace
+        os.replace(tmpFile, configFile)
+    except Exception:
+        # clean up
+        if os.path.isfile(tmpFile):
+            os.remove(tmpFile)
+        raise
+    # make sure rename is on disk as well
+    if _SYNC_ENABLED:
+        # sync directory
+        dirFd = os.open(os.path.dirname(configFile), os.O_RDONLY)
+        try:
+            os.fsync(dirFd)
+        finally:
+            os.close(dirFd)
 
 
 def _loadAndPrepareConfigFile(pConfigFileParser, pConfigFile, pLoadOnly=False):
@@ -197,9 +248,18 @@ class timekprConfig(object):
         param = "TIMEKPR_POLLTIME"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_POLLTIME, pCheckValue=None, pOverallSuccess=resultValue)
         # read
+        param = "TIMEKPR_POLLTIME_MAX"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_POLLTIME_MAX, pCheckValue=cons.TK_POLLTIME_MAX_LIMIT, pOverallSuccess=resultValue)
+        # read
         param = "TIMEKPR_SAVE_TIME"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_SAVE_INTERVAL, pCheckValue=None, pOverallSuccess=resultValue)
         # read
+        param = "TIMEKPR_CONFIG_BACKUP_INTERVAL"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_CONFIG_BACKUP_INTERVAL, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_CONFIG_SYNC_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_CONFIG_SYNC_ENABLED, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
         param = "TIMEKPR_TRACK_INACTIVE"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_TRACK_INACTIVE, pCheckValue=None, pOverallSuccess=resultValue)
         # read
@@ -211,6 +271,9 @@ class timekprConfig(object):
         # read
         param = "TIMEKPR_FINAL_NOTIFICATION_TIME"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_FINAL_NOTIFICATION_TIME, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_USER_WORKERS"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_USER_WORKERS, pCheckValue=cons.TK_USER_WORKERS_MAX, pOverallSuccess=resultValue)
 
         # session section
         section = "SESSION"
@@ -226,6 +289,9 @@ class timekprConfig(object):
         param = "TIMEKPR_USERS_EXCL"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.get, section, param, pDefaultValue=cons.TK_USERS_EXCL, pCheckValue=None, pOverallSuccess=resultValue)
         self._timekprConfig[param] = _cleanupValue(self._timekprConfig[param])
+        # read
+        param = "TIMEKPR_SESSION_EVENTS_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_SESSION_EVENTS_ENABLED, pCheckValue=None, pOverallSuccess=resultValue)
 
         # directory section (! in case directories are not correct, they are not overwritten with defaults !)
         section = "DIRECTORIES"
@@ -254,6 +320,24 @@ class timekprConfig(object):
         # read
         param = "TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_PLAYTIME_ENABLED, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_PLAYTIME_PROCESS_EVENTS_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_PLAYTIME_PROCESS_EVENTS_ENABLED, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_PLAYTIME_TRACKED_USERS_ONLY"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_PLAYTIME_TRACKED_USERS_ONLY, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_PLAYTIME_BACKGROUND_SCAN_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getboolean, section, param, pDefaultValue=cons.TK_PLAYTIME_BACKGROUND_SCAN_ENABLED, pCheckValue=None, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MIN"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_PLAYTIME_SCAN_INTERVAL_MIN, pCheckValue=cons.TK_PLAYTIME_SCAN_INTERVAL_LIMIT, pOverallSuccess=resultValue)
+        # read
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MAX"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(self._timekprConfigParser.getint, section, param, pDefaultValue=cons.TK_PLAYTIME_SCAN_INTERVAL_MAX, pCheckValue=cons.TK_PLAYTIME_SCAN_INTERVAL_LIMIT, pOverallSuccess=resultValue)
+
+        # all config files are saved as main config says
+        setConfigFileSaveOptions(self._timekprConfig["TIMEKPR_CONFIG_BACKUP_INTERVAL"], self._timekprConfig["TIMEKPR_CONFIG_SYNC_ENABLED"])
 
         # if we could not read some values, save what we could + defaults
         if not resultValue:
@@ -300,10 +384,23 @@ class timekprConfig(object):
         self._timekprConfigParser.set(section, "# this defines polling time (in memory) in seconds")
         self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_POLLTIME))
         # set up param
+        param = "TIMEKPR_POLLTIME_MAX"
+        self._timekprConfigParser.set(section, "# this defines max polling time in seconds, polling is done less often when nothing is about to change for any user,")
+        self._timekprConfigParser.set(section, "#   polling is done every polling time when this is not greater than polling time (max value is 30)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_POLLTIME_MAX))
+        # set up param
         param = "TIMEKPR_SAVE_TIME"
         self._timekprConfigParser.set(section, "# this defines a time for saving user time control file (polling and accounting is done in memory more often, but saving is not)")
         self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_SAVE_INTERVAL))
         # set up param
+        param = "TIMEKPR_CONFIG_BACKUP_INTERVAL"
+        self._timekprConfigParser.set(section, "# this defines how often in seconds a backup of config and time control files is made when they are saved (0 - on every save)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_CONFIG_BACKUP_INTERVAL))
+        # set up param
+        param = "TIMEKPR_CONFIG_SYNC_ENABLED"
+        self._timekprConfigParser.set(section, "# this defines whether config and time control files are synced to disk when saved (safer for SD cards and eMMC, but slower)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_CONFIG_SYNC_ENABLED))
+        # set up param
         param = "TIMEKPR_TRACK_INACTIVE"
         self._timekprConfigParser.set(section, "# this defines whether to account sessions which are inactive (locked screen, user switched away from desktop, etc.),")
         self._timekprConfigParser.set(section, "#   new users, when created, will inherit this value")
@@ -322,6 +419,11 @@ class timekprConfig(object):
         param = "TIMEKPR_FINAL_NOTIFICATION_TIME"
         self._timekprConfigParser.set(section, "# this defines a time interval prior to termination of user sessions when timekpr will send one final warning about time left")
         self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_FINAL_NOTIFICATION_TIME))
+        # set up param
+        param = "TIMEKPR_USER_WORKERS"
+        self._timekprConfigParser.set(section, "# this defines how many users are checked in parallel (1 - users are checked one after another),")
+        self._timekprConfigParser.set(section, "#   checking in parallel helps when there are many users and login manager or disk is slow to respond")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_USER_WORKERS))
 
         section = "SESSION"
         self._timekprConfigParser.add_section(section)
@@ -338,6 +440,10 @@ class timekprConfig(object):
         param = "TIMEKPR_USERS_EXCL"
         self._timekprConfigParser.set(section, "# users timekpr will ignore explicitly")
         self._timekprConfigParser.set(section, "%s" % (param), self._timekprConfig[param] if pReuseValues else cons.TK_USERS_EXCL)
+        # set up param
+        param = "TIMEKPR_SESSION_EVENTS_ENABLED"
+        self._timekprConfigParser.set(section, "# whether session state is tracked by login1 change events instead of querying every session on every check")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_SESSION_EVENTS_ENABLED))
 
         section = "DIRECTORIES"
         self._timekprConfigParser.add_section(section)
@@ -370,6 +476,27 @@ class timekprConfig(object):
         param = "TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"
         self._timekprConfigParser.set(section, "# whether PlayTime activity monitor will use process command line, including arguments, for monitoring processes (by default only uses the process name)")
         self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_ENABLED))
+        # set up param
+        param = "TIMEKPR_PLAYTIME_PROCESS_EVENTS_ENABLED"
+        self._timekprConfigParser.set(section, "# whether PlayTime activity monitor will learn about new, changed and finished processes from kernel process events instead of scanning all processes on every check")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_PROCESS_EVENTS_ENABLED))
+        # set up param
+        param = "TIMEKPR_PLAYTIME_TRACKED_USERS_ONLY"
+        self._timekprConfigParser.set(section, "# whether PlayTime activity monitor will inspect and cache only processes of logged in users who have PlayTime activities set up (by default all processes are cached)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_TRACKED_USERS_ONLY))
+        # set up param
+        param = "TIMEKPR_PLAYTIME_BACKGROUND_SCAN_ENABLED"
+        self._timekprConfigParser.set(section, "# whether PlayTime activity monitor will scan processes in background thread instead of at the start of every check (checks use the results of the latest scan)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_BACKGROUND_SCAN_ENABLED))
+        # set up param
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MIN"
+        self._timekprConfigParser.set(section, "# min interval in seconds between PlayTime process scans, they are this frequent when user is near PlayTime limit or PlayTime activities are running (0 - scan on every check)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_SCAN_INTERVAL_MIN))
+        # set up param
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MAX"
+        self._timekprConfigParser.set(section, "# max interval in seconds between PlayTime process scans, scans are done less often when noone is near PlayTime limit or machine is heavily loaded,")
+        self._timekprConfigParser.set(section, "#   scans are done every min interval when this is not greater than min interval (max value is 60)")
+        self._timekprConfigParser.set(section, "%s" % (param), str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_SCAN_INTERVAL_MAX))
 
         # save the file
         with open(self._configFile, "w") as fp:
@@ -392,9 +519,18 @@ class timekprConfig(object):
         # in-memory polling time
         param = "TIMEKPR_POLLTIME"
         values[param] = str(self._timekprConfig[param])
+        # max in-memory polling time
+        param = "TIMEKPR_POLLTIME_MAX"
+        values[param] = str(self._timekprConfig[param])
         # time interval to save user spent time
         param = "TIMEKPR_SAVE_TIME"
         values[param] = str(self._timekprConfig[param])
+        # how often backup of config files is made
+        param = "TIMEKPR_CONFIG_BACKUP_INTERVAL"
+        values[param] = str(self._timekprConfig[param])
+        # whether config files are synced to disk when saved
+        param = "TIMEKPR_CONFIG_SYNC_ENABLED"
+        values[param] = str(self._timekprConfig[param])
         # track inactive (default value)
         param = "TIMEKPR_TRACK_INACTIVE"
         values[param] = str(self._timekprConfig[param])
@@ -407,6 +543,9 @@ class timekprConfig(object):
         # final notification time (final warning before terminating session)
         param = "TIMEKPR_FINAL_NOTIFICATION_TIME"
         values[param] = str(self._timekprConfig[param])
+        # how many users are checked in parallel
+        param = "TIMEKPR_USER_WORKERS"
+        values[param] = str(self._timekprConfig[param])
         # which session types to control
         param = "TIMEKPR_SESSION_TYPES_CTRL"
         values[param] = str(self._timekprConfig[param])
@@ -416,12 +555,30 @@ class timekprConfig(object):
         # which users to exclude from time accounting
         param = "TIMEKPR_USERS_EXCL"
         values[param] = str(self._timekprConfig[param])
+        # whether session state is tracked by login1 events
+        param = "TIMEKPR_SESSION_EVENTS_ENABLED"
+        values[param] = str(self._timekprConfig[param])
         # whether PlayTime is enabled
         param = "TIMEKPR_PLAYTIME_ENABLED"
         values[param] = str(self._timekprConfig[param])
         # whether PlayTime enhanced activity monitor is enabled
         param = "TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"
         values[param] = str(self._timekprConfig[param])
+        # whether PlayTime processes are tracked by kernel process events
+        param = "TIMEKPR_PLAYTIME_PROCESS_EVENTS_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # whether only processes of tracked users are cached for PlayTime
+        param = "TIMEKPR_PLAYTIME_TRACKED_USERS_ONLY"
+        values[param] = str(self._timekprConfig[param])
+        # whether PlayTime processes are scanned in background
+        param = "TIMEKPR_PLAYTIME_BACKGROUND_SCAN_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # min interval between PlayTime process scans
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MIN"
+        values[param] = str(self._timekprConfig[param])
+        # max interval between PlayTime process scans
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MAX"
+        values[param] = str(self._timekprConfig[param])
         # ## pass placeholders for directories ##
         # config dir
         param = "TIMEKPR_CONFIG_DIR"
@@ -454,9 +611,18 @@ class timekprConfig(object):
             param = "TIMEKPR_POLLTIME"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
             # log
+            param = "TIMEKPR_POLLTIME_MAX"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
             param = "TIMEKPR_SAVE_TIME"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
             # log
+            param = "TIMEKPR_CONFIG_BACKUP_INTERVAL"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_CONFIG_SYNC_ENABLED"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
             param = "TIMEKPR_TRACK_INACTIVE"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
             # log
@@ -468,6 +634,9 @@ class timekprConfig(object):
             # log
             param = "TIMEKPR_FINAL_NOTIFICATION_TIME"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_USER_WORKERS"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
 
             # log
             param = "TIMEKPR_SESSION_TYPES_CTRL"
@@ -479,6 +648,9 @@ class timekprConfig(object):
             # log
             param = "TIMEKPR_USERS_EXCL"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_SESSION_EVENTS_ENABLED"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
 
             # log
             param = "TIMEKPR_PLAYTIME_ENABLED"
@@ -486,6 +658,21 @@ class timekprConfig(object):
             # log
             param = "TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"
             log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_PLAYTIME_PROCESS_EVENTS_ENABLED"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_PLAYTIME_TRACKED_USERS_ONLY"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_PLAYTIME_BACKGROUND_SCAN_ENABLED"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MIN"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
+            # log
+            param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MAX"
+            log.log(cons.TK_LOG_LEVEL_INFO, "  %s=%s" % (param, str(self._timekprConfig[param])))
         # fail
         except Exception:
             # log
@@ -512,6 +699,13 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprPollTimeMax(self):
+        """Get max polling time"""
+        # param
+        param = "TIMEKPR_POLLTIME_MAX"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprSaveTime(self):
         """Get save time"""
         # param
@@ -519,6 +713,20 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprConfigBackupInterval(self):
+        """Return how often backup of config files is made when they are saved"""
+        # param
+        param = "TIMEKPR_CONFIG_BACKUP_INTERVAL"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprConfigSyncEnabled(self):
+        """Return whether config files are synced to disk when saved"""
+        # param
+        param = "TIMEKPR_CONFIG_SYNC_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprTrackInactive(self):
         """Get tracking inactive"""
         # param
@@ -547,6 +755,13 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprUserWorkers(self):
+        """Get how many users are checked in parallel"""
+        # param
+        param = "TIMEKPR_USER_WORKERS"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprSessionsCtrl(self):
         """Get sessions to control"""
         # param
@@ -568,6 +783,13 @@ class timekprConfig(object):
         # result
         return [rVal.strip() for rVal in self._timekprConfig[param].split(";") if rVal != ""] if param in self._timekprConfig else []
 
+    def getTimekprSessionEventsEnabled(self):
+        """Get whether session state is tracked by login1 events"""
+        # param
+        param = "TIMEKPR_SESSION_EVENTS_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprConfigDir(self):
         """Get config dir"""
         # param
@@ -610,6 +832,41 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprPlayTimeProcessEventsEnabled(self):
+        """Return whether PlayTime processes are tracked by kernel process events"""
+        # param
+        param = "TIMEKPR_PLAYTIME_PROCESS_EVENTS_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeTrackedUsersOnly(self):
+        """Return whether only processes of tracked users are cached for PlayTime"""
+        # param
+        param = "TIMEKPR_PLAYTIME_TRACKED_USERS_ONLY"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeBackgroundScanEnabled(self):
+        """Return whether PlayTime processes are scanned in background"""
+        # param
+        param = "TIMEKPR_PLAYTIME_BACKGROUND_SCAN_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeScanIntervalMin(self):
+        """Return min interval between PlayTime process scans"""
+        # param
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MIN"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeScanIntervalMax(self):
+        """Return max interval between PlayTime process scans"""
+        # param
+        param = "TIMEKPR_PLAYTIME_SCAN_INTERVAL_MAX"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprLastModified(self):
         """Get last file modification time"""
         # result
@@ -1261,6 +1518,10 @@ class timekprUserControl(object):
         self._configFile = os.path.join(pDirectory, "%s.time" % (pUserName))
         self._userName = pUserName
         self._timekprUserControl = {}
+        # whether values were changed since they were loaded or saved
+        self._isModified = False
+        # last checked time which is stored in the file
+        self._savedLastChecked = None
 
         # parser
         self._timekprUserControlParser = configparser.ConfigParser(allow_no_value=True)
@@ -1326,6 +1587,10 @@ class timekprUserControl(object):
                 # save what we could
                 self.initUserControl(True)
 
+            # values are the same as in the file now
+            self._isModified = False
+            self._savedLastChecked = self._timekprUserControl["LAST_CHECKED"]
+
         # clear parser
         self._timekprUserControlParser.clear()
 
@@ -1385,8 +1650,26 @@ class timekprUserControl(object):
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish init user control")
 
+    def _setValue(self, pParam, pValue):
+        """Set value and mark control as modified if stored value changes"""
+        # values are stored as whole seconds
+        if pParam not in self._timekprUserControl or int(self._timekprUserControl[pParam]) != int(pValue):
+            # changed
+            self._isModified = True
+        # set
+        self._timekprUserControl[pParam] = pValue
+
     def saveControl(self):
         """Save configuration"""
+        # last checked alone is saved when day changes (it's used to detect day / week / month changes) or once in a while
+        lastChecked = self._timekprUserControl["LAST_CHECKED"]
+        # nothing to save
+        if not self._isModified and self._savedLastChecked is not None and lastChecked.date() == self._savedLastChecked.date() and abs((lastChecked - self._savedLastChecked).total_seconds()) < cons.TK_CONTROL_LAST_CHECKED_SAVE_INTERVAL:
+            # log
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "user (%s) control is not changed, save skipped" % (self._userName))
+            # done
+            return
+
         log.log(cons.TK_LOG_LEVEL_INFO, "start save user (%s) control" % (self._userName))
 
         # init dict
@@ -1417,6 +1700,10 @@ class timekprUserControl(object):
         # edit control file (using alternate method because configparser looses comments in the process)
         _saveConfigFile(self._configFile, values)
 
+        # values are the same as in the file now
+        self._isModified = False
+        self._savedLastChecked = lastChecked
+
         log.log(cons.TK_LOG_LEVEL_INFO, "finish save user control")
 
     def logUserControl(self):
@@ -1510,38 +1797,38 @@ class timekprUserControl(object):
 
     def setUserTimeSpentBalance(self, pTimeSpent):
         """Set time spent for day (including bonuses)"""
-        # result
-        self._timekprUserControl["TIME_SPENT_BALANCE"] = pTimeSpent
+        # set (marks control modified if value changes)
+        self._setValue("TIME_SPENT_BALANCE", pTimeSpent)
 
     def setUserTimeSpentDay(self, pTimeSpentDay):
         """Set time spent for day"""
-        # result
-        self._timekprUserControl["TIME_SPENT_DAY"] = pTimeSpentDay
+        # set (marks control modified if value changes)
+        self._setValue("TIME_SPENT_DAY", pTimeSpentDay)
 
     def setUserTimeSpentWeek(self, pTimeSpentWeek):
         """Set time spent for week"""
-        # result
-        self._timekprUserControl["TIME_SPENT_WEEK"] = pTimeSpentWeek
+        # set (marks control modified if value changes)
+        self._setValue("TIME_SPENT_WEEK", pTimeSpentWeek)
 
     def setUserTimeSpentMonth(self, pTimeSpentMonth):
         """Set time spent for month"""
-        # result
-        self._timekprUserControl["TIME_SPENT_MONTH"] = pTimeSpentMonth
+        # set (marks control modified if value changes)
+        self._setValue("TIME_SPENT_MONTH", pTimeSpentMonth)
 
     def setUserLastChecked(self, pEffectiveDatetime):
         """Set last check time for user"""
-        # result
+        # set (it does not mark control modified, save decides whether it's worth saving)
         self._timekprUserControl["LAST_CHECKED"] = pEffectiveDatetime
 
     def setUserPlayTimeSpentBalance(self, pTimeSpent):
         """Set PlayTime balance for day (including bonues)"""
-        # result
-        self._timekprUserControl["PLAYTIME_SPENT_BALANCE"] = pTimeSpent
+        # set (marks control modified if value changes)
+        self._setValue("PLAYTIME_SPENT_BALANCE", pTimeSpent)
 
     def setUserPlayTimeSpentDay(self, pTimeSpent):
         """Set PlayTime spent for day (including bonues)"""
-        # result
-        self._timekprUserControl["PLAYTIME_SPENT_DAY"] = pTimeSpent
+        # set (marks control modified if value changes)
+        self._setValue("PLAYTIME_SPENT_DAY", pTimeSpent)
 
 class timekprClientConfig(object):
     """Class will hold and provide config management for user"""
@@ -5,16 +5,18 @@ Created on Aug 28, 2018
 """
 
 # defaults
-_START_TIME = None
-_END_TIME = None
-_RESULT = 0
+_DBUS_TIMINGS = {}  # DBUS call timing statistics per interface name
 
 # imports
-from datetime import datetime
 import os
+import time
 import pwd
 import inspect
 import stat
+import math
+import threading
+from collections import deque
+from contextlib import contextmanager
 try:
     import psutil
     _PSUTIL = True
@@ -26,6 +28,9 @@ except (ImportError, ValueError):
 from timekpr.common.constants import constants as cons
 from timekpr.common.log import log
 
+# DBUS calls are measured from multiple threads
+_DBUS_TIMINGS_LOCK = threading.Lock()
+
 
 # this is needed for debugging purposes
 def whoami():
@@ -60,43 +65,195 @@ def getNormalizedUserNames(pUID=None, pUser=None):
     return userName, userNameFull
 
 
-def measureTimeElapsed(pStart=False, pStop=False, pResult=False):
-    """Calculate the time difference in the simplest manner"""
-    # init globals (per import)
-    global _START_TIME
-    global _END_TIME
-    global _RESULT
-
-    # set up start
-    if pStart:
-        _START_TIME = datetime.now()
-    # set up end
-    if pStop:
-        # calc seconds and finish stuff
-        _END_TIME = datetime.now()
-        _RESULT = (_END_TIME - _START_TIME).total_seconds()
-        _START_TIME = _END_TIME
-
-    # return
-    return _RESULT
+def _addToHistogram(pHistogram, pBuckets, pValue):
+    """Count value in histogram bucket (last one is for values above all bounds)"""
+    # find the bucket
+    for rIdx, rBound in enumerate(pBuckets):
+        if pValue <= rBound:
+            pHistogram[rIdx] += 1
+            break
+    else:
+        pHistogram[-1] += 1
 
 
-def measureDBUSTimeElapsed(pStart=False, pStop=False, pPrintToConsole=False, pDbusIFName=""):
-    """Calculate the time difference in the simplest manner"""
-    # run
-    result = measureTimeElapsed(pStart, pStop)
-    # in case we measure dbus performance issues, just print them
-    if pStop and result >= cons.TK_DBUS_ANSWER_TIME:
+@contextmanager
+def measureDBUSTime(pDbusIFName):
+    """Measure how long DBUS calls in with block (or decorated function) take and account that for the interface"""
+    # start (measurement state is local to this call, so measurements in different threads or nested ones do not interfere)
+    start = time.monotonic()
+    failed = False
+    try:
+        yield
+    except Exception:
+        # failed calls are accounted too
+        failed = True
+        raise
+    finally:
+        # elapsed
+        elapsed = time.monotonic() - start
+        # account
+        with _DBUS_TIMINGS_LOCK:
+            # init stats for interface
+            if pDbusIFName not in _DBUS_TIMINGS:
+                _DBUS_TIMINGS[pDbusIFName] = {"CNT": 0, "ERR": 0, "SLOW": 0, "SUM": 0.0, "MAX": 0.0, "HIST": [0] * (len(cons.TK_DBUS_HIST_BUCKETS) + 1)}
+            stats = _DBUS_TIMINGS[pDbusIFName]
+            # count
+            stats["CNT"] += 1
+            stats["ERR"] += 1 if failed else 0
+            stats["SLOW"] += 1 if elapsed >= cons.TK_DBUS_ANSWER_TIME else 0
+            stats["SUM"] += elapsed
+            stats["MAX"] = max(stats["MAX"], elapsed)
+            _addToHistogram(stats["HIST"], cons.TK_DBUS_HIST_BUCKETS, elapsed)
+
+
+def getDBUSTimeStatistics():
+    """Get DBUS call timing statistics (count, failed, slow, total, max, histogram) per interface name"""
+    # copy
+    with _DBUS_TIMINGS_LOCK:
+        return {rName: dict(rStats, HIST=list(rStats["HIST"])) for rName, rStats in _DBUS_TIMINGS.items()}
+
+
+def logDBUSTimeStatistics(pPrintToConsole=False, pSlowOnly=False):
+    """Log DBUS call timing statistics per interface name (optionally only for interfaces which had slow calls)"""
+    # go through interfaces
+    for rName, rStats in sorted(getDBUSTimeStatistics().items()):
+        # skip interfaces without slow calls
+        if pSlowOnly and rStats["SLOW"] == 0:
+            continue
+        # format
+        statsStr = "PERFORMANCE (DBUS) - \"%s\", cnt: %i, err: %i, slow: %i, avg: %.4fs, max: %.4fs, hist: %s (buckets: %s)" % (rName, rStats["CNT"], rStats["ERR"], rStats["SLOW"], rStats["SUM"] / rStats["CNT"], rStats["MAX"], rStats["HIST"], str(cons.TK_DBUS_HIST_BUCKETS))
         # measurement logging
         if pPrintToConsole:
-            # measurement logging
-            log.consoleOut("WARNING: PERFORMANCE (DBUS) - acquiring \"%s\" took too long (%is)" % (pDbusIFName, result))
+            log.consoleOut(statsStr)
         else:
-            # measurement logging
-            log.log(cons.TK_LOG_LEVEL_INFO, "WARNING: PERFORMANCE (DBUS) - acquiring \"%s\" took too long (%is)" % (pDbusIFName, result))
-
-    # return
-    return result
+            log.log(cons.TK_LOG_LEVEL_INFO if rStats["SLOW"] > 0 else cons.TK_LOG_LEVEL_DEBUG, statsStr)
+
+
+class timekprTickClock(object):
+    """Monotonic fixed rate tick clock with lateness and overrun statistics"""
+
+    def __init__(self):
+        """Initialize clock"""
+        # when next tick is due
+        self._nextTick = None
+        # when current tick started
+        self._tickStart = None
+        # tick statistics
+        self._tickCnt = 0
+        self._missedTickCnt = 0
+        self._latenessHist = [0] * (len(cons.TK_TICK_HIST_BUCKETS) + 1)
+        self._overrunHist = [0] * (len(cons.TK_TICK_HIST_BUCKETS) + 1)
+
+    def startTick(self):
+        """Start tick and return how late it started (in seconds)"""
+        # now
+        self._tickStart = time.monotonic()
+        # first tick or woken up before tick was due (tick starts now)
+        if self._nextTick is None or self._tickStart < self._nextTick:
+            self._nextTick = self._tickStart
+        # lateness
+        lateness = self._tickStart - self._nextTick
+        # stats
+        self._tickCnt += 1
+        _addToHistogram(self._latenessHist, cons.TK_TICK_HIST_BUCKETS, lateness)
+        # result
+        return lateness
+
+    def finishTick(self, pInterval):
+        """Finish tick and schedule next one after interval (from when this one was due), return how long tick took (in seconds)"""
+        # now
+        tickEnd = time.monotonic()
+        # elapsed
+        elapsed = tickEnd - self._tickStart
+        # fixed rate, next tick is scheduled from when this one was due (not when it finished)
+        self._nextTick += pInterval
+        # overran next tick, catch up right away (ticks are not bursted, missed ones are skipped)
+        if self._nextTick < tickEnd:
+            # stats
+            self._missedTickCnt += int((tickEnd - self._nextTick) / pInterval)
+            _addToHistogram(self._overrunHist, cons.TK_TICK_HIST_BUCKETS, tickEnd - self._nextTick)
+            # catch up
+            self._nextTick = tickEnd
+        # log statistics from time to time
+        if self._tickCnt % cons.TK_TICK_STATS_CNT == 0:
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "--- tick stats: ticks: %i, missed: %i, late: %s, overrun: %s (buckets: %s) ---" % (self._tickCnt, self._missedTickCnt, self._latenessHist, self._overrunHist, str(cons.TK_TICK_HIST_BUCKETS)))
+        # result
+        return elapsed
+
+    def getSleepTime(self):
+        """Get how many seconds are left till next tick"""
+        # result
+        return max(self._nextTick - time.monotonic(), 0)
+
+    def getTickStatistics(self):
+        """Get tick count, missed tick count, lateness and overrun histograms"""
+        # result
+        return self._tickCnt, self._missedTickCnt, list(self._latenessHist), list(self._overrunHist)
+
+
+class timekprSpanRecorder(object):
+    """Records how long phases of work take (per phase and per user) and keeps rolling statistics of them"""
+
+    def __init__(self):
+        """Initialize recorder"""
+        # recent durations per phase
+        self._spans = {}
+        # spans are recorded from user worker threads as well
+        self._spansLock = threading.Lock()
+
+    @contextmanager
+    def span(self, pPhase, pUserName=None):
+        """Measure how long code in with block takes and record it for the phase"""
+        # start
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            # record
+            self.addSpan(pPhase, time.monotonic() - start, pUserName)
+
+    def addSpan(self, pPhase, pSecs, pUserName=None):
+        """Record duration for the phase (and for the phase of the user, if specified)"""
+        # phase names
+        names = (pPhase,) if pUserName is None else (pPhase, "%s[%s]" % (pPhase, pUserName))
+        # record
+        with self._spansLock:
+            for rName in names:
+                # rolling window of recent durations
+                if rName not in self._spans:
+                    self._spans[rName] = deque(maxlen=cons.TK_SPAN_STATS_CNT)
+                self._spans[rName].append(pSecs)
+
+    def removeUserSpans(self, pUserName):
+        """Remove spans of the user (when user leaves)"""
+        # suffix for user phases
+        userSfx = "[%s]" % (pUserName)
+        # remove
+        with self._spansLock:
+            for rName in [rName for rName in self._spans if rName.endswith(userSfx)]:
+                self._spans.pop(rName)
+
+    def getSpanStatistics(self):
+        """Get count, p50, p95, p99 and max duration (in seconds) of recent spans for every phase"""
+        # result
+        result = {}
+        # copy of the durations (statistics are calculated without a lock)
+        with self._spansLock:
+            spans = {rName: list(rDurations) for rName, rDurations in self._spans.items()}
+        # calculate
+        for rName, rDurations in spans.items():
+            # sort for percentiles
+            rDurations.sort()
+            # nearest rank percentiles
+            result[rName] = [len(rDurations)] + [rDurations[max(math.ceil(rPct * len(rDurations)) - 1, 0)] for rPct in (0.5, 0.95, 0.99)] + [rDurations[-1]]
+        # result
+        return result
+
+    def logSpanStatistics(self):
+        """Log statistics of all phases"""
+        # log sorted by name
+        for rName, rStats in sorted(self.getSpanStatistics().items()):
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "--- span stats: %s, cnt: %i, p50: %.4f, p95: %.4f, p99: %.4f, max: %.4f ---" % (rName, *rStats))
 
 
 def checkAndSetRunning(pAppName, pUserName=""):
@@ -158,6 +315,67 @@ def checkAndSetRunning(pAppName, pUserName=""):
     return isAlreadyRunning
 
 
+def _getCgroupPids(pCgroup):
+    """Get pids of processes in cgroup and all cgroups below it"""
+    # def
+    pids = set()
+    # cgroups come and go, the ones which are gone are skipped
+    for rCgroup, _rCgroups, _rFiles in os.walk(pCgroup):
+        try:
+            # read processes
+            with open(os.path.join(rCgroup, "cgroup.procs"), "r") as procsFd:
+                pids.update(int(rPid) for rPid in procsFd.read().split())
+        except (OSError, ValueError):
+            # cgroup is gone
+            pass
+    # result
+    return pids
+
+
+def parseProcessStat(pContent):
+    """Get start time and name of the process from contents of its stat file"""
+    # name is in brackets and may contain anything, so fields are counted from the last bracket
+    commEnd = pContent.rindex(b")")
+    # start time is the 22nd field, the 3rd one is the first after the name
+    return int(pContent[commEnd + 2:].split(None, 20)[19]), pContent[pContent.index(b"(") + 1:commEnd]
+
+
+def getUserPids(pUids, pVerifyOwner=True):
+    """Get pids of processes which belong to users (from user cgroups if systemd keeps users in cgroup v2, otherwise from all processes, where owner is checked if asked)"""
+    # def
+    pids = set()
+    # systemd keeps processes of the user in user cgroup, so only the processes of the user are read (cgroup v2 without user slices, e.g. elogind, needs all processes to be scanned)
+    if os.path.exists(cons.TK_CGROUP_CONTROLLERS) and os.path.isdir(cons.TK_CGROUP_USER_SLICE_ROOT):
+        # all users
+        for rUid in pUids:
+            # user cgroup exists only when user has processes
+            if os.path.isdir(cons.TK_CGROUP_USER_SLICE % (rUid)):
+                # processes
+                pids.update(_getCgroupPids(cons.TK_CGROUP_USER_SLICE % (rUid)))
+    # scan all processes
+    else:
+        # owners
+        uids = set(int(rUid) for rUid in pUids)
+        # all processes
+        for rPid in os.listdir(cons.TK_PROC_ROOT):
+            # processes only
+            if rPid.isdecimal():
+                # check owner
+                if pVerifyOwner:
+                    try:
+                        # owner of the process directory is the owner of the process
+                        if os.lstat(os.path.join(cons.TK_PROC_ROOT, rPid)).st_uid not in uids:
+                            # not ours
+                            continue
+                    except OSError:
+                        # process is gone
+                        continue
+                # process
+                pids.add(int(rPid))
+    # result
+    return pids
+
+
 def killLeftoverUserProcesses(pUserName, pTimekprConfig):
     """Kill leftover processes for user"""
     # if psutil is not available, do nothing
@@ -189,10 +407,22 @@ def killLeftoverUserProcesses(pUserName, pTimekprConfig):
             killTty = True
             break
 
-    # get all processes for this user
-    for userProc in psutil.process_iter():
-        # process info
-        procInfo = userProc.as_dict(attrs=["pid", "ppid", "name", "username", "terminal"])
+    try:
+        # user id
+        userId = pwd.getpwnam(pUserName).pw_uid
+    except KeyError:
+        # user is gone
+        log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: user \"%s\" not found, leftover processes are not killed" % (pUserName))
+        return
+
+    # get all processes for this user (only processes of this user are inspected, if possible)
+    for userPid in getUserPids([userId]):
+        try:
+            # process info
+            procInfo = psutil.Process(userPid).as_dict(attrs=["pid", "ppid", "name", "username", "terminal"])
+        except psutil.Error:
+            # process is gone
+            continue
         # check for username and for processes that originates from init (the rest should be terminated along with the session)
         if procInfo["username"] == pUserName:
             # if originates from init
@@ -71,6 +71,21 @@ class timekprNotificationManager(dbus.service.Object):
 
     # --------------- worker methods --------------- #
 
+    def getNextNotificationDelay(self, pTimeLeft):
+        """Calculate in how many seconds next notification is due (assuming time is running)"""
+        # repeated notification for current level
+        delays = [self._notificationLimits[self._notificationLvl][cons.TK_NOTIF_INTERVAL]() - (datetime.now() - self._lastNotified).total_seconds()] if self._notificationLvl >= 0 else []
+        # level changes when time left drops below current level limit
+        for rLimit in self._notificationLimits:
+            # current level
+            if pTimeLeft >= rLimit[cons.TK_NOTIF_LEFT]():
+                # time till next level
+                delays.append(pTimeLeft - rLimit[cons.TK_NOTIF_LEFT]())
+                # we found what we needed
+                break
+        # result
+        return min(delays) if delays else 0
+
     def deInitUser(self):
         """Leave the connection"""
         # un-init DBUS
@@ -0,0 +1,134 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+import os
+import sys
+import time
+import threading
+import subprocess
+import argparse
+import dbus
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+from timekpr.common.log import log
+from timekpr.common.utils import misc
+from timekpr.server.interface.dbus.daemon import timekprDaemon
+from timekpr.server.benchmark.login1 import TK_BENCH_INTERFACE
+
+
+def _startPrivateBus():
+    """Start private session bus and make it the session bus of this process"""
+    # start bus
+    busProcess = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address=1"], stdout=subprocess.PIPE, universal_newlines=True)
+    # everything (including stand-in login1) will connect to this bus
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = busProcess.stdout.readline().strip()
+    # result
+    return busProcess
+
+
+def _startLogin1(pUsers, pSessions, pLatency):
+    """Start stand-in login1 on private session bus"""
+    # stand-in login1 has to find timekpr the same way we did
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(rPath for rPath in sys.path if rPath))
+    # start login1
+    login1Process = subprocess.Popen([sys.executable, "-m", "timekpr.server.benchmark.login1", "--users", str(pUsers), "--sessions", str(pSessions), "--latency", str(pLatency)], stdout=subprocess.PIPE, env=env, universal_newlines=True)
+    # wait till it's ready
+    if login1Process.stdout.readline().strip() != "ready":
+        raise RuntimeError("stand-in login1 did not start")
+    # result
+    return login1Process
+
+
+def runBenchmark(pUsers, pSessions, pLatency, pTicks):
+    """Drive simulated users through full ticks of checkUsers and report the results"""
+    # tick durations (only recent ones are kept, which is plenty) and CPU time
+    tickRecorder = misc.timekprSpanRecorder()
+    tickCPU = 0
+
+    # get daemon
+    timekprDaemonBench = timekprDaemon()
+    timekprDaemonBench.initTimekpr()
+    # main loop serves DBUS while we check users
+    mainLoopTh = threading.Thread(target=timekprDaemonBench.executeTimekprMain)
+    mainLoopTh.start()
+
+    # stand-in login1 statistics interface
+    login1Bench = dbus.Interface(dbus.SessionBus().get_object(cons.TK_DBUS_L1_OBJECT, cons.TK_DBUS_L1_PATH), TK_BENCH_INTERFACE)
+
+    try:
+        # first tick initializes users, it's measured separately
+        tickStart = time.monotonic()
+        timekprDaemonBench.checkUsers()
+        tickInit = time.monotonic() - tickStart
+        # calls from now on
+        login1Bench.ResetCallStatistics()
+
+        # ticks
+        for rTick in range(0, pTicks):
+            # start
+            cpuStart = time.process_time()
+            # work
+            with tickRecorder.span("tick"):
+                timekprDaemonBench.checkUsers()
+            # finish
+            tickCPU += time.process_time() - cpuStart
+
+        # calls to login1
+        login1Calls = login1Bench.GetCallStatistics()
+        # phase statistics of the daemon
+        _result, _message, spanStats = timekprDaemonBench.getTimekprPerformanceStatistics()
+    finally:
+        # stop daemon
+        timekprDaemonBench.finishTimekpr()
+        mainLoopTh.join()
+
+    # report
+    log.consoleOut("users: %i, sessions per user: %i, login1 latency: %.4fs, ticks: %i" % (pUsers, pSessions, pLatency, pTicks))
+    log.consoleOut("init tick: %.4fs" % (tickInit))
+    log.consoleOut("tick latency, cnt: %i, p50: %.4fs, p95: %.4fs, p99: %.4fs, max: %.4fs" % tuple(tickRecorder.getSpanStatistics()["tick"]))
+    log.consoleOut("CPU per tick: %.4fs, per user: %.6fs" % (tickCPU / pTicks, tickCPU / pTicks / max(pUsers, 1)))
+    log.consoleOut("login1 calls per tick: %.1f (%s)" % (sum(login1Calls.values()) / pTicks, ", ".join("%s: %.1f" % (str(rMethod), rCnt / pTicks) for rMethod, rCnt in sorted(login1Calls.items()))))
+    # phases (users are not shown one by one)
+    for rName, rStats in sorted(spanStats.items()):
+        if "[" not in rName:
+            log.consoleOut("phase \"%s\", cnt: %i, p50: %.4fs, p95: %.4fs, p99: %.4fs, max: %.4fs" % (str(rName), *rStats))
+    # DBUS calls as seen by the daemon
+    misc.logDBUSTimeStatistics(pPrintToConsole=True)
+
+
+# main start
+if __name__ == "__main__":
+    # arguments
+    parser = argparse.ArgumentParser(description="Benchmark of user checks with simulated users served by stand-in login1")
+    parser.add_argument("--users", type=int, default=10, help="simulated users")
+    parser.add_argument("--sessions", type=int, default=1, help="sessions per user")
+    parser.add_argument("--latency", type=float, default=0.0, help="login1 reply latency in seconds")
+    parser.add_argument("--ticks", type=int, default=30, help="ticks to measure (after the one which initializes users)")
+    args = parser.parse_args()
+
+    # benchmark uses development setup (config, work and log directories), run it from the same place as development daemon
+    if not (cons.TK_DEV_ACTIVE and cons.TK_DEV_BUS == "ses"):
+        log.consoleOut("benchmark works in development mode only (TK_DEV_ACTIVE = True, TK_DEV_BUS = \"ses\")")
+        sys.exit(1)
+    # login1 is ours
+    cons.TK_DEV_L1_BUS = "ses"
+
+    # start private bus and login1
+    busProcess = _startPrivateBus()
+    login1Process = None
+    try:
+        # login1
+        login1Process = _startLogin1(args.users, args.sessions, args.latency)
+        # benchmark
+        runBenchmark(args.users, args.sessions, args.latency, max(args.ticks, 1))
+    finally:
+        # stop everything we started
+        for rProcess in (login1Process, busProcess):
+            if rProcess is not None:
+                rProcess.terminate()
+                rProcess.wait()
@@ -0,0 +1,200 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+import sys
+import time
+import argparse
+from gi.repository import GLib
+from dbus.mainloop.glib import DBusGMainLoop
+import dbus.service
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+
+# interface to get call statistics of stand-in login1
+TK_BENCH_INTERFACE = "com.timekpr.benchmark"
+# first UID of simulated users (above UID_MIN, so users are considered normal users)
+TK_BENCH_UID_START = 20000
+# name prefix of simulated users
+TK_BENCH_USER_PREFIX = "tkbench"
+
+# default dbus
+DBusGMainLoop(set_as_default=True)
+
+
+class timekprStandInStatistics(object):
+    """Counts calls served by stand-in login1 and simulates reply latency"""
+
+    def __init__(self, pLatency):
+        """Initialize statistics"""
+        # reply latency in seconds
+        self._latency = pLatency
+        # calls per method
+        self._calls = {}
+
+    def processCall(self, pMethod):
+        """Account call and wait for simulated latency (login1 serves calls one by one, so do we)"""
+        # count
+        self._calls[pMethod] = self._calls.get(pMethod, 0) + 1
+        # simulate work
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+    def getCalls(self):
+        """Get calls per method"""
+        # result
+        return self._calls
+
+    def resetCalls(self):
+        """Reset call counts"""
+        # reset
+        self._calls = {}
+
+
+class timekprStandInProperties(dbus.service.Object):
+    """Login1 object (user or session) which exposes properties"""
+
+    def __init__(self, pBusName, pPath, pInterface, pProperties, pStatistics):
+        """Initialize object"""
+        # properties of the interface
+        self._interface = pInterface
+        self._properties = pProperties
+        # statistics
+        self._statistics = pStatistics
+        # init DBUS
+        super().__init__(pBusName, pPath)
+
+    @dbus.service.method(cons.TK_DBUS_PROPERTIES_INTERFACE, in_signature="ss", out_signature="v")
+    def Get(self, pInterface, pProperty):
+        """Get one property"""
+        # account
+        self._statistics.processCall("Get")
+        # not ours
+        if pInterface != self._interface or pProperty not in self._properties:
+            raise dbus.exceptions.DBusException("unknown property \"%s.%s\"" % (pInterface, pProperty), name="org.freedesktop.DBus.Error.UnknownProperty")
+        # result
+        return self._properties[pProperty]
+
+    @dbus.service.method(cons.TK_DBUS_PROPERTIES_INTERFACE, in_signature="s", out_signature="a{sv}")
+    def GetAll(self, pInterface):
+        """Get all properties"""
+        # account
+        self._statistics.processCall("GetAll")
+        # result
+        return dbus.Dictionary(self._properties if pInterface == self._interface else {}, signature="sv")
+
+    @dbus.service.method(cons.TK_DBUS_SESSION_OBJECT, in_signature="", out_signature="")
+    def Lock(self):
+        """Lock session (nothing to lock here)"""
+        # account
+        self._statistics.processCall("Lock")
+
+
+class timekprStandInLogin1(dbus.service.Object):
+    """Login1 manager with simulated users and sessions"""
+
+    def __init__(self, pUsers, pSessions, pLatency):
+        """Initialize stand-in login1"""
+        # statistics
+        self._statistics = timekprStandInStatistics(pLatency)
+        # simulated users and their objects
+        self._users = []
+        self._objects = []
+        # get our bus name (the same as real login1)
+        self._busName = dbus.service.BusName(cons.TK_DBUS_L1_OBJECT, bus=dbus.SessionBus(), do_not_queue=True)
+        # init DBUS
+        super().__init__(self._busName, cons.TK_DBUS_L1_PATH)
+
+        # session id
+        sessionId = 0
+        # create users
+        for rUser in range(0, pUsers):
+            # user
+            uid = TK_BENCH_UID_START + rUser
+            userName = "%s%03d" % (TK_BENCH_USER_PREFIX, rUser)
+            userPath = "%s/user/_%i" % (cons.TK_DBUS_L1_PATH, uid)
+            # sessions
+            userSessions = []
+            # create sessions
+            for rSession in range(0, pSessions):
+                # session
+                sessionId += 1
+                sessionPath = "%s/session/_%i" % (cons.TK_DBUS_L1_PATH, sessionId)
+                userSessions.append(dbus.Struct((str(sessionId), dbus.ObjectPath(sessionPath)), signature="so"))
+                # first session of the user is in the foreground
+                sessionProperties = {
+                    "Id": str(sessionId),
+                    "Name": userName,
+                    "Type": "x11",
+                    "Class": "user",
+                    "VTNr": dbus.UInt32(0),
+                    "Seat": dbus.Struct(("seat0", dbus.ObjectPath("%s/seat/seat0" % (cons.TK_DBUS_L1_PATH))), signature="so"),
+                    "State": "active" if rSession == 0 else "online",
+                    "Active": dbus.Boolean(rSession == 0),
+                    "IdleHint": dbus.Boolean(False),
+                    "LockedHint": dbus.Boolean(False)
+                }
+                self._objects.append(timekprStandInProperties(self._busName, sessionPath, cons.TK_DBUS_SESSION_OBJECT, sessionProperties, self._statistics))
+            # user properties
+            userProperties = {
+                "UID": dbus.UInt32(uid),
+                "Name": userName,
+                "State": "active" if userSessions else "online",
+                "IdleHint": dbus.Boolean(False),
+                "Sessions": dbus.Array(userSessions, signature="(so)")
+            }
+            self._objects.append(timekprStandInProperties(self._busName, userPath, cons.TK_DBUS_USER_OBJECT, userProperties, self._statistics))
+            # user list
+            self._users.append(dbus.Struct((dbus.UInt32(uid), userName, dbus.ObjectPath(userPath)), signature="uso"))
+
+    @dbus.service.method(cons.TK_DBUS_L1_MANAGER_INTERFACE, in_signature="", out_signature="a(uso)")
+    def ListUsers(self):
+        """List simulated users"""
+        # account
+        self._statistics.processCall("ListUsers")
+        # result
+        return dbus.Array(self._users, signature="(uso)")
+
+    @dbus.service.signal(cons.TK_DBUS_L1_MANAGER_INTERFACE, signature="so")
+    def SessionNew(self, pSessionId, pSessionPath):
+        """Session is added (simulated sessions do not change)"""
+        pass
+
+    @dbus.service.signal(cons.TK_DBUS_L1_MANAGER_INTERFACE, signature="so")
+    def SessionRemoved(self, pSessionId, pSessionPath):
+        """Session is removed (simulated sessions do not change)"""
+        pass
+
+    @dbus.service.method(TK_BENCH_INTERFACE, in_signature="", out_signature="a{si}")
+    def GetCallStatistics(self):
+        """Get calls served per method"""
+        # result (this call is not accounted)
+        return dbus.Dictionary(self._statistics.getCalls(), signature="si")
+
+    @dbus.service.method(TK_BENCH_INTERFACE, in_signature="", out_signature="")
+    def ResetCallStatistics(self):
+        """Reset call statistics"""
+        # reset
+        self._statistics.resetCalls()
+
+
+# main start
+if __name__ == "__main__":
+    # arguments
+    parser = argparse.ArgumentParser(description="Stand-in login1 with simulated users (use on private session bus only)")
+    parser.add_argument("--users", type=int, default=10, help="simulated users")
+    parser.add_argument("--sessions", type=int, default=1, help="sessions per user")
+    parser.add_argument("--latency", type=float, default=0.0, help="reply latency in seconds")
+    args = parser.parse_args()
+
+    # set up login1
+    _timekprStandInLogin1 = timekprStandInLogin1(args.users, args.sessions, args.latency)
+    # tell whoever started us that login1 is available
+    print("ready", flush=True)
+    # serve
+    GLib.MainLoop().run()
+    sys.exit(0)
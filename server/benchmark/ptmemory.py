@@ -0,0 +1,100 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+import os
+import sys
+import subprocess
+import argparse
+from datetime import datetime
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.server.user.playtime import timekprPlayTimeProcess
+
+# layouts of the PlayTime process cache: dict per process with string pids (as it was before) and records with integer pids
+TK_BENCH_LAYOUTS = ("dict", "record")
+
+
+def _getRSS():
+    """Get resident set size of this process in bytes"""
+    # second value is resident pages
+    with open("/proc/self/statm", "r") as statmFd:
+        return int(statmFd.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _buildCache(pLayout, pProcesses, pUsers, pExecutables):
+    """Build PlayTime process cache with simulated processes"""
+    # cache and user processes
+    pids = {}
+    userPids = {str(1000 + rUser): set() for rUser in range(0, pUsers)}
+    # the same refresh time / generation for all processes
+    dt = datetime.now()
+    # fill
+    for rPid in range(1, pProcesses + 1):
+        # every process has its own strings, as if they were read from /proc
+        uid = str(1000 + rPid % pUsers)
+        exe = "/usr/lib/application-%i/bin/executable" % (rPid % pExecutables)
+        # old layout
+        if pLayout == "dict":
+            # process
+            pid = str(rPid)
+            pids[pid] = {"u": uid, "e": exe, "c": None, "Q": 2, "q": 5, "k": 0, "t": datetime.fromtimestamp(dt.timestamp())}
+        # records
+        else:
+            # process
+            pid = rPid
+            pids[pid] = timekprPlayTimeProcess(uid, exe, None, 123456 + rPid, 1)
+        # user processes
+        userPids[uid].add(pid)
+    # result
+    return pids, userPids
+
+
+def measureLayout(pLayout, pProcesses, pUsers, pExecutables):
+    """Measure resident memory needed for the cache (run in separate process for clean numbers)"""
+    # before
+    rssStart = _getRSS()
+    # build
+    cache = _buildCache(pLayout, pProcesses, pUsers, pExecutables)
+    # after
+    rssFinish = _getRSS()
+    # keep cache alive till measured
+    del cache
+    # result
+    return rssFinish - rssStart
+
+
+# main start
+if __name__ == "__main__":
+    # arguments
+    parser = argparse.ArgumentParser(description="Memory benchmark of PlayTime process cache layouts")
+    parser.add_argument("--processes", type=int, default=30000, help="simulated processes")
+    parser.add_argument("--users", type=int, default=5, help="simulated users")
+    parser.add_argument("--executables", type=int, default=300, help="distinct executables")
+    parser.add_argument("--layout", choices=TK_BENCH_LAYOUTS, default=None, help="measure only this layout (used internally)")
+    args = parser.parse_args()
+
+    # measure one layout
+    if args.layout is not None:
+        # print plain result for parent
+        log.consoleOut(measureLayout(args.layout, args.processes, args.users, args.executables))
+        sys.exit(0)
+
+    # stand-alone processes have to find timekpr the same way we did
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(rPath for rPath in sys.path if rPath))
+    # results
+    results = {}
+    # measure every layout in clean process
+    for rLayout in TK_BENCH_LAYOUTS:
+        # run
+        results[rLayout] = int(subprocess.check_output([sys.executable, "-m", "timekpr.server.benchmark.ptmemory", "--layout", rLayout, "--processes", str(args.processes), "--users", str(args.users), "--executables", str(args.executables)], env=env, universal_newlines=True))
+
+    # report
+    log.consoleOut("processes: %i, users: %i, executables: %i" % (args.processes, args.users, args.executables))
+    for rLayout in TK_BENCH_LAYOUTS:
+        log.consoleOut("layout \"%s\", RSS: %.2f MiB, per process: %i bytes" % (rLayout, results[rLayout] / 1024 / 1024, results[rLayout] / max(args.processes, 1)))
+    log.consoleOut("saved: %.2f MiB (%.1f%%)" % ((results["dict"] - results["record"]) / 1024 / 1024, 100 * (results["dict"] - results["record"]) / max(results["dict"], 1)))
@@ -0,0 +1,284 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+import os
+import time
+import random
+import shutil
+import builtins
+import tempfile
+import argparse
+import tracemalloc
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.utils import misc
+from timekpr.server.user.playtime import timekprPlayTimeConfig
+
+# first UID of simulated users (above UID_MIN, so users are considered normal users)
+TK_BENCH_UID_START = 20000
+# scan strategies: alternative solution for determining owner / process and whether processes are cached between scans
+TK_BENCH_STRATEGIES = ((1, True), (2, True), (3, True), (1, False), (2, False), (3, False))
+# stat of the process (pid, name, pid, pid and start time are inserted)
+TK_BENCH_STAT = "%i (%s) S 1 %i %i 0 -1 4194304 1234 0 0 0 12 3 0 0 20 0 1 0 %i 123456789 1234 18446744073709551615 1 1 0 0 0 0 0 4096 0 0 0 0 17 3 0 0 0 0 0\n"
+# file system calls which scanner makes (each of them is one system call, except listdir)
+TK_BENCH_SYSCALLS = ("open", "read", "readv", "close", "fstat", "stat", "lstat", "readlink", "listdir")
+# status of the process (name, pid, pid and uid / gid are inserted)
+TK_BENCH_STATUS = "Name:\t%s\nUmask:\t0022\nState:\tS (sleeping)\nTgid:\t%i\nNgid:\t0\nPid:\t%i\nPPid:\t1\nTracerPid:\t0\nUid:\t%i\t%i\t%i\t%i\nGid:\t%i\t%i\t%i\t%i\n" + "VmPeak:\t  123456 kB\n" * 40
+
+
+class timekprStandInConfig(object):
+    """Server config with PlayTime settings needed by the scanner"""
+
+    def __init__(self, pEnhanced):
+        """Initialize config"""
+        # whether cmdline is inspected
+        self._enhanced = pEnhanced
+
+    def getTimekprPlayTimeEnhancedActivityMonitorEnabled(self):
+        """Return whether cmdline is inspected"""
+        return self._enhanced
+
+    def getTimekprPlayTimeProcessEventsEnabled(self):
+        """Return whether process events are used (all processes are scanned in benchmark)"""
+        return False
+
+    def getTimekprPlayTimeTrackedUsersOnly(self):
+        """Return whether only processes of tracked users are cached (all of them are in benchmark)"""
+        return False
+
+    def getTimekprPlayTimeBackgroundScanEnabled(self):
+        """Return whether processes are scanned in background (they are scanned inline in benchmark)"""
+        return False
+
+    def getTimekprPlayTimeScanIntervalMin(self):
+        """Return minimum interval between scans (every scan is measured in benchmark)"""
+        return 0
+
+    def getTimekprPlayTimeScanIntervalMax(self):
+        """Return maximum interval between scans (every scan is measured in benchmark)"""
+        return 0
+
+
+class timekprSyscallCounter(object):
+    """Counts file system calls made while counter is active (python file objects are counted as one open)"""
+
+    def __init__(self):
+        """Initialize counter"""
+        # calls made
+        self.count = 0
+        # original functions
+        self._functions = {}
+
+    def _wrap(self, pFunction):
+        """Wrap function, so calls are counted"""
+        def _counted(*args, **kwargs):
+            """Count and call"""
+            # count
+            self.count += 1
+            # call
+            return pFunction(*args, **kwargs)
+        # result
+        return _counted
+
+    def __enter__(self):
+        """Start counting"""
+        # wrap
+        for rName in TK_BENCH_SYSCALLS:
+            self._functions[rName] = getattr(os, rName)
+            setattr(os, rName, self._wrap(self._functions[rName]))
+        self._functions["builtins.open"] = builtins.open
+        builtins.open = self._wrap(self._functions["builtins.open"])
+        # result
+        return self
+
+    def __exit__(self, pExcType, pExcValue, pTraceback):
+        """Stop counting"""
+        # restore
+        builtins.open = self._functions.pop("builtins.open")
+        for rName, rFunction in self._functions.items():
+            setattr(os, rName, rFunction)
+        self._functions = {}
+
+
+class timekprSyntheticProcTree(object):
+    """Generated process tree which looks like /proc to the scanner"""
+
+    def __init__(self, pRoot, pUids, pSystemShare, pExecutables, pLongCmdLineShare, pLongCmdLineSize):
+        """Initialize tree"""
+        # location
+        self._root = pRoot
+        # owners of the processes and share of processes which belong to root (system services, kernel threads)
+        self._uids = pUids
+        self._systemShare = pSystemShare
+        # executables of the processes
+        self._executables = pExecutables
+        # share and size of very long command lines (java, electron)
+        self._longCmdLineShare = pLongCmdLineShare
+        self._longCmdLineSize = pLongCmdLineSize
+        # pids in the tree
+        self._pids = []
+        # next pid to use
+        self._nextPid = 2
+        # the same tree for the same arguments
+        self._random = random.Random(42)
+
+    def _addProcess(self):
+        """Add process to the tree"""
+        # process
+        pid = self._nextPid
+        self._nextPid += 1
+        uid = 0 if self._random.random() < self._systemShare else self._random.choice(self._uids)
+        exe = self._random.choice(self._executables)
+        procDir = os.path.join(self._root, str(pid))
+        # directory
+        os.mkdir(procDir)
+        # status
+        with open(os.path.join(procDir, "status"), "w") as statusFd:
+            statusFd.write(TK_BENCH_STATUS % (os.path.basename(exe)[:15], pid, pid, uid, uid, uid, uid, uid, uid, uid, uid))
+        # stat
+        with open(os.path.join(procDir, "stat"), "w") as statFd:
+            statFd.write(TK_BENCH_STAT % (pid, os.path.basename(exe)[:15], pid, pid, 1000000 + pid))
+        # command line (some of them are very long)
+        args = ["--arg%i" % (rArg) for rArg in range(0, self._random.randint(0, 10))]
+        if self._random.random() < self._longCmdLineShare:
+            args.append("-classpath=" + "x" * self._longCmdLineSize)
+        with open(os.path.join(procDir, "cmdline"), "w") as cmdFd:
+            cmdFd.write("\x00".join([exe] + args) + "\x00")
+        # executable
+        os.symlink(exe, os.path.join(procDir, "exe"))
+        # owner (owner of process directory and files tells the owner of the process)
+        if os.geteuid() == 0:
+            os.lchown(procDir, uid, uid)
+            for rFile in ("stat", "status", "cmdline", "exe"):
+                os.lchown(os.path.join(procDir, rFile), uid, uid)
+        # add
+        self._pids.append(pid)
+
+    def populate(self, pProcesses):
+        """Add processes to the tree"""
+        # add
+        for rProcess in range(0, pProcesses):
+            self._addProcess()
+
+    def getProcessCnt(self):
+        """Get count of processes in the tree"""
+        # result
+        return len(self._pids)
+
+    def churn(self, pProcesses):
+        """Replace processes with new ones (processes finish and new ones are started)"""
+        # finish
+        for rProcess in range(0, min(pProcesses, len(self._pids))):
+            # remove random process
+            pid = self._pids.pop(self._random.randrange(len(self._pids)))
+            shutil.rmtree(os.path.join(self._root, str(pid)))
+        # start
+        self.populate(pProcesses)
+
+
+def _getFilters(pFilters, pExecutables):
+    """Get filters, half of them executable names, half of them regular expressions"""
+    # filters
+    return [["%s" % (os.path.basename(pExecutables[rFlt % len(pExecutables)])) if rFlt % 2 == 0 else "game-%i.*" % (rFlt), "Activity %i" % (rFlt)] for rFlt in range(0, pFilters)]
+
+
+def measureStrategy(pRoot, pTree, pUids, pFilters, pAltNr, pCaching, pEnhanced, pScans, pChurn):
+    """Measure scan time, match time, memory and file system calls of one strategy, return scan statistics, match time, memory, matched processes and calls per process"""
+    # scanner
+    playTimeBench = timekprPlayTimeConfig(timekprStandInConfig(pEnhanced), pProcRoot=pRoot)
+    playTimeBench._USE_ALT_NR = pAltNr
+    # scan durations
+    scanRecorder = misc.timekprSpanRecorder()
+    # set up users
+    for rUid in pUids:
+        playTimeBench.processPlayTimeFilters(str(rUid), pFilters)
+
+    # first scan fills the cache, memory is measured for it
+    tracemalloc.start()
+    with timekprSyscallCounter() as fillCounter:
+        playTimeBench.processPlayTimeActivities()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # calls made by scans (including quality checks of cached processes)
+    scanCounter = timekprSyscallCounter()
+    # scans
+    for rScan in range(0, pScans):
+        # processes come and go
+        pTree.churn(pChurn)
+        # without caching every process is inspected every time
+        if not pCaching:
+            playTimeBench._clearCachedProcesses()
+        # scan
+        with scanRecorder.span("scan"), scanCounter:
+            playTimeBench.processPlayTimeActivities()
+
+    # match all processes with new filters (filters are applied to cached processes of the user)
+    matchStart = time.monotonic()
+    for rUid in pUids:
+        # no filters and filters again (matcher and its results are built anew)
+        playTimeBench.processPlayTimeFilters(str(rUid), [])
+        playTimeBench.processPlayTimeFilters(str(rUid), pFilters)
+    matchTime = time.monotonic() - matchStart
+    # matched processes
+    matched = sum(playTimeBench.getMatchedUserProcessCnt(str(rUid)) for rUid in pUids)
+
+    # result (calls per process when cache is filled and per process per scan afterwards)
+    return scanRecorder.getSpanStatistics()["scan"], matchTime, memory, matched, (fillCounter.count / max(pTree.getProcessCnt(), 1), scanCounter.count / max(pTree.getProcessCnt() * pScans, 1))
+
+
+def runBenchmark(pSizes, pUsers, pSystemShare, pFilters, pExecutables, pChurn, pScans, pEnhanced, pLongCmdLineShare, pLongCmdLineSize, pDir):
+    """Generate process trees of requested sizes and measure every scan strategy on them"""
+    # users (files can be given away by root only, otherwise all processes belong to us)
+    uids = [TK_BENCH_UID_START + rUser for rUser in range(0, pUsers)] if os.geteuid() == 0 else [os.geteuid()]
+    systemShare = pSystemShare if os.geteuid() == 0 else 0
+    # executables
+    executables = ["/usr/lib/game-%i/bin/game-%i" % (rExe, rExe) if rExe % 10 == 0 else "/usr/lib/application-%i/bin/application-%i" % (rExe, rExe) for rExe in range(0, pExecutables)]
+    # filters
+    filters = _getFilters(pFilters, executables)
+
+    # report
+    log.consoleOut("users: %i, system processes: %.1f%%, filters per user: %i, executables: %i, churn per scan: %.1f%%, scans: %i, enhanced: %s, long cmdlines: %.1f%% (%i bytes)" % (len(uids), systemShare * 100, pFilters, pExecutables, pChurn * 100, pScans, str(pEnhanced), pLongCmdLineShare * 100, pLongCmdLineSize))
+    # sizes
+    for rSize in pSizes:
+        # tree
+        root = tempfile.mkdtemp(prefix="timekpr-proc-", dir=pDir)
+        try:
+            # generate
+            tree = timekprSyntheticProcTree(root, uids, systemShare, executables, pLongCmdLineShare, pLongCmdLineSize)
+            tree.populate(rSize)
+            # strategies
+            for rAltNr, rCaching in TK_BENCH_STRATEGIES:
+                # measure
+                scanStats, matchTime, memory, matched, syscalls = measureStrategy(root, tree, uids, filters, rAltNr, rCaching, pEnhanced, pScans, max(int(rSize * pChurn), 1))
+                # report
+                log.consoleOut("pids: %i, alt: %i, caching: %-5s, scan p50: %.4fs, p95: %.4fs, max: %.4fs, match: %.4fs (%i matched), memory: %.2f MiB, calls per process: %.2f (fill), %.4f (scan)" % (rSize, rAltNr, str(rCaching), scanStats[1], scanStats[2], scanStats[4], matchTime, matched, memory / 1024 / 1024, syscalls[0], syscalls[1]))
+        finally:
+            # clean up
+            shutil.rmtree(root)
+
+
+# main start
+if __name__ == "__main__":
+    # arguments
+    parser = argparse.ArgumentParser(description="Benchmark of PlayTime process scan strategies on generated process trees")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma separated process counts of generated trees")
+    parser.add_argument("--users", type=int, default=5, help="simulated users (when run as root, otherwise all processes are ours)")
+    parser.add_argument("--system-share", type=float, default=0.5, help="share of processes which belong to root (when run as root), on real systems they are the majority")
+    parser.add_argument("--filters", type=int, default=20, help="PlayTime filters per user")
+    parser.add_argument("--executables", type=int, default=300, help="distinct executables")
+    parser.add_argument("--churn", type=float, default=0.01, help="share of processes replaced before every scan")
+    parser.add_argument("--scans", type=int, default=10, help="scans to measure (after the one which fills the cache)")
+    parser.add_argument("--enhanced", action="store_true", help="inspect command lines as well")
+    parser.add_argument("--long-cmdline-share", type=float, default=0.01, help="share of processes with very long command lines")
+    parser.add_argument("--long-cmdline-size", type=int, default=65536, help="size of very long command lines")
+    parser.add_argument("--dir", default="/dev/shm" if os.path.isdir("/dev/shm") else None, help="where trees are generated (memory backed file system is closest to /proc)")
+    args = parser.parse_args()
+
+    # benchmark
+    runBenchmark([int(rSize) for rSize in args.sizes.split(",")], args.users, args.system_share, args.filters, args.executables, args.churn, max(args.scans, 1), args.enhanced, args.long_cmdline_share, args.long_cmdline_size, args.dir)
@@ -0,0 +1,209 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+from timekpr.common.log import log
+from timekpr.server.user.userdata import timekprUser
+from timekpr.server.user.schedule import timekprUserSchedule
+
+# start of simulated time
+TK_CHECK_START = datetime(2026, 10, 18)
+# tick lengths (poll interval, minutes and hours, so hour and day changes are crossed often)
+TK_CHECK_TICKS = ((1, 5), (30, 900), (1800, 4 * 3600))
+
+
+class timekprCheckedUser(timekprUser):
+    """User with time left calculations only, time is set explicitly instead of taken from the clock"""
+
+    def __init__(self, pDatetime):
+        """Initialize user without DBUS and config files"""
+        # simulated time
+        self._checkDatetime = pDatetime
+        # init limit structure
+        self._timekprUserData = self._initUserLimits()
+        # init weekly schedule
+        self._timekprUserSchedule = timekprUserSchedule()
+        # schedule values for the rest of the day
+        self._timeLeftCache = None
+
+    def refreshTimekprRuntimeVariables(self):
+        """Calculate variables from simulated time (the same way as from the clock)"""
+        # establish current time
+        self._effectiveDatetime = self._checkDatetime
+        # monotonic clocks are not used in time left calculation
+        self._effectiveMonotonic = self._effectiveBoottime = 0
+        # get DOW
+        self._currentDOW = str(datetime.date(self._effectiveDatetime).isoweekday())
+        # get HOD
+        self._currentHOD = self._effectiveDatetime.hour
+        # get MOH
+        self._currentMOH = self._effectiveDatetime.minute
+        # get seconds left in day
+        self._secondsLeftDay = int(((datetime(self._effectiveDatetime.year, self._effectiveDatetime.month, self._effectiveDatetime.day) + timedelta(days=1)) - self._effectiveDatetime).total_seconds())
+        # get seconds left in hour
+        self._secondsLeftHour = int(((self._effectiveDatetime + timedelta(hours=1)).replace(microsecond=0, second=0, minute=0) - self._effectiveDatetime).total_seconds())
+        # how many seconds are in this hour
+        self._secondsInHour = int((self._effectiveDatetime - self._effectiveDatetime.replace(microsecond=0, second=0, minute=0)).total_seconds())
+
+    def setCheckDatetime(self, pDatetime):
+        """Set simulated time"""
+        # set
+        self._checkDatetime = pDatetime
+        # calculate
+        self.refreshTimekprRuntimeVariables()
+
+    def setConfiguration(self, pDayHours, pDayLimits, pWeekLimit, pMonthLimit):
+        """Set up schedule and limits (the same way as from configuration)"""
+        # days
+        for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";"):
+            # limits and hours
+            self._timekprUserData[rDay][cons.TK_CTRL_LIMITD] = pDayLimits[rDay]
+            self._timekprUserSchedule.setDayHours(rDay, pDayHours[rDay])
+        # limits
+        self._timekprUserData[cons.TK_CTRL_LIMITW] = pWeekLimit
+        self._timekprUserData[cons.TK_CTRL_LIMITM] = pMonthLimit
+        # schedule changed, time left needs full calculation
+        self._timeLeftCache = None
+
+    def setSpent(self, pSpentDay, pSpentWeek, pSpentMonth):
+        """Set time spent"""
+        # day
+        for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";"):
+            self._timekprUserData[rDay][cons.TK_CTRL_SPENTBD] = pSpentDay[rDay]
+        # week and month
+        self._timekprUserData[cons.TK_CTRL_SPENTW] = pSpentWeek
+        self._timekprUserData[cons.TK_CTRL_SPENTM] = pSpentMonth
+
+    def getTimesLeft(self):
+        """Get calculated time left (continuous, this day, next day)"""
+        # result
+        return (self._timekprUserData[cons.TK_CTRL_LEFT], self._timekprUserData[self._currentDOW][cons.TK_CTRL_LEFTD], self._timekprUserData[self._timekprUserData[self._currentDOW][cons.TK_CTRL_NDAY]][cons.TK_CTRL_LEFTD])
+
+
+def _getRandomHours(pRandom):
+    """Get random allowed hours of the day (full hours are more common, so time is often continuous)"""
+    # hours
+    hours = {}
+    # day kind: all hours, none, random
+    dayKind = pRandom.random()
+    # loop through hours
+    for rHour in range(0, 23+1):
+        # skip some
+        if dayKind < 0.1 or (dayKind >= 0.3 and pRandom.random() < 0.3):
+            continue
+        # minutes
+        if dayKind < 0.3 or pRandom.random() < 0.6:
+            startMin, endMin = 0, 60
+        else:
+            startMin = pRandom.choice((0, 0, pRandom.randint(0, 59)))
+            endMin = pRandom.choice((60, 60, pRandom.randint(startMin, 60)))
+        # hour
+        hours[str(rHour)] = {cons.TK_CTRL_SMIN: startMin, cons.TK_CTRL_EMIN: endMin, cons.TK_CTRL_UACC: False}
+    # result
+    return hours
+
+
+def _getRandomLimit(pRandom, pMax):
+    """Get random limit (exhausted, small or large ones are common)"""
+    # result
+    return pRandom.choice((0, pRandom.randint(0, 1800), pRandom.randint(0, pMax), pMax))
+
+
+def runCheck(pCases, pTicks, pSeed):
+    """Drive random schedules, limits and ticks through incremental and full calculation and compare the results"""
+    # def
+    rnd = random.Random(pSeed)
+    # coverage of interesting cases
+    stats = {"ticks": 0, "incremental": 0, "nothing left": 0, "continuous to next day": 0}
+
+    # cases
+    for rCase in range(0, pCases):
+        # start time
+        checkDatetime = TK_CHECK_START + timedelta(seconds=rnd.randint(0, 7 * 86400))
+        # users: one calculates incrementally, the other one always fully
+        incrementalUser = timekprCheckedUser(checkDatetime)
+        fullUser = timekprCheckedUser(checkDatetime)
+        # spent
+        spentDay = {rDay: rnd.randint(0, 3600) for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";")}
+        spentWeek = spentMonth = 0
+
+        # ticks
+        for rTick in range(0, pTicks):
+            # configuration changes (on start and once in a while)
+            if rTick == 0 or rnd.random() < 0.02:
+                # configuration
+                configuration = ({rDay: _getRandomHours(rnd) for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";")}, {rDay: _getRandomLimit(rnd, cons.TK_LIMIT_PER_DAY) for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";")}, _getRandomLimit(rnd, cons.TK_LIMIT_PER_WEEK), _getRandomLimit(rnd, cons.TK_LIMIT_PER_MONTH))
+                # set up
+                incrementalUser.setConfiguration(*configuration)
+                fullUser.setConfiguration(*configuration)
+                # new week / month
+                spentWeek = spentMonth = 0
+
+            # time goes on
+            tickLen = rnd.randint(*rnd.choice(TK_CHECK_TICKS))
+            checkDatetime += timedelta(seconds=tickLen)
+            # user is active (time is spent)
+            if rnd.random() < 0.5:
+                # spent (mostly poll intervals, so limits are not exhausted too soon)
+                spent = min(tickLen, 3 if rnd.random() < 0.9 else tickLen)
+                spentDay[str(checkDatetime.isoweekday())] += spent
+                spentWeek += spent
+                spentMonth += spent
+
+            # calculate
+            for rUser in (incrementalUser, fullUser):
+                # time and spent
+                rUser.setCheckDatetime(checkDatetime)
+                rUser.setSpent(spentDay, spentWeek, spentMonth)
+            # incremental calculation is used when possible
+            incremental = incrementalUser._timeLeftCache is not None and incrementalUser._timeLeftCache[:2] == (incrementalUser._currentDOW, incrementalUser._currentHOD)
+            incrementalUser.recalculateTimeLeft()
+            # full calculation every time
+            fullUser._timeLeftCache = None
+            fullUser.recalculateTimeLeft()
+
+            # compare
+            incrementalLeft = incrementalUser.getTimesLeft()
+            fullLeft = fullUser.getTimesLeft()
+            if incrementalLeft != fullLeft:
+                raise AssertionError("case %i, tick %i (%s): incremental (left, day, next day) %s != full %s, config: %s, spent: %s / %i / %i" % (rCase, rTick, checkDatetime, str(incrementalLeft), str(fullLeft), str(configuration), str(spentDay), spentWeek, spentMonth))
+
+            # stats
+            stats["ticks"] += 1
+            stats["incremental"] += 1 if incremental else 0
+            stats["nothing left"] += 1 if fullLeft[1] == 0 else 0
+            stats["continuous to next day"] += 1 if fullLeft[0] > fullUser._secondsLeftDay else 0
+
+    # result
+    return stats
+
+
+# main start
+if __name__ == "__main__":
+    # arguments
+    parser = argparse.ArgumentParser(description="Check that incremental time left calculation matches the full one on random schedules, limits and ticks")
+    parser.add_argument("--cases", type=int, default=500, help="random configurations to check")
+    parser.add_argument("--ticks", type=int, default=200, help="ticks per configuration")
+    parser.add_argument("--seed", type=int, default=None, help="random seed (to reproduce a failure)")
+    args = parser.parse_args()
+
+    # seed
+    seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+    log.consoleOut("seed: %i" % (seed))
+    # check
+    stats = runCheck(args.cases, args.ticks, seed)
+    # report
+    log.consoleOut(", ".join("%s: %i" % (rKey, rValue) for rKey, rValue in stats.items()))
+    # all interesting cases must have been checked
+    if min(stats.values()) == 0:
+        raise AssertionError("not all cases were covered, increase --cases or --ticks")
+    log.consoleOut("incremental and full calculations match")
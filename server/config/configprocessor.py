@@ -10,6 +10,7 @@ from timekpr.common.utils.config import timekprUserConfig
 from timekpr.common.utils.config import timekprUserControl
 from timekpr.common.utils.config import timekprConfig
 from timekpr.common.constants import messages as msg
+from timekpr.server.user.schedule import timekprIntervalIndex
 
 # imports
 from datetime import datetime
@@ -113,18 +114,12 @@ class timekprUserConfigurationProcessor(object):
             allowedWeekDayLimits.pop()
 
         # calc
-        availableSeconds = 0
         availableSecondsAlt = 0
-        # count available seconds for intervals starting this hour
-        for rHour in range(dtn.hour, 24):
-            # calc from now
-            if str(rHour) in allowedHours:
-                # for current hour we have to take care of time in progress at the moment
-                if rHour == dtn.hour:
-                    availableSeconds += max((max(allowedHours[str(rHour)][cons.TK_CTRL_EMIN], dtn.minute) - max(allowedHours[str(rHour)][cons.TK_CTRL_SMIN], dtn.minute)) * 60 - dtn.second, 0)
-                # for the rest of hours, current secs and mins are not important
-                else:
-                    availableSeconds += ((allowedHours[str(rHour)][cons.TK_CTRL_EMIN] - allowedHours[str(rHour)][cons.TK_CTRL_SMIN]) * 60)
+        # index intervals for today
+        intervals = timekprIntervalIndex()
+        intervals.setDayIntervals(currDay, allowedHours)
+        # count available seconds for intervals from now
+        availableSeconds = intervals.getAvailableSeconds(currDay, dtn.hour * 3600 + dtn.minute * 60 + dtn.second)
         # calculate available seconds from todays limit
         if currDay in allowedWeekDays:
             availableSecondsAlt = allowedWeekDayLimits[allowedWeekDays.index(currDay)]
@@ -9,9 +9,9 @@ import os
 from gi.repository import GLib
 from dbus.mainloop.glib import DBusGMainLoop
 import dbus.service
-import time
 import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # timekpr imports
@@ -72,6 +72,14 @@ class timekprDaemon(dbus.service.Object):
         self._timekprUserRestrictionList = {}
         # PlayTime config
         self._timekprPlayTimeConfig = None
+        # pool for checking users in parallel
+        self._timekprUserWorkerPool = None
+        # worker wake up (when something changes before next check is due)
+        self._timekprWorkerWakeUp = threading.Event()
+        # in how many seconds next check is due
+        self._timekprNextCheckDelay = 0
+        # timing of work phases
+        self._timekprSpanRecorder = misc.timekprSpanRecorder()
 
         # ## initialization ##
         # configuration init
@@ -92,12 +100,21 @@ class timekprDaemon(dbus.service.Object):
 
         # PT config
         self._timekprPlayTimeConfig = timekprPlayTimeConfig(self._timekprConfig)
+
+        # users are checked in parallel only when asked to
+        userWorkers = max(self._timekprConfig.getTimekprUserWorkers(), 1)
+        if userWorkers > 1:
+            self._timekprUserWorkerPool = ThreadPoolExecutor(max_workers=userWorkers, thread_name_prefix="timekpr-user")
+            log.log(cons.TK_LOG_LEVEL_INFO, "users will be checked in parallel (workers: %i)" % (userWorkers))
+
         log.log(cons.TK_LOG_LEVEL_DEBUG, "finish init daemon data")
 
     def finishTimekpr(self, signal=None, frame=None):
         """Exit timekpr gracefully"""
         # show all threads that we are exiting
         self._finishExecution = True
+        # do not let worker wait
+        self._timekprWorkerWakeUp.set()
         # exit main loop
         self._timekprMainLoop.quit()
         log.log(cons.TK_LOG_LEVEL_INFO, "main loop shut down")
@@ -121,18 +138,20 @@ class timekprDaemon(dbus.service.Object):
         """Execute all the logic of timekpr"""
         log.log(cons.TK_LOG_LEVEL_INFO, "start up worker thread")
         # def
-        execLen = timedelta(0, 0, 0)
+        execLen = 0
         execCnt = 0
+        # monotonic clock for ticks (not affected by system time changes)
+        tickClock = misc.timekprTickClock()
         # we execute tasks until not asked to stop
         while not self._finishExecution:
             # perf
-            dtsm = time.time()
-            dts = datetime.now()
-            log.log(cons.TK_LOG_LEVEL_INFO, "--- start working on users ---")
+            lateness = tickClock.startTick()
+            log.log(cons.TK_LOG_LEVEL_INFO, "--- start working on users (late: %.3fs) ---" % (lateness))
 
             # do the actual work
             try:
-                self.checkUsers()
+                with self._timekprSpanRecorder.span("checkUsers"):
+                    self.checkUsers()
             except Exception:
                 log.log(cons.TK_LOG_LEVEL_INFO, "---=== ERROR in \"executeTimekprWorker\" working on users ===---")
                 log.log(cons.TK_LOG_LEVEL_INFO, traceback.format_exc())
@@ -141,16 +160,31 @@ class timekprDaemon(dbus.service.Object):
             # periodically flush the file
             log.autoFlushLogFile()
 
+            # polling pause is poll time, unless nothing is about to change for any user (then it's up to max poll time)
+            pollTime = max(self._timekprConfig.getTimekprPollTime(), min(self._timekprNextCheckDelay, self._timekprConfig.getTimekprPollTimeMax()))
+
             # perf
             lavg = os.getloadavg()
-            perf = datetime.now() - dts
+            perf = tickClock.finishTick(pollTime)
             execCnt += 1
             execLen += perf
 
-            log.log(cons.TK_LOG_LEVEL_INFO, "--- end working on users (ela: %s) ---" % (str(perf)))
-            log.log(cons.TK_LOG_LEVEL_DEBUG, "--- perf: avg ela: %s, loadavg: %s, %s, %s ---" % (str(execLen/execCnt), lavg[0], lavg[1], lavg[2]))
-            # take a polling pause (try to do that exactly every 3 secs)
-            time.sleep(self._timekprConfig.getTimekprPollTime() - min(time.time() - dtsm, self._timekprConfig.getTimekprPollTime() / 2))
+            log.log(cons.TK_LOG_LEVEL_INFO, "--- end working on users (ela: %s) ---" % (str(timedelta(seconds=perf))))
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "--- perf: avg ela: %s, loadavg: %s, %s, %s ---" % (str(timedelta(seconds=execLen/execCnt)), lavg[0], lavg[1], lavg[2]))
+            # log phase statistics from time to time
+            if execCnt % cons.TK_TICK_STATS_CNT == 0:
+                self._timekprSpanRecorder.logSpanStatistics()
+                misc.logDBUSTimeStatistics()
+            # take a polling pause (ticks are kept at fixed rate), changes may wake us up earlier
+            if self._timekprWorkerWakeUp.wait(tickClock.getSleepTime()):
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "worker woken up before next check was due")
+            self._timekprWorkerWakeUp.clear()
+
+        # stop user workers
+        if self._timekprUserWorkerPool is not None:
+            self._timekprUserWorkerPool.shutdown()
+        # stop PlayTime scanner
+        self._timekprPlayTimeConfig.finishPlayTimeScanner()
 
         log.log(cons.TK_LOG_LEVEL_INFO, "worker shut down")
         # finish logging
@@ -178,7 +212,8 @@ class timekprDaemon(dbus.service.Object):
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start checkUsers")
 
         # get user list
-        wasConnectionLost, userList = self._timekprLoginManager.getUserList()
+        with self._timekprSpanRecorder.span("getUserList"):
+            wasConnectionLost, userList = self._timekprLoginManager.getUserList()
         # if we had a disaster, remove all users because connection to DBUS was lost
         if wasConnectionLost:
             # logging
@@ -195,7 +230,10 @@ class timekprDaemon(dbus.service.Object):
         # if global switch is enabled, we need to refresh processes at some iterval (method determines that by itself)
         if self._timekprConfig.getTimekprPlayTimeEnabled():
             # refresh PT process list
-            self._timekprPlayTimeConfig.processPlayTimeActivities()
+            with self._timekprSpanRecorder.span("playTimeScan"):
+                self._timekprPlayTimeConfig.processPlayTimeActivities()
+            # how old the matches checks use are (shows whether background scanner keeps up with checks)
+            self._timekprSpanRecorder.addSpan("playTimeSnapshotAge", self._timekprPlayTimeConfig.getPlayTimeSnapshotAge())
 
         # add new users to track
         for rUserName, userDict in userList.items():
@@ -218,7 +256,9 @@ class timekprDaemon(dbus.service.Object):
                     userDict[cons.TK_CTRL_UNAME],
                     userDict[cons.TK_CTRL_UPATH],
                     self._timekprConfig,
-                    self._timekprPlayTimeConfig
+                    self._timekprPlayTimeConfig,
+                    self._timekprSpanRecorder,
+                    self._wakeUpWorker
                 )
 
                 # adjust config
@@ -237,46 +277,30 @@ class timekprDaemon(dbus.service.Object):
             self._timekprUserList[rUserName].deInitUser()
             # delete users that left
             self._timekprUserList.pop(rUserName)
+            # timing of the user is not needed anymore
+            self._timekprSpanRecorder.removeUserSpans(rUserName)
             # remove if exists
             if rUserName in self._timekprUserRestrictionList:
                 # delete from killing list as well
                 self._timekprUserRestrictionList.pop(rUserName)
 
-        # go through all users
-        for rUserName in self._timekprUserList:
-            # init variables for user
-            self._timekprUserList[rUserName].refreshTimekprRuntimeVariables()
+        # users to check
+        userNames = list(self._timekprUserList)
+        # evaluate users (blocking login1 calls, file saves and notifications), in parallel if configured
+        if self._timekprUserWorkerPool is not None and len(userNames) > 1:
+            userStates = dict(zip(userNames, self._timekprUserWorkerPool.map(self._evaluateUser, userNames)))
+        else:
+            userStates = {rUserName: self._evaluateUser(rUserName) for rUserName in userNames}
 
-            # adjust time spent
-            userActiveEffective, userActiveActual, userScreenLocked = self._timekprUserList[rUserName].adjustTimeSpentActual(self._timekprConfig)
-            # recalculate time left
-            self._timekprUserList[rUserName].recalculateTimeLeft()
-            # process actual user session variable validation
-            self._timekprUserList[rUserName].revalidateUserSessionAttributes()
+        # next check is due when something can change for any user (max poll time if there are no users)
+        nextCheckDelay = self._timekprConfig.getTimekprPollTimeMax()
 
-            # get stats for user
-            timeLeftArray = self._timekprUserList[rUserName].getTimeLeft()
-            timeLeftToday = timeLeftArray[0]
-            timeLeftInARow = timeLeftArray[1]
-            timeHourUnaccounted = timeLeftArray[6]
-            timePTActivityCnt = 0
-
-            # PlayTime left validation
-            if self._timekprConfig.getTimekprPlayTimeEnabled():
-                # get time left for PLayTime
-                timeLeftPT, isPTEnabled, isPTAccounted, isPTActive = self._timekprUserList[rUserName].getPlayTimeLeft()
-                # enabled and active for user
-                if isPTEnabled and isPTActive:
-                    # if there is no time left (compare to almost ultimate answer)
-                    # or hour is unaccounted and PT is not allowed in those hours
-                    if (isPTAccounted and timeLeftPT < 0.0042) or (timeHourUnaccounted and not self._timekprUserList[rUserName].getUserPlayTimeUnaccountedIntervalsEnabled()):
-                        # killing processes
-                        self._timekprPlayTimeConfig.killPlayTimeProcesses(self._timekprUserList[rUserName].getUserId())
-                    else:
-                        # active count
-                        timePTActivityCnt = self._timekprPlayTimeConfig.getMatchedUserProcessCnt(self._timekprUserList[rUserName].getUserId())
-            # set process count (in case PT was disable in-flight or it has changed)
-            self._timekprUserList[rUserName].setPlayTimeActiveActivityCnt(timePTActivityCnt)
+        # go through all users (restrictions are processed one after another)
+        for rUserName in userNames:
+            # user state
+            userActiveEffective, userActiveActual, userScreenLocked, timeLeftToday, timeLeftInARow, timeHourUnaccounted = userStates[rUserName]
+            # when next check for user is due
+            nextCheckDelay = min(nextCheckDelay, self._timekprUserList[rUserName].getNextCheckDelay(userActiveActual))
 
             # logging
             log.log(cons.TK_LOG_LEVEL_DEBUG, "user \"%s\", active: %s/%s/%s (act/eff/lck), huacc: %s, tleft: %i" % (rUserName, str(userActiveActual), str(userActiveEffective), str(userScreenLocked), str(timeHourUnaccounted), timeLeftInARow))
@@ -331,8 +355,67 @@ class timekprDaemon(dbus.service.Object):
                     # process users
                     GLib.timeout_add_seconds(1, self._restrictUsers)
 
+        # users with restrictions are checked every poll
+        self._timekprNextCheckDelay = 0 if self._timekprUserRestrictionList else nextCheckDelay
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "next check is due in %is" % (self._timekprNextCheckDelay))
+
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish checkUsers")
 
+    def _wakeUpWorker(self):
+        """Ask worker to check users right away"""
+        # wake up
+        self._timekprWorkerWakeUp.set()
+
+    def _evaluateUser(self, pUserName):
+        """Account time and calculate time left for one user (this is safe to run for different users in parallel)"""
+        # measure the whole evaluation
+        with self._timekprSpanRecorder.span("evaluateUser", pUserName):
+            return self._evaluateUserTimes(pUserName)
+
+    def _evaluateUserTimes(self, pUserName):
+        """Account time and calculate time left for one user"""
+        # user
+        timekprUser = self._timekprUserList[pUserName]
+
+        # init variables for user
+        timekprUser.refreshTimekprRuntimeVariables()
+
+        # adjust time spent
+        userActiveEffective, userActiveActual, userScreenLocked = timekprUser.adjustTimeSpentActual(self._timekprConfig)
+        # recalculate time left
+        timekprUser.recalculateTimeLeft()
+        # process actual user session variable validation
+        timekprUser.revalidateUserSessionAttributes()
+
+        # get stats for user
+        timeLeftArray = timekprUser.getTimeLeft()
+        timeLeftToday = timeLeftArray[0]
+        timeLeftInARow = timeLeftArray[1]
+        timeHourUnaccounted = timeLeftArray[6]
+        timePTActivityCnt = 0
+
+        # PlayTime left validation
+        if self._timekprConfig.getTimekprPlayTimeEnabled():
+            # get time left for PLayTime
+            timeLeftPT, isPTEnabled, isPTAccounted, isPTActive = timekprUser.getPlayTimeLeft()
+            # processes are scanned more often when user is near the limit (PlayTime in override mode is not limited, unless it's not allowed in unaccounted hours)
+            self._timekprPlayTimeConfig.setUserPlayTimeLeft(timekprUser.getUserId(), (0 if timeHourUnaccounted and not timekprUser.getUserPlayTimeUnaccountedIntervalsEnabled() else timeLeftPT if isPTAccounted else None) if isPTEnabled else None)
+            # enabled and active for user
+            if isPTEnabled and isPTActive:
+                # if there is no time left (compare to almost ultimate answer)
+                # or hour is unaccounted and PT is not allowed in those hours
+                if (isPTAccounted and timeLeftPT < 0.0042) or (timeHourUnaccounted and not timekprUser.getUserPlayTimeUnaccountedIntervalsEnabled()):
+                    # killing processes
+                    self._timekprPlayTimeConfig.killPlayTimeProcesses(timekprUser.getUserId())
+                else:
+                    # active count
+                    timePTActivityCnt = self._timekprPlayTimeConfig.getMatchedUserProcessCnt(timekprUser.getUserId())
+        # set process count (in case PT was disable in-flight or it has changed)
+        timekprUser.setPlayTimeActiveActivityCnt(timePTActivityCnt)
+
+        # result
+        return userActiveEffective, userActiveActual, userScreenLocked, timeLeftToday, timeLeftInARow, timeHourUnaccounted
+
     def _restrictUsers(self):
         """Terminate user sessions"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start user killer")
@@ -1389,6 +1472,27 @@ class timekprDaemon(dbus.service.Object):
 
     # --------------- DBUS helper methods --------------- #
 
+    @dbus.service.method(cons.TK_DBUS_ADMIN_INTERFACE, in_signature="", out_signature="isa{sad}")
+    def getTimekprPerformanceStatistics(self):
+        """Get timing statistics (count, p50, p95, p99, max in seconds) of work phases, overall and per user"""
+        # default
+        result = 0
+        message = ""
+        spanStats = {}
+        try:
+            # get stats
+            spanStats = self._timekprSpanRecorder.getSpanStatistics()
+        except Exception as unexpectedException:
+            # logging
+            log.log(cons.TK_LOG_LEVEL_INFO, "Unexpected ERROR (%s): %s" % (misc.whoami(), str(unexpectedException)))
+
+            # result
+            result = -1
+            message = msg.getTranslation("TK_MSG_CONFIG_LOADER_UNEXPECTED_ERROR")
+
+        # result
+        return result, message, spanStats
+
     @dbus.service.method(cons.TK_DBUS_ADMIN_INTERFACE, in_signature="s", out_signature="")
     def logCachedProcesses(self, pUserId):
         """Return cached PIDs and CMDLINEs"""
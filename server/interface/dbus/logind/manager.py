@@ -31,7 +31,7 @@ class timekprUserLoginManager(object):
         self._connectionRetryCount = 0
 
         # dbus initialization
-        self._timekprBus = dbus.SystemBus()
+        self._timekprBus = (dbus.SessionBus() if (cons.TK_DEV_ACTIVE and cons.TK_DEV_BUS == "ses" and cons.TK_DEV_L1_BUS == "ses") else dbus.SystemBus())
 
         # init connections
         self._initDbusConnections()
@@ -49,20 +49,16 @@ class timekprUserLoginManager(object):
         try:
             log.log(cons.TK_LOG_LEVEL_DEBUG, "getting login1 object on DBUS")
             # dbus performance measurement
-            misc.measureDBUSTimeElapsed(pStart=True)
-            # try to get real connection to our objects and interface
-            self._login1Object = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, cons.TK_DBUS_L1_PATH)
-            # measurement logging
-            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_L1_OBJECT)
+            with misc.measureDBUSTime(cons.TK_DBUS_L1_OBJECT):
+                # try to get real connection to our objects and interface
+                self._login1Object = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, cons.TK_DBUS_L1_PATH)
 
             log.log(cons.TK_LOG_LEVEL_DEBUG, "getting login1 interface on DBUS")
 
             # dbus performance measurement
-            misc.measureDBUSTimeElapsed(pStart=True)
-            # interface
-            self._login1ManagerInterface = dbus.Interface(self._login1Object, cons.TK_DBUS_L1_MANAGER_INTERFACE)
-            # measurement logging
-            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_L1_MANAGER_INTERFACE)
+            with misc.measureDBUSTime(cons.TK_DBUS_L1_MANAGER_INTERFACE):
+                # interface
+                self._login1ManagerInterface = dbus.Interface(self._login1Object, cons.TK_DBUS_L1_MANAGER_INTERFACE)
 
             log.log(cons.TK_LOG_LEVEL_DEBUG, "got interface, login1 successfully set up")
 
@@ -137,53 +133,41 @@ class timekprUserLoginManager(object):
         userSessions = []
 
         # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get dbus object
-        login1UserObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pUserPath)
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=pUserPath)
+        with misc.measureDBUSTime(cons.TK_DBUS_L1_OBJECT):
+            # get dbus object
+            login1UserObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pUserPath)
 
         # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get dbus interface for properties
-        login1UserInterface = dbus.Interface(login1UserObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_PROPERTIES_INTERFACE)
+        with misc.measureDBUSTime(cons.TK_DBUS_PROPERTIES_INTERFACE):
+            # get dbus interface for properties
+            login1UserInterface = dbus.Interface(login1UserObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
 
         # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get all user sessions
-        login1UserSessions = login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "Sessions")
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_USER_OBJECT)
+        with misc.measureDBUSTime(cons.TK_DBUS_USER_OBJECT):
+            # get all user sessions
+            login1UserSessions = login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "Sessions")
 
         # go through all user sessions
         for rUserSession in login1UserSessions:
             # dbus performance measurement
-            misc.measureDBUSTimeElapsed(pStart=True)
-            # get dbus object
-            login1SessionObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, str(rUserSession[1]))
-            # measurement logging
-            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=str(rUserSession[1]))
+            with misc.measureDBUSTime(cons.TK_DBUS_L1_OBJECT):
+                # get dbus object
+                login1SessionObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, str(rUserSession[1]))
 
             # dbus performance measurement
-            misc.measureDBUSTimeElapsed(pStart=True)
-            # get dbus interface for properties
-            login1SessionInterface = dbus.Interface(login1SessionObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
-            # measurement logging
-            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_PROPERTIES_INTERFACE)
+            with misc.measureDBUSTime(cons.TK_DBUS_PROPERTIES_INTERFACE):
+                # get dbus interface for properties
+                login1SessionInterface = dbus.Interface(login1SessionObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
 
             # get all user session properties
             try:
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # properties
-                sessionType = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Type"))
-                sessionVTNr = str(int(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "VTNr")))
-                sessionSeat = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Seat")[0])
-                sessionState = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "State"))
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_SESSION_OBJECT)
+                with misc.measureDBUSTime(cons.TK_DBUS_SESSION_OBJECT):
+                    # properties
+                    sessionType = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Type"))
+                    sessionVTNr = str(int(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "VTNr")))
+                    sessionSeat = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Seat")[0])
+                    sessionState = str(login1SessionInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "State"))
 
                 # add user session to return list
                 userSessions.append({"sessionId": str(rUserSession[0]), "sessionPath": str(rUserSession[1]), "type": sessionType, "vtnr": sessionVTNr, "seat": sessionSeat, "state": sessionState})
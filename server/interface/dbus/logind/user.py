@@ -16,26 +16,22 @@ from timekpr.common.utils import misc
 class timekprUserManager(object):
     """A connection with login1 and other DBUS servers."""
 
-    def __init__(self, pUserName, pUserPathOnBus):
+    def __init__(self, pUserName, pUserPathOnBus, pUseSessionEvents=False, pSessionEventFn=None):
         """Initialize manager."""
 
         # save the bus and user
-        self._timekprBus = dbus.SystemBus()
+        self._timekprBus = (dbus.SessionBus() if (cons.TK_DEV_ACTIVE and cons.TK_DEV_BUS == "ses" and cons.TK_DEV_L1_BUS == "ses") else dbus.SystemBus())
         self._userName = pUserName
 
         # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get dbus object
-        self._login1UserObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pUserPathOnBus)
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_L1_OBJECT)
+        with misc.measureDBUSTime(cons.TK_DBUS_L1_OBJECT):
+            # get dbus object
+            self._login1UserObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pUserPathOnBus)
 
         # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get dbus interface for properties
-        self._login1UserInterface = dbus.Interface(self._login1UserObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_PROPERTIES_INTERFACE)
+        with misc.measureDBUSTime(cons.TK_DBUS_PROPERTIES_INTERFACE):
+            # get dbus interface for properties
+            self._login1UserInterface = dbus.Interface(self._login1UserObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
 
         # user sessions & additional DBUS objects
         self._timekprUserSessions = {}
@@ -46,20 +42,214 @@ class timekprUserManager(object):
         self._scrRetryCnt = 0
         self._sessionLockedStateAvailable = None
 
-    def cacheUserSessionList(self):
+        # session state tracking by login1 events
+        self._useSessionEvents = pUseSessionEvents
+        # who to inform about session state changes
+        self._sessionEventFn = pSessionEventFn
+        # user level signal subscriptions
+        self._userSignalMatches = []
+        # cached user properties (filled and maintained only when events are used)
+        self._userProperties = {}
+        # whether session list has to be read from login1
+        self._sessionListChanged = True
+        # checks left till full re-read of session state
+        self._sessionResyncCnt = cons.TK_SESSION_EVENTS_RESYNC_CNT
+        # count of processed events (properties read while events arrive are not cached)
+        self._propertyEventCnt = 0
+
+        # subscribe to events
+        if self._useSessionEvents:
+            # user property changes
+            self._userSignalMatches.append(self._timekprBus.add_signal_receiver(self._userPropertiesChanged, signal_name="PropertiesChanged", dbus_interface=cons.TK_DBUS_PROPERTIES_INTERFACE, bus_name=cons.TK_DBUS_L1_OBJECT, path=pUserPathOnBus))
+            # session additions and removals
+            for rSignal in ("SessionNew", "SessionRemoved"):
+                self._userSignalMatches.append(self._timekprBus.add_signal_receiver(self._sessionListUpdated, signal_name=rSignal, dbus_interface=cons.TK_DBUS_L1_MANAGER_INTERFACE, bus_name=cons.TK_DBUS_L1_OBJECT, path=cons.TK_DBUS_L1_PATH))
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "session state for \"%s\" is tracked by login1 events" % (self._userName))
+
+    def deInitUser(self):
+        """Release event subscriptions"""
+        # remove session subscriptions
+        for rSessionId in self._timekprUserSessions:
+            self._removeSessionSignalMatch(rSessionId)
+        # remove user subscriptions
+        for rSignalMatch in self._userSignalMatches:
+            rSignalMatch.remove()
+        # nothing is subscribed
+        self._userSignalMatches = []
+
+    # --------------- login1 event handlers (executed in main loop) --------------- #
+
+    def _userPropertiesChanged(self, pInterface, pChangedProperties, pInvalidatedProperties):
+        """Update cached user properties from login1 event"""
+        # we care only about user properties
+        if pInterface != cons.TK_DBUS_USER_OBJECT:
+            return
+        # properties being read may be outdated already
+        self._propertyEventCnt += 1
+        # invalidated properties do not carry values, they will be read again
+        if pInvalidatedProperties:
+            self._userProperties = {}
+        # update only what we have (partial properties are read again anyway)
+        elif self._userProperties:
+            # new values
+            userProperties = self._userProperties.copy()
+            userProperties.update(self._normalizeUserProperties(pChangedProperties))
+            self._userProperties = userProperties
+        # session list is part of the user
+        if "Sessions" in pChangedProperties or "Sessions" in pInvalidatedProperties:
+            self._sessionListChanged = True
+        # inform about the change
+        self._processSessionEvent()
+
+    def _sessionListUpdated(self, pSessionId, pSessionPath):
+        """Mark session list for re-read when login1 adds or removes a session"""
+        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "session list changed (%s), user \"%s\" sessions will be re-read" % (str(pSessionId), self._userName))
+        # owner of the new session is not known, sessions will be read on next check
+        self._sessionListChanged = True
+        # inform about the change
+        self._processSessionEvent()
+
+    def _sessionPropertiesChanged(self, pInterface, pChangedProperties, pInvalidatedProperties, pSessionId):
+        """Update cached session properties from login1 event"""
+        # we care only about session properties of sessions we know of
+        session = self._timekprUserSessions.get(pSessionId)
+        if pInterface != cons.TK_DBUS_SESSION_OBJECT or session is None:
+            return
+        # properties being read may be outdated already
+        self._propertyEventCnt += 1
+        # login1 does not send changes of session State (it sends Active, IdleHint, LockedHint), so all properties are read again
+        session[cons.TK_CTRL_DBUS_SESS_DPROP] = {}
+        # inform about the change
+        self._processSessionEvent()
+
+    def _processSessionEvent(self):
+        """Inform interested party that session state has changed"""
+        # inform
+        if self._sessionEventFn is not None:
+            self._sessionEventFn()
+
+    # --------------- property helpers --------------- #
+
+    def _normalizeUserProperties(self, pProperties):
+        """Convert login1 user properties to values used in checks"""
+        # result
+        userProperties = {}
+        # convert what is present
+        if "State" in pProperties:
+            userProperties["State"] = str(pProperties["State"])
+        if "IdleHint" in pProperties:
+            userProperties["IdleHint"] = str(bool(pProperties["IdleHint"]))
+        if "Sessions" in pProperties:
+            userProperties["Sessions"] = [(str(rS[0]), str(rS[1])) for rS in pProperties["Sessions"]]
+        # result
+        return userProperties
+
+    def _normalizeSessionProperties(self, pProperties):
+        """Convert login1 session properties to values used in checks"""
+        # result
+        sessionProperties = {}
+        # convert what is present
+        for rProp in ("Type", "State"):
+            if rProp in pProperties:
+                sessionProperties[rProp] = str(pProperties[rProp])
+        for rProp in ("IdleHint", "LockedHint"):
+            if rProp in pProperties:
+                sessionProperties[rProp] = str(bool(pProperties[rProp]))
+        # not locked, if locked state is not available
+        if not self._sessionLockedStateAvailable:
+            sessionProperties["LockedHint"] = "False"
+        # result
+        return sessionProperties
+
+    def _removeSessionSignalMatch(self, pSessionId):
+        """Unsubscribe from session events"""
+        # signal match
+        signalMatch = self._timekprUserSessions[pSessionId].get(cons.TK_CTRL_DBUS_SESS_SIG)
+        # remove
+        if signalMatch is not None:
+            signalMatch.remove()
+            self._timekprUserSessions[pSessionId][cons.TK_CTRL_DBUS_SESS_SIG] = None
+
+    def _readSessionProperties(self, pSessionId, pSessionPropertiesInterface):
+        """Read all session properties from login1 in one round trip"""
+        # dbus performance measurement
+        with misc.measureDBUSTime(cons.TK_DBUS_SESSION_OBJECT):
+            # get all properties
+            sessionProperties = pSessionPropertiesInterface.GetAll(cons.TK_DBUS_SESSION_OBJECT)
+
+        # locked state is not available on older systems
+        if self._sessionLockedStateAvailable is None:
+            # state used
+            self._sessionLockedStateAvailable = "LockedHint" in sessionProperties
+            # log the outcome
+            if self._sessionLockedStateAvailable:
+                log.log(cons.TK_LOG_LEVEL_INFO, "INFO: session locked state is available and will be used for idle state detection (if it works)")
+            else:
+                log.log(cons.TK_LOG_LEVEL_INFO, "INFO: session locked state is NOT available, will rely on client screensaver state (if it works)")
+
+        # result
+        return sessionProperties
+
+    def _getUserProperties(self):
+        """Get user properties (from event cache or login1)"""
+        # cached properties
+        userProperties = self._userProperties
+        # read them if not available or session list has changed
+        if not userProperties or self._sessionListChanged:
+            # changes will be picked up (signal may arrive while we read)
+            self._sessionListChanged = False
+            eventCnt = self._propertyEventCnt
+            # dbus performance measurement
+            with misc.measureDBUSTime(cons.TK_DBUS_USER_OBJECT):
+                # get user state and sessions in one go
+                userProperties = self._normalizeUserProperties(self._login1UserInterface.GetAll(cons.TK_DBUS_USER_OBJECT))
+            # cache only when events keep them up to date (and no event arrived while reading)
+            if self._useSessionEvents and eventCnt == self._propertyEventCnt:
+                self._userProperties = userProperties
+        # result
+        return userProperties
+
+    def _getSessionProperties(self, pSessionId):
+        """Get session properties (from event cache or login1)"""
+        # cached properties
+        sessionProperties = self._timekprUserSessions[pSessionId][cons.TK_CTRL_DBUS_SESS_DPROP]
+        # read them if not available
+        if not sessionProperties:
+            # signal may arrive while we read
+            eventCnt = self._propertyEventCnt
+            # get all properties
+            sessionProperties = self._normalizeSessionProperties(self._readSessionProperties(pSessionId, self._timekprUserSessions[pSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF]))
+            # cache only when events keep them up to date (and no event arrived while reading)
+            if self._useSessionEvents and eventCnt == self._propertyEventCnt:
+                self._timekprUserSessions[pSessionId][cons.TK_CTRL_DBUS_SESS_DPROP] = sessionProperties
+        # result
+        return sessionProperties
+
+    def _resyncSessionEvents(self):
+        """Periodically drop event cache and re-read everything from login1 (in case events were missed)"""
+        # count down
+        self._sessionResyncCnt -= 1
+        # time to re-read
+        if self._sessionResyncCnt <= 0:
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "re-reading session state for \"%s\" from login1" % (self._userName))
+            # reset
+            self._sessionResyncCnt = cons.TK_SESSION_EVENTS_RESYNC_CNT
+            self._sessionListChanged = True
+            self._userProperties = {}
+            # drop cached session properties
+            for rSessionId in self._timekprUserSessions:
+                self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_DPROP] = {}
+
+    def cacheUserSessionList(self, pUserSessions=None):
         """Determine user sessions and cache session objects for further reference."""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "---=== start cacheUserSessionList for \"%s\" ===---" % (self._userName))
-        # dbus performance measurement
-        misc.measureDBUSTimeElapsed(pStart=True)
-        # get all user sessions
-        userSessions = self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "Sessions")
-        # measurement logging
-        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_USER_OBJECT)
+        # get all user sessions (if they were not read together with user properties)
+        userSessions = pUserSessions if pUserSessions is not None else self._getUserProperties()["Sessions"]
 
         # extra only
         if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
             # print all sessions
-            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "got %i sessions:%s, start loop" % (len(userSessions), "".join([(" (%s, %s)" % (str(rS[0]), str(rS[1]))) for rS in userSessions])))
+            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "got %i sessions:%s, start loop" % (len(userSessions), "".join([(" (%s, %s)" % (rS[0], rS[1])) for rS in userSessions])))
 
         # init active sessions
         activeSessions = []
@@ -67,8 +257,8 @@ class timekprUserManager(object):
         # go through all user sessions
         for rUserSession in userSessions:
             # sessionId & sessionPath on dbus
-            sessionId = str(rUserSession[0])
-            sessionPath = str(rUserSession[1])
+            sessionId = rUserSession[0]
+            sessionPath = rUserSession[1]
             # save active sessions
             activeSessions.append(sessionId)
 
@@ -76,32 +266,35 @@ class timekprUserManager(object):
             if sessionId not in self._timekprUserSessions:
                 log.log(cons.TK_LOG_LEVEL_DEBUG, "adding session: %s, %s" % (sessionId, sessionPath))
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # get object and interface to save it
-                sessionObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, sessionPath)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_L1_OBJECT)
+                with misc.measureDBUSTime(cons.TK_DBUS_L1_OBJECT):
+                    # get object and interface to save it
+                    sessionObject = self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, sessionPath)
 
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # get object and interface to save it
-                sessionPropertiesInterface = dbus.Interface(sessionObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_PROPERTIES_INTERFACE)
+                with misc.measureDBUSTime(cons.TK_DBUS_PROPERTIES_INTERFACE):
+                    # get object and interface to save it
+                    sessionPropertiesInterface = dbus.Interface(sessionObject, cons.TK_DBUS_PROPERTIES_INTERFACE)
 
                 # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # get dbus interface for Session
-                sessionInterface = dbus.Interface(sessionObject, cons.TK_DBUS_SESSION_OBJECT)
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_SESSION_OBJECT)
+                with misc.measureDBUSTime(cons.TK_DBUS_SESSION_OBJECT):
+                    # get dbus interface for Session
+                    sessionInterface = dbus.Interface(sessionObject, cons.TK_DBUS_SESSION_OBJECT)
 
                 # cache sessions
-                self._timekprUserSessions[sessionId] = {cons.TK_CTRL_DBUS_SESS_OBJ: sessionObject, cons.TK_CTRL_DBUS_SESS_IF: sessionInterface, cons.TK_CTRL_DBUS_SESS_PROP_IF: sessionPropertiesInterface, cons.TK_CTRL_DBUS_SESS_PROP: {}}
+                self._timekprUserSessions[sessionId] = {cons.TK_CTRL_DBUS_SESS_OBJ: sessionObject, cons.TK_CTRL_DBUS_SESS_IF: sessionInterface, cons.TK_CTRL_DBUS_SESS_PROP_IF: sessionPropertiesInterface, cons.TK_CTRL_DBUS_SESS_PROP: {}, cons.TK_CTRL_DBUS_SESS_DPROP: {}, cons.TK_CTRL_DBUS_SESS_SIG: None}
+
+                # subscribe to session property changes (before reading them, so nothing is missed)
+                if self._useSessionEvents:
+                    self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_SIG] = self._timekprBus.add_signal_receiver(lambda pInterface, pChangedProperties, pInvalidatedProperties, pSessionId=sessionId: self._sessionPropertiesChanged(pInterface, pChangedProperties, pInvalidatedProperties, pSessionId), signal_name="PropertiesChanged", dbus_interface=cons.TK_DBUS_PROPERTIES_INTERFACE, bus_name=cons.TK_DBUS_L1_OBJECT, path=sessionPath)
 
+                # get all properties
+                sessionProperties = self._readSessionProperties(sessionId, sessionPropertiesInterface)
                 # add static properties
-                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["VTNr"] = str(int(sessionPropertiesInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "VTNr")))
-                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["Seat"] = str(sessionPropertiesInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Seat")[0])
+                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["VTNr"] = str(int(sessionProperties["VTNr"]))
+                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["Seat"] = str(sessionProperties["Seat"][0])
+                # changing properties are kept up to date by events, so they can be cached right away
+                if self._useSessionEvents:
+                    self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_DPROP] = self._normalizeSessionProperties(sessionProperties)
             else:
                 log.log(cons.TK_LOG_LEVEL_DEBUG, "session already cached: %s" % (sessionId))
 
@@ -111,6 +304,7 @@ class timekprUserManager(object):
         # get rid of sessions not on the list
         for userSession in removableSesssions:
             log.log(cons.TK_LOG_LEVEL_DEBUG, "removing session: %s" % (userSession))
+            self._removeSessionSignalMatch(userSession)
             self._timekprUserSessions.pop(userSession)
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "---=== finish cacheUserSessionList for \"%s\" ===---" % (self._userName))
@@ -120,14 +314,22 @@ class timekprUserManager(object):
         log.log(cons.TK_LOG_LEVEL_DEBUG, "---=== start isUserActive for \"%s\" ===---" % (self._userName))
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "supported session types: %s" % (str(pTimekprConfig.getTimekprSessionsCtrl())))
 
-        # get all user sessions
-        userState = str(self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "State"))
-        userIdleState = str(bool(self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "IdleHint")))
+        # full re-read of event cache from time to time
+        if self._useSessionEvents:
+            self._resyncSessionEvents()
+
+        # whether session list has to be processed (always when polling)
+        sessionListChanged = not self._useSessionEvents or self._sessionListChanged or not self._userProperties
+        # get user state and sessions
+        userProperties = self._getUserProperties()
+        userState = userProperties["State"]
+        userIdleState = userProperties["IdleHint"]
 
         log.log(cons.TK_LOG_LEVEL_DEBUG, "user stats, ul1st: %s, ul1idlhnt: %s, uscrlck: %s" % (userState, userIdleState, str(pIsScreenLocked)))
 
         # cache sessions
-        self.cacheUserSessionList()
+        if sessionListChanged:
+            self.cacheUserSessionList(userProperties["Sessions"])
 
         # to determine if user is active for all sessions:
         #    session must not be "active"
@@ -153,33 +355,14 @@ class timekprUserManager(object):
         else:
             # go through all user sessions
             for rSessionId in self._timekprUserSessions:
-                # not locked
-                sessionLockedState = "False"
-
-                # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
                 # get needed static properties
                 sessionVTNr = self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP]["VTNr"]
                 # get needed properties
-                sessionType = str(self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(cons.TK_DBUS_SESSION_OBJECT, "Type"))
-                sessionState = str(self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(cons.TK_DBUS_SESSION_OBJECT, "State"))
-                sessionIdleState = str(bool(self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(cons.TK_DBUS_SESSION_OBJECT, "IdleHint")))
-                # get locked state, only if it's available
-                if self._sessionLockedStateAvailable or self._sessionLockedStateAvailable is None:
-                    try:
-                        # get locked state
-                        sessionLockedState = str(bool(self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(cons.TK_DBUS_SESSION_OBJECT, "LockedHint")))
-                        # locked state available
-                        if self._sessionLockedStateAvailable is None:
-                            # state used
-                            self._sessionLockedStateAvailable = True
-                            log.log(cons.TK_LOG_LEVEL_INFO, "INFO: session locked state is available and will be used for idle state detection (if it works)")
-                    except:
-                        # locked state not used
-                        self._sessionLockedStateAvailable = False
-                        log.log(cons.TK_LOG_LEVEL_INFO, "INFO: session locked state is NOT available, will rely on client screensaver state (if it works)")
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=rSessionId)
+                sessionProperties = self._getSessionProperties(rSessionId)
+                sessionType = sessionProperties["Type"]
+                sessionState = sessionProperties["State"]
+                sessionIdleState = sessionProperties["IdleHint"]
+                sessionLockedState = sessionProperties["LockedHint"]
 
                 # logging
                 log.log(cons.TK_LOG_LEVEL_DEBUG, "session stats, styp: %s, sVTNr: %s, sl1St: %s, sl1idlst: %s, sl1lckst: %s" % (sessionType, sessionVTNr, sessionState, sessionIdleState, sessionLockedState))
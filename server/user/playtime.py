@@ -6,15 +6,187 @@ Created on Aug 01, 2020
 
 # imports
 import os
-import psutil
-from gi.repository import GLib
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import re
+import traceback
 
 # timekpr imports
 from timekpr.common.log import log
 from timekpr.common.constants import constants as cons
+from timekpr.common.utils import misc
 from timekpr.server.config import userhelper
+from timekpr.server.user.procevents import timekprProcessEventListener
+from timekpr.server.user.procterm import timekprProcessTerminator
+
+
+class timekprPlayTimeFilterMatcher(object):
+    """Matches executable or command line against all PlayTime filters of the user in one pass"""
+
+    # symbols which make filter a regexp (or path), other filters are matched by executable name
+    _NON_LITERAL_CHARS = frozenset(".^$*+?{}[]()|\\/")
+    # filters with back references can not be combined with other filters
+    _NON_COMBINABLE = re.compile(r"\\[1-9]|\(\?P=")
+
+    def __init__(self, pFlts):
+        """Prepare filters for matching (filters are passed as filter: pattern)"""
+        # executable names for literal filters
+        self._literals = {}
+        # all combinable filters in one regexp and its group names
+        self._regexp = None
+        self._regexpGroups = {}
+        # whether there are real regexps in combined regexp (literals need it only for command line)
+        self._hasRegexps = False
+        # filters, which are matched one by one
+        self._separate = []
+        # recent match results per executable / command line (most recent last)
+        self._matchCache = OrderedDict()
+        self._matchCacheLock = threading.Lock()
+
+        # filters to combine
+        combinedFlts = []
+        # go through filters
+        for rFlt, rPattern in pFlts.items():
+            # literal filter (most common case)
+            if not self._NON_LITERAL_CHARS.intersection(rPattern):
+                # first filter wins
+                self._literals.setdefault(rPattern, rFlt)
+            # filter can not be combined (alternatives at top level bind to anchors differently in separate regexps, e.g. "steam|lutris")
+            elif self._NON_COMBINABLE.search(rPattern) or self._hasTopLevelAlternation(rPattern):
+                # match separately
+                self._separate.append((rFlt, self._compileFilter(rPattern)))
+                # next
+                continue
+            # regexp
+            else:
+                # there are regexps
+                self._hasRegexps = True
+            # combine (literals too, they still have to be searched in command line)
+            combinedFlts.append((rFlt, rPattern))
+
+        # combine filters, named groups tell which filter matched
+        if combinedFlts:
+            # the same as separate regexps: whole string, ending after path separator or followed by arguments
+            try:
+                # combined
+                self._regexp = re.compile("^(?:%s)$|[/\\\\](?:%s)(?:$| )" % ("|".join("(?P<a%i>%s)" % (rIdx, rPattern) for rIdx, (rFlt, rPattern) in enumerate(combinedFlts)), "|".join("(?P<b%i>%s)" % (rIdx, rPattern) for rIdx, (rFlt, rPattern) in enumerate(combinedFlts))))
+                # groups
+                for rIdx, (rFlt, rPattern) in enumerate(combinedFlts):
+                    self._regexpGroups["a%i" % (rIdx)] = rFlt
+                    self._regexpGroups["b%i" % (rIdx)] = rFlt
+            except (re.error, OverflowError, RecursionError):
+                # filters do not work together (e.g. they use named groups or inline flags), match them one by one
+                self._regexp = None
+                self._separate.extend([(rFlt, self._compileFilter(rPattern)) for rFlt, rPattern in combinedFlts])
+
+    @staticmethod
+    def _hasTopLevelAlternation(pPattern):
+        """Check whether filter has alternatives outside of groups"""
+        # def
+        depth = 0
+        classStart = None
+        escaped = False
+        # go through pattern
+        for rIdx, rChar in enumerate(pPattern):
+            # escaped char is literal
+            if escaped:
+                escaped = False
+            elif rChar == "\\":
+                escaped = True
+            # char class ("]" right after "[" or "[^" is literal)
+            elif classStart is not None:
+                classStart = None if rChar == "]" and rIdx > classStart + (2 if pPattern[classStart + 1:classStart + 2] == "^" else 1) else classStart
+            elif rChar == "[":
+                classStart = rIdx
+            # groups
+            elif rChar == "(":
+                depth += 1
+            elif rChar == ")":
+                depth = max(depth - 1, 0)
+            # alternative at top level
+            elif rChar == "|" and depth == 0:
+                return True
+        # result
+        return False
+
+    def _compileFilter(self, pPattern):
+        """Compile regexps for one filter"""
+        # whole string, ending after path separator or followed by arguments
+        return [re.compile("^%s$" % (pPattern)), re.compile("[/\\\\]%s$" % (pPattern)), re.compile("[/\\\\]%s " % (pPattern))]
+
+    def matchProcess(self, pExe, pCmdLine=None):
+        """Get filter which matches process executable or command line (results for recent processes are remembered)"""
+        # processes are identified by executable and command line (if it's used)
+        key = (pExe, None if pCmdLine is None else hash(pCmdLine))
+        # try cache
+        with self._matchCacheLock:
+            # cached
+            if key in self._matchCache:
+                # it was used recently
+                self._matchCache.move_to_end(key)
+                # result
+                return self._matchCache[key]
+        # match executable and then command line
+        flt = self.match(pExe)
+        flt = flt if flt is not None or pCmdLine is None else self.match(pCmdLine)
+        # remember
+        with self._matchCacheLock:
+            # save
+            self._matchCache[key] = flt
+            # forget the oldest
+            if len(self._matchCache) > cons.TK_PLAYTIME_MATCH_CACHE_SIZE:
+                self._matchCache.popitem(last=False)
+        # result
+        return flt
+
+    def match(self, pText):
+        """Get filter which matches executable or command line (None if nothing matches)"""
+        # executable name (after path separator)
+        flt = self._literals.get(pText[max(pText.rfind("/"), pText.rfind("\\")) + 1:])
+        # try regexp (literals can only match arguments, which are separated by space)
+        if flt is None and self._regexp is not None and (self._hasRegexps or " " in pText):
+            # search
+            match = self._regexp.search(pText)
+            # matched filter
+            if match is not None:
+                # group which matched
+                flt = self._regexpGroups.get(match.lastgroup)
+                # in case filter has groups of its own, find ours
+                if flt is None:
+                    flt = next((rFlt for rGroup, rFlt in self._regexpGroups.items() if match.group(rGroup) is not None), None)
+        # try the rest one by one
+        if flt is None:
+            # filters
+            for rFlt, rRegexps in self._separate:
+                # any of the regexps
+                if any(rRegexp.search(pText) is not None for rRegexp in rRegexps):
+                    # matched
+                    flt = rFlt
+                    # first filter is enough
+                    break
+        # result
+        return flt
+
+
+class timekprPlayTimeProcess(object):
+    """Cached process for PlayTime"""
+
+    # fixed set of attributes, no per instance dict (there are many processes)
+    __slots__ = ("uid", "exe", "cmdLine", "startTime", "generation")
+
+    def __init__(self, pUid, pExe, pCmdLine, pStartTime, pGeneration):
+        """Initialize process"""
+        # user id (None if user is not of our interest)
+        self.uid = pUid
+        # executable and command line (None if user is not of our interest)
+        self.exe = pExe
+        self.cmdLine = pCmdLine
+        # start time, together with pid it identifies the process (None until process of user with limited PlayTime matches a filter, nothing else needs it)
+        self.startTime = pStartTime
+        # generation of the refresh when process was last seen
+        self.generation = pGeneration
 
 
 class timekprPlayTimeConfig(object):
@@ -25,71 +197,287 @@ class timekprPlayTimeConfig(object):
     _USRS = "U"   # used to identify users (in master structure)
     _MPIDS = "M"  # used to identify processes that match patterns
     _FLTS = "F"   # used to identify filters for processes for particular user
-    _UID = "u"    # used to identify user id (child struct)
-    _EXE = "e"    # used to identify executable for process
-    _CMD = "c"    # used to identify command line for process
-    _TERM = "k"   # used to identify terminate attempts before killing
-    _QCP = "Q"    # used to identify how many times we need to verify process has changed euid / cmdline (def: 2)
-    _QCT = "q"    # used to identify time between the QC passes  (def: 5 iterations)
-    _TIM = "t"    # used to identify last update date
-    # value constants
-    _QCP_V = 2
-    _QCT_V = 5
-    # file locations for inspecting process and its cmdline
+    _MTCH = "m"   # used to identify matcher of all filters for particular user
+    _TIM = "t"    # used to identify last update date (when all processes were refreshed)
+    _GEN = "g"    # used to identify generation of the refresh (processes which are not seen in the latest refresh are gone)
+    # alternative solution for determining owner / process (1 - status, 2 - cmdline, 3 - exe symlink)
+    _USE_ALT_NR = 3
+    # file locations for inspecting process and its cmdline (proc root, pid)
+    # process directory (owner of it is the owner of the process)
+    _PROCESS = "%s/%s"
     # status
-    _STATUS = "/proc/%s/status"
+    _STATUS = "%s/%s/status"
     # exe
-    _EXECUTABLE ="/proc/%s/exe"
+    _EXECUTABLE = "%s/%s/exe"
     # cmdline
-    _CMDLINE = "/proc/%s/cmdline"
+    _CMDLINE = "%s/%s/cmdline"
+    # stat
+    _STAT = "%s/%s/stat"
 
-    def __init__(self, pTimekprConfig):
+    def __init__(self, pTimekprConfig, pProcRoot=cons.TK_PROC_ROOT):
         """Initialize all stuff for PlayTime"""
 
         log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprUserPlayTime")
 
         # structure:
-        #   P - process pids for all processes, every process has: u - user id, c - cmdline, t - adjustment time
+        #   P - process pids (int) for all processes, every process is a timekprPlayTimeProcess record
         #   U - contains users, which in turn contains reference to P
         #   TIM - last update date for processes
-        self._cachedPids = {self._PIDS: {}, self._USRS: {}, self._TIM: None}
+        #   GEN - generation of the last refresh
+        self._cachedPids = {self._PIDS: {}, self._USRS: {}, self._TIM: None, self._GEN: 0}
         # global server config
         self._timekprConfig = pTimekprConfig
+        # where processes are inspected (benchmarks use generated process trees)
+        self._procRoot = pProcRoot
+        # kernel process events (used instead of scanning all processes, if enabled)
+        self._processEventListener = None
+        # whether process events could not be used
+        self._processEventsFailed = False
+        # users whose processes are cached (None - all users)
+        self._trackedUids = None
+        # processes of users, which are not tracked, with generation of the refresh when they were last seen
+        self._untrackedPids = {}
+        # whether user id is of our interest at all
+        self._validUids = {}
+        # reusable buffer for reading command lines (only the beginning of command line is inspected)
+        self._cmdLineBuffer = bytearray(cons.TK_MAX_CMD_SRCH)
+        # terminates PlayTime processes when time is up
+        self._processTerminator = timekprProcessTerminator(pProcRoot)
+        # cache is changed by scanner and by filter changes (they may run in different threads)
+        self._cacheLock = threading.Lock()
+        # matched processes of users as of the latest scan (time of the scan, uid -> frozenset of (pid, start time)), replaced as a whole, never changed
+        self._matchSnapshot = (time.monotonic(), {})
+        # PlayTime left of users (None - PlayTime is not limited, so there is nothing to protect)
+        self._userPlayTimeLeft = {}
+        # interval between scans and when the next scan is due (None - on next check)
+        self._scanInterval = 0
+        self._nextScanTime = None
+        # background scanner thread and request to stop it
+        self._scannerThread = None
+        self._scannerStop = threading.Event()
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish init timekprUserPlayTime")
 
-    def _getMatchedProcessesByFilter(self, pUid, pFlts, pPids):
-        """Method to validate whether cmdline matches the filter"""
+    def _getMatchedProcesses(self, pUid, pPids):
+        """Method to validate whether executable or cmdline matches any of the user filters"""
         # def
         matchedPids = []
+        # all filters of the user
+        matcher = self._cachedPids[self._USRS][pUid][self._MTCH]
+        # whether cmdline is inspected
+        isEnhanced = self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled()
         # loop through user processes
         for rPid in pPids:
             # executable
-            exe = self._cachedPids[self._PIDS][rPid][self._EXE]
+            exe = self._cachedPids[self._PIDS][rPid].exe
             # command line
-            cmdLine = self._cachedPids[self._PIDS][rPid][self._CMD]
+            cmdLine = self._cachedPids[self._PIDS][rPid].cmdLine
             # try searching only if exe is specified
             if exe is not None:
-                # match
-                for rFlt in pFlts:
-                    # pid matched
-                    isMatched = rFlt.search(exe) is not None
-                    isMatched = isMatched or (self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled() and cmdLine is not None and rFlt.search(cmdLine) is not None)
-                    # try to check if matches
-                    if isMatched:
-                        # match
-                        matchedPids.append(rPid)
-                        # log
-                        log.log(cons.TK_LOG_LEVEL_DEBUG, "PT match, uid: %s, exe: %s, cmdl: %s" % (pUid, exe, "n/a" if cmdLine is None else cmdLine[:128]))
-                        # first filter is enough
-                        break
+                # match (matcher remembers results, it's built anew when filters change)
+                flt = matcher.matchProcess(exe, cmdLine if isEnhanced else None)
+                # try to check if matches
+                if flt is not None:
+                    # match
+                    matchedPids.append(rPid)
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_DEBUG, "PT match, uid: %s, filter: %s, exe: %s, cmdl: %s" % (pUid, flt, exe, "n/a" if cmdLine is None else cmdLine[:128]))
         # result
         return matchedPids
 
+    def _isUserValid(self, pUid):
+        """Check whether user is of our interest (this does not change, so result is remembered)"""
+        # remembered
+        isValid = self._validUids.get(pUid)
+        # check
+        if isValid is None:
+            # verify
+            isValid = self._validUids[pUid] = userhelper.isUserValid(int(pUid))
+        # result
+        return isValid
+
+    def _setTrackedUsers(self):
+        """Determine users whose processes are cached (None - all users) and adjust cache when they change"""
+        # only users with filters (logged in users with PlayTime enabled) are tracked, if asked for
+        trackedUids = set([rUid for rUid in self._cachedPids[self._USRS] if self._cachedPids[self._USRS][rUid][self._FLTS]]) if self._timekprConfig.getTimekprPlayTimeTrackedUsersOnly() else None
+        # tracked users changed
+        if trackedUids != self._trackedUids:
+            # log
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "PT tracked users: %s" % ("all" if trackedUids is None else ", ".join(sorted(trackedUids))))
+            # processes which were not tracked might be of interest now
+            self._untrackedPids = {}
+            # processes of users, which are not tracked anymore, are not needed
+            if trackedUids is not None:
+                self._removeCachedProcesses([rPid for rPid, rProcess in self._cachedPids[self._PIDS].items() if rProcess.uid not in trackedUids])
+            # save
+            self._trackedUids = trackedUids
+            # refresh all processes
+            self._cachedPids[self._TIM] = None
+
     def _initUserData(self, pUid):
         """Initialize user in cached structure"""
         # result
-        self._cachedPids[self._USRS][pUid] = {self._PIDS: set(), self._MPIDS: set(), self._FLTS: {}}
+        self._cachedPids[self._USRS][pUid] = {self._PIDS: set(), self._MPIDS: set(), self._FLTS: {}, self._MTCH: timekprPlayTimeFilterMatcher({})}
+
+    def _removeCachedProcesses(self, pPids):
+        """Remove processes from cache"""
+        # remove items
+        for rPid in pPids:
+            # pid
+            uid = self._cachedPids[self._PIDS][rPid].uid
+            # uid found
+            if uid is not None:
+                # remove it from user pids
+                self._cachedPids[self._USRS][uid][self._PIDS].remove(rPid)
+                # remove it from user pids that matched filters
+                if rPid in self._cachedPids[self._USRS][uid][self._MPIDS]:
+                    # remove
+                    self._cachedPids[self._USRS][uid][self._MPIDS].remove(rPid)
+            # remove
+            self._cachedPids[self._PIDS].pop(rPid)
+
+    def _clearCachedProcesses(self):
+        """Remove all processes from cache, they will be inspected again on next refresh"""
+        # remove all
+        self._removeCachedProcesses(list(self._cachedPids[self._PIDS]))
+        self._untrackedPids = {}
+        # next refresh scans all processes
+        self._cachedPids[self._TIM] = None
+
+    def _stopProcessEvents(self):
+        """Stop using process events"""
+        # stop listening
+        self._processEventListener.close()
+        self._processEventListener = None
+        # processes cached while events were used are not verified for changes, so start over
+        self._clearCachedProcesses()
+
+    def _getProcessEventListener(self):
+        """Start or stop process event listener as configured (result is None if events are not used)"""
+        # events are wanted
+        if self._timekprConfig.getTimekprPlayTimeProcessEventsEnabled():
+            # start listening (events need privileges, which do not change while we run, so we try only once)
+            if self._processEventListener is None and not self._processEventsFailed:
+                try:
+                    # listen
+                    self._processEventListener = timekprProcessEventListener()
+                    # scan all processes, from now on events will tell what changes
+                    self._cachedPids[self._TIM] = None
+                except OSError as exc:
+                    # do not try again
+                    self._processEventsFailed = True
+                    log.log(cons.TK_LOG_LEVEL_INFO, "WARNING: process events are not available (%s), all processes will be scanned" % (exc))
+        # events are not wanted anymore
+        elif self._processEventListener is not None:
+            # stop
+            self._stopProcessEvents()
+        # result
+        return self._processEventListener
+
+    def _readCmdLine(self, pPid):
+        """Read the beginning of command line of the process (long command lines are not read in full), return it and bytes read"""
+        # open
+        cmdFd = os.open(self._CMDLINE % (self._procRoot, pPid), os.O_RDONLY)
+        try:
+            # read into buffer (one read is enough, buffer is smaller than what kernel returns at once)
+            cmdLen = os.readv(cmdFd, (self._cmdLineBuffer,))
+        finally:
+            # close
+            os.close(cmdFd)
+        # decode only what was read
+        return self._cmdLineBuffer[:cmdLen].replace(b"\x00", b" ").decode(errors="replace"), cmdLen
+
+    def _readStartTime(self, pPid):
+        """Read start time of the process (it does not change while process lives, so together with pid it identifies the process)"""
+        # open
+        statFd = os.open(self._STAT % (self._procRoot, pPid), os.O_RDONLY)
+        try:
+            # read (stat is way shorter than this)
+            content = os.read(statFd, 1024)
+        finally:
+            # close
+            os.close(statFd)
+        # result
+        return misc.parseProcessStat(content)[0]
+
+    def _scheduleNextScan(self):
+        """Determine when processes are scanned next: often when user is near the limit or plays, seldom when nothing is at risk or machine is loaded"""
+        # bounds
+        intervalMin = max(self._timekprConfig.getTimekprPlayTimeScanIntervalMin(), 0)
+        intervalMax = max(self._timekprConfig.getTimekprPlayTimeScanIntervalMax(), intervalMin)
+        # PlayTime left of users who have activities set up and whose PlayTime is limited
+        timesLeft = [rTimeLeft for rUid, rTimeLeft in list(self._userPlayTimeLeft.items()) if rTimeLeft is not None and rUid in self._cachedPids[self._USRS] and self._cachedPids[self._USRS][rUid][self._FLTS]]
+        # user plays or is near the limit
+        if any(rUser[self._MPIDS] for rUser in self._cachedPids[self._USRS].values()) or any(rTimeLeft <= cons.TK_PLAYTIME_SCAN_NEAR_LIMIT for rTimeLeft in timesLeft):
+            # as often as possible
+            interval = intervalMin
+        # nothing to protect
+        elif not timesLeft:
+            # as seldom as possible
+            interval = intervalMax
+        # heavily loaded machine
+        elif os.getloadavg()[0] / (os.cpu_count() or 1) >= cons.TK_PLAYTIME_SCAN_HIGH_LOAD:
+            # as seldom as possible (max interval is always less than near limit time, so nobody can exceed the limit unnoticed)
+            interval = intervalMax
+        # nothing happens
+        else:
+            # back off gradually
+            interval = min(max(self._scanInterval * 2, intervalMin, 1), intervalMax)
+        # log change
+        if interval != self._scanInterval:
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "PT scan interval: %is -> %is" % (self._scanInterval, interval))
+        # next scan
+        self._scanInterval = interval
+        self._nextScanTime = time.monotonic() + interval if interval > 0 else None
+
+    def _readMatchedStartTimes(self):
+        """Read start time of matched processes of users whose PlayTime is limited (only their processes are terminated, start time tells whether pid was reused)"""
+        # users
+        for rUid, rUser in self._cachedPids[self._USRS].items():
+            # PlayTime is not limited, processes are never terminated
+            if self._userPlayTimeLeft.get(rUid) is None:
+                continue
+            # start time is read once for every process
+            for rPid in [rPid for rPid in rUser[self._MPIDS] if self._cachedPids[self._PIDS][rPid].startTime is None]:
+                try:
+                    # read
+                    self._cachedPids[self._PIDS][rPid].startTime = self._readStartTime(rPid)
+                except Exception:
+                    # process not here anymore, it's removed on next refresh (it's not terminated without start time)
+                    pass
+
+    def _publishMatchSnapshot(self, pIsScan=True):
+        """Publish matched processes of all users for readers (time is updated only when processes were scanned)"""
+        # start time of processes which may be terminated
+        self._readMatchedStartTimes()
+        # new snapshot
+        self._matchSnapshot = (time.monotonic() if pIsScan else self._matchSnapshot[0], {rUid: frozenset((rPid, self._cachedPids[self._PIDS][rPid].startTime) for rPid in rUser[self._MPIDS]) for rUid, rUser in self._cachedPids[self._USRS].items() if rUser[self._MPIDS]})
+
+    def _scanPlayTimeProcesses(self):
+        """Scan processes and publish matches"""
+        # scan
+        with self._cacheLock:
+            # scan
+            self._cachePlayTimeProcesses()
+            # publish
+            self._publishMatchSnapshot()
+
+    def _executePlayTimeScanner(self):
+        """Scan processes in background until asked to stop or background scanning is not needed anymore"""
+        log.log(cons.TK_LOG_LEVEL_INFO, "PlayTime background scanner started")
+        # scan till needed
+        while self._timekprConfig.getTimekprPlayTimeEnabled() and self._timekprConfig.getTimekprPlayTimeBackgroundScanEnabled():
+            try:
+                # scan
+                self._scanPlayTimeProcesses()
+            except Exception:
+                # scanner has to keep going
+                log.log(cons.TK_LOG_LEVEL_INFO, "---=== ERROR in PlayTime background scanner ===---")
+                log.log(cons.TK_LOG_LEVEL_INFO, traceback.format_exc())
+            # wait for next scan (or request to stop)
+            if self._scannerStop.wait(self._timekprConfig.getTimekprPollTime()):
+                break
+        log.log(cons.TK_LOG_LEVEL_INFO, "PlayTime background scanner stopped")
 
     def _cachePlayTimeProcesses(self):
         """Refresh all processes for inspection"""
@@ -98,11 +486,53 @@ class timekprPlayTimeConfig(object):
         # ## the idea is that processes have to be refreshed regularly, that is:
         #      if users exist with active filters, then it's regular
         #      if they do not exist, we still need to refresh processes, just more seldom
+        # ## when process events are used, only processes which were started or changed are inspected
+        #      and all processes are refreshed seldom (just in case something was missed)
 
         # def
         dt = datetime.now()
+        changedPids = None
+        finishedPids = set()
+        # whose processes are cached
+        self._setTrackedUsers()
+        # process events
+        processEventListener = self._getProcessEventListener()
+        # get what happened since last refresh
+        if processEventListener is not None:
+            try:
+                # events
+                changedPids, finishedPids, eventsLost = processEventListener.getEvents()
+                # if kernel dropped events, we do not know what changed, so start over
+                if eventsLost:
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_INFO, "WARNING: process events were lost, all processes will be inspected again")
+                    # start over
+                    self._clearCachedProcesses()
+            except OSError as exc:
+                # log
+                log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: reading process events failed (%s), all processes will be scanned from now on" % (exc))
+                # do not try again
+                self._processEventsFailed = True
+                self._stopProcessEvents()
+                # no events
+                changedPids = None
+                finishedPids = set()
+        # how often all processes have to be refreshed
+        refreshInterval = cons.TK_SAVE_INTERVAL if changedPids is None else cons.TK_PLAYTIME_PROCESS_EVENTS_RESYNC_INTERVAL
+        # whether all processes have to be refreshed
+        isFullRefresh = (abs((dt - self._cachedPids[self._TIM]).total_seconds()) if self._cachedPids[self._TIM] is not None else refreshInterval) >= refreshInterval
+
+        # process events are used
+        if changedPids is not None:
+            # finished and changed processes are removed (changed ones are inspected as new)
+            pids = [rPid for rPid in finishedPids | changedPids if rPid in self._cachedPids[self._PIDS]]
+            # remove
+            self._removeCachedProcesses(pids)
+            # the same goes for untracked processes
+            for rPid in finishedPids | changedPids:
+                self._untrackedPids.pop(rPid, None)
         # regular refreshes need to happen even noone is logged in (process pid reuse)
-        if not ((abs((dt - self._cachedPids[self._TIM]).total_seconds()) if self._cachedPids[self._TIM] is not None else cons.TK_SAVE_INTERVAL) >= cons.TK_SAVE_INTERVAL):
+        elif not isFullRefresh:
             # def
             areFltsEnabled = False
             # if no users have set up their filters, we do NOT execute process list
@@ -118,11 +548,17 @@ class timekprPlayTimeConfig(object):
                 # do not do anything
                 return
 
+        # it's not time to scan yet (scans are adapted to risk, full refreshes wait for it too, when process events are not used)
+        if changedPids is None and self._nextScanTime is not None and time.monotonic() < self._nextScanTime:
+            # do not do anything
+            return
+
         # ## this is the fastest way I found how to list all processes ##
         # I tried with:
         #   subprocess + ps -ef (~ 2.2x slower)
         #                psutil (~ 10x  slower)
         #   even scandir is a tad slower than listdir (for our use case)
+        #   (scan strategies can be compared on generated process trees with server/benchmark/ptscan.py)
 
         # this method was built for support of filtering any processes
         # even by regexp, but as configuration by regexp is considered
@@ -135,56 +571,61 @@ class timekprPlayTimeConfig(object):
         # the start of interval and only those which are not in use
         # so I don't think this actually affects timekpr at all
 
-        # unique last update date + stats variables (these ar for actual counts, not just assesing the result)
-        self._cachedPids[self._TIM] = dt
+        # unique last update date and generation (only when all processes are refreshed) + stats variables (these ar for actual counts, not just assesing the result)
+        if changedPids is None or isFullRefresh:
+            # new refresh
+            self._cachedPids[self._TIM] = dt
+            self._cachedPids[self._GEN] += 1
         cpids = 0
-        rpids = 0
+        rpids = len(pids) if changedPids is not None else 0
         apids = 0
         lpids = 0
         lcmpids = 0
-        ccmpids = 0
-        qcpids = 0
         ampids = 0
+        upids = 0
+        cmdpids = 0
+        cmdbytes = 0
+        cmdtime = 0
+        # whether cmdline is inspected
+        isEnhanced = self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled()
 
         # ## alternative solutions for determining owner / process ##
-        useAltNr = 3
+        useAltNr = self._USE_ALT_NR
+        # just the ones which changed according to process events
+        if changedPids is not None and not isFullRefresh:
+            # changed
+            procIds = changedPids
+        # processes of tracked users only (from their cgroups, if possible, owner is checked below anyway)
+        elif self._trackedUids is not None and self._procRoot == cons.TK_PROC_ROOT:
+            # tracked
+            procIds = misc.getUserPids(self._trackedUids, pVerifyOwner=False)
         # list all in /proc
-        procIds = [rPid for rPid in os.listdir("/proc") if rPid.isdecimal()]
+        else:
+            # all
+            procIds = [int(rPid) for rPid in os.listdir(self._procRoot) if rPid.isdecimal()]
         # loop through processes
         for procId in procIds:
             # def
             exe = None
             cmdLine = None
             userId = None
-            prevUserId = None
-            qcChk = False
-            processChanged = False
 
-            # matched
+            # matched (pid which is still here is the same process, it's not verified again, process events tell when process changes)
             if procId in self._cachedPids[self._PIDS]:
-                # determine whether this process passed QC validation
-                if self._cachedPids[self._PIDS][procId][self._QCP] > 0 and self._cachedPids[self._PIDS][procId][self._EXE] is not None:
-                    # stat
-                    qcpids += 1
-                    # decrease check times
-                    self._cachedPids[self._PIDS][procId][self._QCT] -= 1
-                    # check whether it's time to recheck the process
-                    if not self._cachedPids[self._PIDS][procId][self._QCT] > 0:
-                        # decrease pass times
-                        self._cachedPids[self._PIDS][procId][self._QCP] -= 1
-                        # set up next countdown
-                        self._cachedPids[self._PIDS][procId][self._QCT] = self._QCT_V
-                        # we need to check process
-                        qcChk = True
-
                 # cached
-                self._cachedPids[self._PIDS][procId][self._TIM] = self._cachedPids[self._TIM]
+                self._cachedPids[self._PIDS][procId].generation = self._cachedPids[self._GEN]
                 # stats
                 cpids += 1
-                # if not QC
-                if not qcChk:
-                    # pass
-                    continue
+                # pass
+                continue
+            # process of user who is not tracked
+            elif procId in self._untrackedPids:
+                # still here
+                self._untrackedPids[procId] = self._cachedPids[self._GEN]
+                # stats
+                upids += 1
+                # pass
+                continue
 
             # since processes come and go
             try:
@@ -192,7 +633,7 @@ class timekprPlayTimeConfig(object):
                 # using status (correct euid)
                 if useAltNr == 1:
                     # obj
-                    obj = self._STATUS % (procId)
+                    obj = self._STATUS % (self._procRoot, procId)
                     # found the process, now try to determine whether this belongs to our user
                     with open(obj, mode="r") as usrFD:
                         # read status lines
@@ -208,50 +649,61 @@ class timekprPlayTimeConfig(object):
                 # using commandline (filter through params too)
                 elif useAltNr == 2:
                     # obj
-                    obj = self._CMDLINE % (procId)
+                    obj = self._CMDLINE % (self._procRoot, procId)
                     # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
                     userId = str(os.stat(obj).st_uid)
                 # using symlinks (faster)
                 else:
                     # obj
-                    obj = self._EXECUTABLE % (procId)
-                    # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
-                    userId = str(os.lstat(obj).st_uid)
-
+                    obj = self._EXECUTABLE % (self._procRoot, procId)
+                    # check the owner (owner of process directory is the owner of the process)
+                    userId = str(os.stat(self._PROCESS % (self._procRoot, procId)).st_uid)
+
+                # process of user who is not tracked is not inspected further
+                if self._trackedUids is not None and userId not in self._trackedUids:
+                    # remember it's not ours
+                    self._untrackedPids[procId] = self._cachedPids[self._GEN]
+                    # stats
+                    upids += 1
+                    # next
+                    continue
                 # check if we have it
                 if userId not in self._cachedPids[self._USRS]:
                     # verify
-                    if userhelper.isUserValid(int(userId)):
+                    if self._isUserValid(userId):
                         # initialize set
                         self._initUserData(userId)
                     else:
                         # this is not of our interest
                         userId = None
-                # we need commandlines for every process, in case it changes (snapd?)
-                try:
-                    # ## alternative
-                    if useAltNr == 3:
-                        # read link destination (this is the final destination)
-                        exe = os.readlink(obj)
-                    # ## alternative
-                    else:
-                        # try reading executable for process
-                        with open(obj, mode="r") as cmdFd:
-                            # split this
-                            exe = cmdFd.read().split("\x00")[0]
-                    # we have to inspect full cmdline (the first TK_MAX_CMD_SRCH (def: 512) symbols to be precise)
-                    if self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled():
-                        # obj
-                        obj = self._CMDLINE % (procId)
-                        # try reading cmdline for process
-                        with open(obj, mode="r") as cmdFd:
-                            # split this
-                            cmdLine = cmdFd.read().replace("\x00", " ")[:cons.TK_MAX_CMD_SRCH]
-                except Exception:
-                    # it's not possible to get executable, but we still cache the process
-                    exe = None
-                    # stat
-                    lcmpids += 1
+                # executable and cmdline are needed only for processes of users of our interest (others are never matched)
+                if userId is not None:
+                    try:
+                        # ## alternative
+                        if useAltNr == 3:
+                            # read link destination (this is the final destination)
+                            exe = os.readlink(obj)
+                        # ## alternative
+                        else:
+                            # try reading executable for process
+                            with open(obj, mode="r") as cmdFd:
+                                # split this
+                                exe = cmdFd.read().split("\x00")[0]
+                        # we have to inspect full cmdline (the first TK_MAX_CMD_SRCH (def: 512) bytes to be precise)
+                        if isEnhanced:
+                            # start
+                            cmdTm = time.monotonic()
+                            # read
+                            cmdLine, cmdLen = self._readCmdLine(procId)
+                            # stats
+                            cmdpids += 1
+                            cmdbytes += cmdLen
+                            cmdtime += time.monotonic() - cmdTm
+                    except Exception:
+                        # it's not possible to get executable, but we still cache the process
+                        exe = None
+                        # stat
+                        lcmpids += 1
             # try next on any exception
             except Exception:
                 # stats
@@ -259,80 +711,35 @@ class timekprPlayTimeConfig(object):
                 # process not here anymore, move on
                 continue
 
-            # if we ar not running QC check, we cache it, else we make verifications
-            if not qcChk:
-                # cache it
-                self._cachedPids[self._PIDS][procId] = {self._UID: userId, self._EXE: exe, self._CMD: cmdLine, self._QCP: (self._QCP_V if exe is not None else 0), self._QCT: (self._QCT_V if exe is not None else 0), self._TERM: 0, self._TIM: self._cachedPids[self._TIM]}
-                # stats
-                apids += 1
-            else:
-                # check if process changed uid / cmdline
-                if self._cachedPids[self._PIDS][procId][self._UID] != userId or self._cachedPids[self._PIDS][procId][self._EXE] != exe:
-                    # log
-                    log.log(cons.TK_LOG_LEVEL_DEBUG, "WARNING: uid/executable changes, uid: %s -> %s, executable: \"%s\" -> \"%s\"" % (self._cachedPids[self._PIDS][procId][self._UID], userId, self._cachedPids[self._PIDS][procId][self._EXE], exe))
-                    # save previous user id
-                    prevUserId = self._cachedPids[self._PIDS][procId][self._UID]
-                    # adjust new values
-                    self._cachedPids[self._PIDS][procId][self._UID] = userId
-                    self._cachedPids[self._PIDS][procId][self._EXE] = exe
-                    self._cachedPids[self._PIDS][procId][self._CMD] = cmdLine
-                    # if process has changed, we do not verify it anymore
-                    self._cachedPids[self._PIDS][procId][self._QCP] = 0
-                    self._cachedPids[self._PIDS][procId][self._QCT] = 0
-                    # flag that this is changed
-                    processChanged = True
-                    # stats
-                    ccmpids += 1
-                else:
-                    # nothing here
-                    continue
-
-            # we have user (or process changed and we have to update processes / matches)
-            if (userId is not None and not qcChk) or processChanged:
-                # handle case when uid becomes None from existing
-                if userId != prevUserId and prevUserId is not None:
-                    # remove from user pids
-                    if procId in self._cachedPids[self._USRS][prevUserId][self._PIDS]:
-                        # remove
-                        self._cachedPids[self._USRS][prevUserId][self._PIDS].remove(procId)
-                    # remove from matched pids
-                    if procId in self._cachedPids[self._USRS][prevUserId][self._MPIDS]:
-                        # remove
-                        self._cachedPids[self._USRS][prevUserId][self._MPIDS].remove(procId)
-                # only if user is specified
-                if userId is not None:
-                    # manage pids for users
-                    self._cachedPids[self._USRS][userId][self._PIDS].add(procId)
-                    # verify whether this cmdline matches any of the filters user set up
-                    for rFlt in self._cachedPids[self._USRS][userId][self._FLTS]:
-                        # matched pids
-                        matchedPids = self._getMatchedProcessesByFilter(userId, self._cachedPids[self._USRS][userId][self._FLTS][rFlt], set([procId]))
-                        # match and add to user matched pids
-                        for rPid in matchedPids:
-                            # add to user pids
-                            self._cachedPids[self._USRS][userId][self._MPIDS].add(rPid)
-                            # stats
-                            ampids += 1
-
-        # take care of removing the disapeared pids
-        pids = [rPid for rPid in self._cachedPids[self._PIDS] if self._cachedPids[self._TIM] != self._cachedPids[self._PIDS][rPid][self._TIM]]
-
-        # remove items
-        for rPid in pids:
-            # pid
-            uid = self._cachedPids[self._PIDS][rPid][self._UID]
-            # uid found
-            if uid is not None:
-                # remove it from user pids
-                self._cachedPids[self._USRS][uid][self._PIDS].remove(rPid)
-                # remove it from user pids that matched filters
-                if rPid in self._cachedPids[self._USRS][uid][self._MPIDS]:
-                    # remove
-                    self._cachedPids[self._USRS][uid][self._MPIDS].remove(rPid)
-            # remove
-            self._cachedPids[self._PIDS].pop(rPid)
-        # stats
-        rpids += len(pids)
+            # cache it (start time is read only when it's needed)
+            self._cachedPids[self._PIDS][procId] = timekprPlayTimeProcess(userId, exe, cmdLine, None, self._cachedPids[self._GEN])
+            # stats
+            apids += 1
+
+            # we have user
+            if userId is not None:
+                # manage pids for users
+                self._cachedPids[self._USRS][userId][self._PIDS].add(procId)
+                # verify whether this cmdline matches any of the filters user set up
+                if self._cachedPids[self._USRS][userId][self._FLTS]:
+                    # match and add to user matched pids
+                    for rPid in self._getMatchedProcesses(userId, (procId,)):
+                        # add to user pids
+                        self._cachedPids[self._USRS][userId][self._MPIDS].add(rPid)
+                        # stats
+                        ampids += 1
+
+        # take care of removing the disapeared pids (when all processes were refreshed)
+        if changedPids is None or isFullRefresh:
+            # disappeared
+            pids = [rPid for rPid, rProcess in self._cachedPids[self._PIDS].items() if rProcess.generation != self._cachedPids[self._GEN]]
+            # remove items
+            self._removeCachedProcesses(pids)
+            # stats
+            rpids += len(pids)
+            # untracked processes, which are still here
+            if self._untrackedPids:
+                self._untrackedPids = {rPid: rGeneration for rPid, rGeneration in self._untrackedPids.items() if rGeneration == self._cachedPids[self._GEN]}
 
         # extra log
         if log.getLogLevel() == cons.TK_LOG_LEVEL_EXTRA_DEBUG:
@@ -341,133 +748,162 @@ class timekprPlayTimeConfig(object):
                 # print processes
                 log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "PT, user: %s, processes: %i, match: %i" % (rUser, len(self._cachedPids[self._USRS][rUser][self._PIDS]), len(self._cachedPids[self._USRS][rUser][self._MPIDS])))
 
-        log.log(cons.TK_LOG_LEVEL_DEBUG, "PT stats, users: %i, cache: %i, add: %i, rm: %i, lost: %i, nocmd: %i, qc: %i, changed: %i, admatch: %i" % (len(self._cachedPids[self._USRS]), cpids, apids, rpids, lpids, lcmpids, qcpids, ccmpids, ampids))
-        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish cachePlayTimeProcesses")
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "PT stats, users: %i, cache: %i, add: %i, rm: %i, lost: %i, nocmd: %i, admatch: %i, cmdline: %s, untracked: %s, events: %s, terminating: %i" % (len(self._cachedPids[self._USRS]), cpids, apids, rpids, lpids, lcmpids, ampids, "%i/%iB/%.4fs" % (cmdpids, cmdbytes, cmdtime) if isEnhanced else "n/a", "n/a" if self._trackedUids is None else str(upids), "n/a" if changedPids is None else "%i/%i%s" % (len(changedPids), len(finishedPids), " (full)" if isFullRefresh else ""), self._processTerminator.getPendingProcessCnt()))
+        # plan next scan (process events tell what changed, so events are read on every check)
+        if changedPids is None:
+            self._scheduleNextScan()
 
-    def _scheduleKill(self, pPid, pKill):
-        # kill process
-        try:
-            # if trying to terminate
-            if not pKill:
-                # logging
-                log.log(cons.TK_LOG_LEVEL_INFO, "sending terminate signal to process %s" % (pPid))
-                # terminate
-                psutil.Process(pid=int(pPid)).terminate()
-            # now just kill
-            else:
-                # logging
-                log.log(cons.TK_LOG_LEVEL_INFO, "sending kill signal to process %s" % (pPid))
-                # kill
-                psutil.Process(pid=int(pPid)).kill()
-        except:
-            # error in killing does not matter
-            pass
+        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish cachePlayTimeProcesses")
 
     def processPlayTimeActivities(self):
         """This is the main process to take care of PT processes"""
-        # cache processes
-        self._cachePlayTimeProcesses()
+        # processes are scanned in background
+        if self._timekprConfig.getTimekprPlayTimeBackgroundScanEnabled():
+            # start scanner, if it's not running (it stops by itself when it's not needed)
+            if self._scannerThread is None or not self._scannerThread.is_alive():
+                # start
+                self._scannerStop.clear()
+                self._scannerThread = threading.Thread(target=self._executePlayTimeScanner, name="timekpr-playtime", daemon=True)
+                self._scannerThread.start()
+        else:
+            # stop scanner, if it's running
+            self.finishPlayTimeScanner()
+            # cache processes
+            self._scanPlayTimeProcesses()
+
+    def finishPlayTimeScanner(self):
+        """Stop background scanner, if it's running"""
+        # stop
+        if self._scannerThread is not None:
+            # ask to stop and wait
+            self._scannerStop.set()
+            self._scannerThread.join()
+            self._scannerThread = None
+
+    def setUserPlayTimeLeft(self, pUid, pTimeLeft):
+        """Set PlayTime left for user (None - PlayTime is not limited), processes are scanned more often when user is near the limit"""
+        # user got near the limit, scan as soon as possible
+        if pTimeLeft is not None and pTimeLeft <= cons.TK_PLAYTIME_SCAN_NEAR_LIMIT and (self._userPlayTimeLeft.get(pUid) is None or self._userPlayTimeLeft[pUid] > cons.TK_PLAYTIME_SCAN_NEAR_LIMIT):
+            self._nextScanTime = None
+        # save
+        self._userPlayTimeLeft[pUid] = pTimeLeft
+
+    def getPlayTimeSnapshotAge(self):
+        """Get how old (in seconds) are the matched processes checks use"""
+        # result
+        return time.monotonic() - self._matchSnapshot[0]
 
     def verifyPlayTimeActive(self, pUid, pUname, pSilent=False):
         """Return whether PlayTime is active, i.e. offending process is running"""
+        # matched processes of the latest scan
+        mpids = self._matchSnapshot[1].get(pUid)
         # if we have user
         if pUid in self._cachedPids[self._USRS]:
             # extra log
             if not pSilent and log.getLogLevel() == cons.TK_LOG_LEVEL_DEBUG:
                 # logging
-                log.log(cons.TK_LOG_LEVEL_DEBUG, "PT: user \"%s\" (%s) has %i matching processes out of %i, using %i filters" % (pUname, pUid, len(self._cachedPids[self._USRS][pUid][self._MPIDS]), len(self._cachedPids[self._USRS][pUid][self._PIDS]), len(self._cachedPids[self._USRS][pUid][self._FLTS])))
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "PT: user \"%s\" (%s) has %i matching processes out of %i, using %i filters" % (pUname, pUid, len(mpids) if mpids else 0, len(self._cachedPids[self._USRS][pUid][self._PIDS]), len(self._cachedPids[self._USRS][pUid][self._FLTS])))
             # result
-            return True if self._cachedPids[self._USRS][pUid][self._MPIDS] else False
+            return True if mpids else False
         else:
             # result
             return False
 
     def processPlayTimeFilters(self, pUid, pFlts):
         """Add, modify, delete user process filters"""
+        # filters are changed while processes are not being scanned
+        with self._cacheLock:
+            # process
+            self._processPlayTimeFilters(pUid, pFlts)
+
+    def _processPlayTimeFilters(self, pUid, pFlts):
+        """Add, modify, delete user process filters (cache is locked)"""
         # if we do not have a user yet
         if pUid not in self._cachedPids[self._USRS]:
             # initialize set
             self._initUserData(str(pUid))
 
-        # the logic here is that we need to remove obsolete first and add the rest later
-        # this is due to user may enter filters in a way that process matches more than one filter
-        # therefore not to loose processes, this order is important
-        newFlts = set([rFlt[0] for rFlt in pFlts])
-        existFlts = set([rFlt for rFlt in self._cachedPids[self._USRS][pUid][self._FLTS]])
-        # remove obsolete filters
-        for rFlt in existFlts:
-            # if this is obsolete
-            if rFlt not in newFlts:
-                # now remove processes associated with filter
-                for rPid in self._getMatchedProcessesByFilter(pUid, self._cachedPids[self._USRS][pUid][self._FLTS][rFlt], self._cachedPids[self._USRS][pUid][self._MPIDS]):
-                    # remove pids
-                    self._cachedPids[self._USRS][pUid][self._MPIDS].remove(rPid)
-                # remove filter
-                self._cachedPids[self._USRS][pUid][self._FLTS].pop(rFlt)
+        # user without activities has nothing to protect
+        if not pFlts:
+            self._userPlayTimeLeft.pop(pUid, None)
+
+        # filters in the order they were set up (when process matches more than one filter, first one is reported)
+        newFlts = list(dict.fromkeys([rFlt[0] for rFlt in pFlts]))
+        # nothing has changed
+        if newFlts == list(self._cachedPids[self._USRS][pUid][self._FLTS]):
+            # nothing to do
+            return
+
+        # patterns for filters
+        flts = {}
         # process filters
         for rFlt in newFlts:
-            # if filter does not exist, we need to add it
-            if rFlt not in existFlts:
-                # filter does not exist, we need to add it
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt] = []
-                # firstly check if regexp is valid, in case someone will not enter it correclty (probably by mistake)
-                try:
-                    # if this succeeds then match is valid
-                    re.compile("^%s$" % (rFlt))
-                    # filter as is
-                    flt = rFlt
-                except re.error:
-                    # it failed, so we do escape and that's our pattern
-                    flt = re.escape(rFlt)
-                # remove brackets "[]" because we use them as description
-                flt = flt.replace("[", "").replace("]", "")
-                # add precompiled filters
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("^%s$" % (flt)))
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("[/\\\\]%s$" % (flt)))
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("[/\\\\]%s " % (flt)))
-                # add matched pids to to matched pid list
-                self._cachedPids[self._USRS][pUid][self._MPIDS].update(self._getMatchedProcessesByFilter(pUid, self._cachedPids[self._USRS][pUid][self._FLTS][rFlt], self._cachedPids[self._USRS][pUid][self._PIDS]))
+            # if filter exists, reuse it
+            if rFlt in self._cachedPids[self._USRS][pUid][self._FLTS]:
+                # existing
+                flts[rFlt] = self._cachedPids[self._USRS][pUid][self._FLTS][rFlt]
+                # next
+                continue
+            # firstly check if regexp is valid, in case someone will not enter it correclty (probably by mistake)
+            try:
+                # if this succeeds then match is valid
+                re.compile("^%s$" % (rFlt))
+                # filter as is
+                flt = rFlt
+            except re.error:
+                # it failed, so we do escape and that's our pattern
+                flt = re.escape(rFlt)
+            # remove brackets "[]" because we use them as description
+            flts[rFlt] = flt.replace("[", "").replace("]", "")
+
+        # new filters have to be applied to processes as soon as possible
+        self._nextScanTime = None
+        # all filters are matched at once
+        self._cachedPids[self._USRS][pUid][self._MTCH] = timekprPlayTimeFilterMatcher(flts)
+        self._cachedPids[self._USRS][pUid][self._FLTS] = flts
+        # processes of removed filters are released, processes of new filters are added
+        self._cachedPids[self._USRS][pUid][self._MPIDS] = set(self._getMatchedProcesses(pUid, self._cachedPids[self._USRS][pUid][self._PIDS]) if flts else [])
+        # readers see new matches right away
+        self._publishMatchSnapshot(pIsScan=False)
 
     def killPlayTimeProcesses(self, pUid):
         """Kill all PT processes"""
-        # if we have user
-        if pUid in self._cachedPids[self._USRS]:
+        # matched processes of the latest scan
+        mpids = self._matchSnapshot[1].get(pUid)
+        # if we have user processes
+        if mpids:
             # logging
-            log.log(cons.TK_LOG_LEVEL_INFO, "killing %i PT processes for uid \"%s\" " % (len(self._cachedPids[self._USRS][pUid][self._MPIDS]), pUid))
-            # terminate / kill all user PT processes
-            for rPid in self._cachedPids[self._USRS][pUid][self._MPIDS]:
-                # increase terminate attempts
-                self._cachedPids[self._PIDS][rPid][self._TERM] += 1
-                # schedule a terminate / kill (first we try to terminate and later we just kill)
-                GLib.timeout_add_seconds(0.1, self._scheduleKill, rPid, True if self._cachedPids[self._PIDS][rPid][self._TERM] > cons.TK_POLLTIME else False)
+            log.log(cons.TK_LOG_LEVEL_INFO, "killing %i PT processes for uid \"%s\" " % (len(mpids), pUid))
+            # terminate all user PT processes at once (the ones which do not finish in time are killed, start time tells whether pid was reused since the scan)
+            self._processTerminator.terminateProcesses(mpids)
 
     # --------------- helper methods --------------- #
 
     def getCachedProcesses(self):
         """Get all cached processes"""
-        proc = [[rPid, self._cachedPids[self._PIDS][rPid][self._EXE], self._cachedPids[self._PIDS][rPid][self._CMD]] for rPid in self._cachedPids[self._PIDS]]
+        with self._cacheLock:
+            proc = [[rPid, self._cachedPids[self._PIDS][rPid].exe, self._cachedPids[self._PIDS][rPid].cmdLine] for rPid in self._cachedPids[self._PIDS]]
         return proc
 
     def getCachedUserProcesses(self, pUserId):
         """Get processes, that are cached for user"""
-        if pUserId in self._cachedPids[self._USRS]:
-            proc = [[rPid, self._cachedPids[self._PIDS][rPid][self._EXE], self._cachedPids[self._PIDS][rPid][self._CMD]] for rPid in self._cachedPids[self._USRS][pUserId][self._PIDS]]
-        else:
-            proc = []
+        with self._cacheLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                proc = [[rPid, self._cachedPids[self._PIDS][rPid].exe, self._cachedPids[self._PIDS][rPid].cmdLine] for rPid in self._cachedPids[self._USRS][pUserId][self._PIDS]]
+            else:
+                proc = []
         return proc
 
     def getMatchedUserProcesses(self, pUserId):
         """Get processes, that are cached for user and matches at least one filter"""
-        if pUserId in self._cachedPids[self._USRS]:
-            proc = [[rPid, self._cachedPids[self._PIDS][rPid][self._EXE], self._cachedPids[self._PIDS][rPid][self._CMD]] for rPid in self._cachedPids[self._USRS][pUserId][self._MPIDS]]
-        else:
-            proc = []
+        with self._cacheLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                proc = [[rPid, self._cachedPids[self._PIDS][rPid].exe, self._cachedPids[self._PIDS][rPid].cmdLine] for rPid in self._cachedPids[self._USRS][pUserId][self._MPIDS]]
+            else:
+                proc = []
         return proc
 
     def getMatchedUserProcessCnt(self, pUserId):
-        """Get process count, that are cached for user and matches at least one filter"""
-        if pUserId in self._cachedPids[self._USRS]:
-            procCnt = len(self._cachedPids[self._USRS][pUserId][self._MPIDS])
-        else:
-            procCnt = 0
+        """Get process count, that are cached for user and matches at least one filter (as of the latest scan)"""
+        procCnt = len(self._matchSnapshot[1].get(pUserId, ()))
         return procCnt
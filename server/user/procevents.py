@@ -0,0 +1,164 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import os
+import errno
+import socket
+import struct
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+
+
+class timekprProcessEventListener(object):
+    """Listens to kernel process events (netlink process connector) and collects processes which were started, changed or finished"""
+
+    # netlink connector protocol and process connector ids
+    _NETLINK_CONNECTOR = 11
+    _CN_IDX_PROC = 1
+    _CN_VAL_PROC = 1
+    # message types and operations
+    _NLMSG_DONE = 3
+    _PROC_CN_MCAST_LISTEN = 1
+    # events we are interested in
+    _PROC_EVENT_FORK = 0x00000001
+    _PROC_EVENT_EXEC = 0x00000002
+    _PROC_EVENT_UID = 0x00000004
+    _PROC_EVENT_EXIT = 0x80000000
+    # message layouts: netlink header, connector header, process event header, two / four process ids
+    _NLMSG_HDR = struct.Struct("=IHHII")
+    _CN_MSG_HDR = struct.Struct("=IIIIHH")
+    _PROC_EVENT_HDR = struct.Struct("=IIQ")
+    _PROC_EVENT_IDS2 = struct.Struct("=II")
+    _PROC_EVENT_IDS4 = struct.Struct("=IIII")
+    # receive buffer size (events arriving between checks are kept by kernel)
+    _RCVBUF_SIZE = 4 * 1024 * 1024
+    # single read size
+    _READ_SIZE = 65536
+
+    def __init__(self):
+        """Subscribe to process events (needs CAP_NET_ADMIN, raises OSError if not possible)"""
+        # processes started or changed (exec, uid) since last read
+        self._changedPids = set()
+        # processes finished since last read
+        self._finishedPids = set()
+        # whether events were lost since last read
+        self._eventsLost = False
+        # reusable read buffer
+        self._buffer = bytearray(self._READ_SIZE)
+
+        # socket
+        self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self._NETLINK_CONNECTOR)
+        try:
+            # bigger buffer, so bursts of events do not get lost between checks (force works for root only)
+            try:
+                self._socket.setsockopt(socket.SOL_SOCKET, 33, self._RCVBUF_SIZE)  # SO_RCVBUFFORCE
+            except OSError:
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._RCVBUF_SIZE)
+            # join process events group
+            self._socket.bind((0, self._CN_IDX_PROC))
+            # ask for events
+            self._socket.send(self._buildMessage(struct.pack("=I", self._PROC_CN_MCAST_LISTEN)))
+            # events are read when needed
+            self._socket.setblocking(False)
+        except OSError:
+            # clean up
+            self._socket.close()
+            raise
+
+        log.log(cons.TK_LOG_LEVEL_INFO, "process event listener started")
+
+    def _buildMessage(self, pPayload):
+        """Build process connector message"""
+        # connector message
+        cnMsg = self._CN_MSG_HDR.pack(self._CN_IDX_PROC, self._CN_VAL_PROC, 0, 0, len(pPayload), 0) + pPayload
+        # netlink message
+        return self._NLMSG_HDR.pack(self._NLMSG_HDR.size + len(cnMsg), self._NLMSG_DONE, 0, 0, os.getpid()) + cnMsg
+
+    def _processEvent(self, pMsgOffset):
+        """Process one process event"""
+        # event header
+        what = self._PROC_EVENT_HDR.unpack_from(self._buffer, pMsgOffset)[0]
+        # event data
+        dataOffset = pMsgOffset + self._PROC_EVENT_HDR.size
+        # new process (threads are not processes, they share thread group id)
+        if what == self._PROC_EVENT_FORK:
+            # ids
+            _parentPid, _parentTgid, childPid, childTgid = self._PROC_EVENT_IDS4.unpack_from(self._buffer, dataOffset)
+            # process
+            if childPid == childTgid:
+                # pid is in use again
+                pid = childTgid
+                self._changedPids.add(pid)
+                self._finishedPids.discard(pid)
+        # process changed executable or owner
+        elif what in (self._PROC_EVENT_EXEC, self._PROC_EVENT_UID):
+            # ids (thread which did exec becomes thread group leader)
+            pid = self._PROC_EVENT_IDS2.unpack_from(self._buffer, dataOffset)[1]
+            # changed
+            self._changedPids.add(pid)
+            self._finishedPids.discard(pid)
+        # process finished
+        elif what == self._PROC_EVENT_EXIT:
+            # ids
+            processPid, processTgid = self._PROC_EVENT_IDS2.unpack_from(self._buffer, dataOffset)
+            # process (not a thread)
+            if processPid == processTgid:
+                # finished
+                pid = processTgid
+                self._finishedPids.add(pid)
+                self._changedPids.discard(pid)
+
+    def _readEvents(self):
+        """Read all events which are waiting in the socket"""
+        # read until nothing is left
+        while True:
+            try:
+                # read
+                size = self._socket.recv_into(self._buffer)
+            except BlockingIOError:
+                # nothing more to read
+                break
+            except OSError as exc:
+                # kernel had to drop events (buffer overrun), the rest of them can be read
+                if exc.errno == errno.ENOBUFS:
+                    self._eventsLost = True
+                    continue
+                # anything else is fatal
+                raise
+            # messages in the datagram
+            msgOffset = 0
+            while msgOffset + self._NLMSG_HDR.size <= size:
+                # netlink message
+                msgLen = self._NLMSG_HDR.unpack_from(self._buffer, msgOffset)[0]
+                # broken message
+                if msgLen < self._NLMSG_HDR.size + self._CN_MSG_HDR.size + self._PROC_EVENT_HDR.size:
+                    break
+                # process event
+                self._processEvent(msgOffset + self._NLMSG_HDR.size + self._CN_MSG_HDR.size)
+                # next message (messages are aligned to 4 bytes)
+                msgOffset += (msgLen + 3) & ~3
+
+    def getEvents(self):
+        """Get processes which were started or changed, processes which finished and whether events were lost since last call"""
+        # read what we have
+        self._readEvents()
+        # result
+        result = (self._changedPids, self._finishedPids, self._eventsLost)
+        # start over
+        self._changedPids = set()
+        self._finishedPids = set()
+        self._eventsLost = False
+        # result
+        return result
+
+    def close(self):
+        """Stop listening"""
+        # close
+        self._socket.close()
+        log.log(cons.TK_LOG_LEVEL_INFO, "process event listener stopped")
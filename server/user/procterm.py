@@ -0,0 +1,206 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import os
+import time
+import heapq
+import errno
+import select
+import signal
+import threading
+from gi.repository import GLib
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+from timekpr.common.utils import misc
+
+
+class timekprProcessTerminator(object):
+    """Terminates processes in batches and kills the ones which outlive their grace period"""
+
+    # stat of the process (proc root, pid)
+    _STAT = "%s/%s/stat"
+
+    def __init__(self, pProcRoot=cons.TK_PROC_ROOT):
+        """Initialize terminator"""
+        # where processes are inspected
+        self._procRoot = pProcRoot
+        # processes being terminated (pid -> pidfd (None if pidfd is not available), deadline, start time)
+        self._pendingPids = {}
+        # deadlines of processes being terminated (deadline, pid)
+        self._deadlines = []
+        # deadline the timer is set up for (None - no timer)
+        self._timerDeadline = None
+        # whether pidfds can be used (they need kernel 5.3 and python 3.9)
+        self._usePidfd = hasattr(os, "pidfd_open") and hasattr(signal, "pidfd_send_signal")
+        # users are checked in parallel
+        self._lock = threading.Lock()
+
+    def _isSameProcess(self, pPid, pStartTime):
+        """Check whether pid still belongs to the process which was started at specified time (pid may have been reused)"""
+        try:
+            # read
+            with open(self._STAT % (self._procRoot, pPid), "rb") as statFd:
+                # start time
+                startTime = misc.parseProcessStat(statFd.read())[0]
+        except (OSError, ValueError, IndexError):
+            # process is gone
+            return False
+        # result
+        return startTime == pStartTime
+
+    def _sendSignal(self, pPid, pPidfd, pSignal):
+        """Send signal to process, return whether process was still there"""
+        try:
+            # pidfd always refers to the same process, even if pid is reused
+            if pPidfd is not None:
+                signal.pidfd_send_signal(pPidfd, pSignal)
+            else:
+                os.kill(pPid, pSignal)
+        except ProcessLookupError:
+            # process is gone
+            return False
+        except OSError as exc:
+            # log
+            log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: sending signal %i to process %i failed (%s)" % (pSignal, pPid, exc))
+        # result
+        return True
+
+    def _releasePid(self, pPid):
+        """Forget process which is not being terminated anymore"""
+        # release
+        pidfd = self._pendingPids.pop(pPid)[0]
+        # close
+        if pidfd is not None:
+            os.close(pidfd)
+
+    def _releaseFinishedPids(self):
+        """Forget processes which already finished (pidfd becomes readable when process exits)"""
+        # poller
+        poller = select.poll()
+        # processes with pidfds
+        pids = {}
+        # register all
+        for rPid, (rPidfd, _rDeadline, _rStartTime) in self._pendingPids.items():
+            # pidfd
+            if rPidfd is not None:
+                # register
+                poller.register(rPidfd, select.POLLIN)
+                pids[rPidfd] = rPid
+        # finished (one call for all processes)
+        for rPidfd, _rEvent in (poller.poll(0) if pids else []):
+            # release
+            self._releasePid(pids[rPidfd])
+
+    def _processDeadlines(self):
+        """Kill processes which outlived their grace period and set up timer for the next deadline"""
+        # def
+        killedCnt = 0
+        # now
+        tm = time.monotonic()
+        # finished processes do not need to be killed
+        self._releaseFinishedPids()
+        # expired deadlines
+        while self._deadlines and self._deadlines[0][0] <= tm:
+            # process
+            deadline, pid = heapq.heappop(self._deadlines)
+            # process might have finished already (and pid might be used by another process being terminated)
+            if pid in self._pendingPids and self._pendingPids[pid][1] == deadline:
+                # pidfd always refers to the same process, pid has to be checked (it might have been reused)
+                if (self._pendingPids[pid][0] is not None or self._isSameProcess(pid, self._pendingPids[pid][2])) and self._sendSignal(pid, self._pendingPids[pid][0], signal.SIGKILL):
+                    # stats
+                    killedCnt += 1
+                # done with it
+                self._releasePid(pid)
+        # deadlines of finished processes are not needed
+        while self._deadlines and self._pendingPids.get(self._deadlines[0][1], (None, None, None))[1] != self._deadlines[0][0]:
+            # remove
+            heapq.heappop(self._deadlines)
+        # log
+        if killedCnt > 0:
+            log.log(cons.TK_LOG_LEVEL_INFO, "sent kill signal to %i processes which outlived their grace period" % (killedCnt))
+        # next deadline (timer is set up only if there is no timer for an earlier deadline)
+        if self._deadlines and (self._timerDeadline is None or self._timerDeadline > self._deadlines[0][0] or self._timerDeadline <= tm):
+            # save
+            self._timerDeadline = self._deadlines[0][0]
+            # timer
+            GLib.timeout_add(max(int((self._timerDeadline - tm) * 1000), 1), self._processDeadlinesTimer)
+        # nothing to wait for
+        elif not self._deadlines:
+            # no timer is needed
+            self._timerDeadline = None
+
+    def _processDeadlinesTimer(self):
+        """Process deadlines from timer"""
+        # process
+        with self._lock:
+            # timer fired
+            self._timerDeadline = None
+            # process
+            self._processDeadlines()
+        # timer is set up again if needed
+        return False
+
+    def terminateProcesses(self, pProcesses):
+        """Send terminate signal to processes (pid, start time) which are not being terminated already, they will be killed if they outlive their grace period"""
+        # def
+        terminatedCnt = 0
+        # work
+        with self._lock:
+            # deadline for all of them
+            deadline = time.monotonic() + cons.TK_PLAYTIME_TERMINATE_GRACE_PERIOD
+            # finished processes can be forgotten (pids may have been reused)
+            self._releaseFinishedPids()
+            # processes
+            for rPid, rStartTime in pProcesses:
+                # already being terminated
+                if rPid in self._pendingPids:
+                    continue
+                # def
+                pidfd = None
+                # open pidfd, so signals reach this process only
+                if self._usePidfd:
+                    try:
+                        # open
+                        pidfd = os.pidfd_open(rPid)
+                    except ProcessLookupError:
+                        # process is gone
+                        continue
+                    except OSError as exc:
+                        # pidfd is not supported by kernel
+                        if exc.errno == errno.ENOSYS:
+                            self._usePidfd = False
+                        # log
+                        log.log(cons.TK_LOG_LEVEL_DEBUG, "WARNING: pidfd for process %i is not available (%s), using pid" % (rPid, exc))
+                # pid may have been reused since processes were inspected (pidfd refers to the process which has pid now, so it's checked after it's opened)
+                if not self._isSameProcess(rPid, rStartTime):
+                    # log
+                    log.log(cons.TK_LOG_LEVEL_DEBUG, "process %i is not the one to terminate anymore, skipping" % (rPid))
+                # terminate
+                elif self._sendSignal(rPid, pidfd, signal.SIGTERM):
+                    # track the process
+                    self._pendingPids[rPid] = (pidfd, deadline, rStartTime)
+                    heapq.heappush(self._deadlines, (deadline, rPid))
+                    # stats
+                    terminatedCnt += 1
+                    # next
+                    continue
+                # process is gone or pid was reused
+                if pidfd is not None:
+                    # close
+                    os.close(pidfd)
+            # log
+            if terminatedCnt > 0:
+                log.log(cons.TK_LOG_LEVEL_INFO, "sent terminate signal to %i processes, being terminated: %i" % (terminatedCnt, len(self._pendingPids)))
+            # check deadlines
+            self._processDeadlines()
+
+    def getPendingProcessCnt(self):
+        """Get count of processes being terminated"""
+        # result
+        return len(self._pendingPids)
@@ -0,0 +1,182 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# import section
+from array import array
+from bisect import bisect_right
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+
+
+class timekprIntervalIndex(object):
+    """Contains allowed intervals (in seconds from the start of the day) with cumulative available time for every day of the week"""
+
+    # fixed set of attributes, no per instance dict
+    __slots__ = ("_starts", "_ends", "_sums")
+
+    def __init__(self):
+        """Initialize index"""
+        # interval starts per day
+        self._starts = {}
+        # interval ends per day
+        self._ends = {}
+        # available seconds before every interval (last one is total for the day)
+        self._sums = {}
+
+    def setDayIntervals(self, pDay, pAllowedHours):
+        """Set up intervals for the day from allowed hours (adjacent hours are merged into one interval)"""
+        # intervals
+        starts = []
+        ends = []
+        sums = []
+        # available seconds so far
+        total = 0
+        # loop through all hours
+        for rHour in range(0, 23+1):
+            # hour config
+            hourLimits = pAllowedHours.get(str(rHour))
+            # only allowed hours count
+            if hourLimits is None:
+                continue
+            # interval of the hour
+            start = rHour * 3600 + hourLimits[cons.TK_CTRL_SMIN] * 60
+            end = rHour * 3600 + hourLimits[cons.TK_CTRL_EMIN] * 60
+            # nothing is available
+            if start >= end:
+                continue
+            # continues previous interval
+            if ends and ends[-1] == start:
+                # extend
+                ends[-1] = end
+            else:
+                # new interval
+                starts.append(start)
+                ends.append(end)
+                sums.append(total)
+            # account available seconds
+            total += end - start
+        # total for the day
+        sums.append(total)
+
+        # save
+        self._starts[pDay] = starts
+        self._ends[pDay] = ends
+        self._sums[pDay] = sums
+
+    def getTotalSeconds(self, pDay):
+        """Get total seconds available for the day"""
+        # last sum is the total
+        return self._sums[pDay][-1] if pDay in self._sums else 0
+
+    def getAvailableSeconds(self, pDay, pSecs):
+        """Get seconds available from specified second of the day till the end of the day"""
+        # no intervals
+        if pDay not in self._ends:
+            return 0
+        # first interval which has not ended yet
+        idx = bisect_right(self._ends[pDay], pSecs)
+        # this is the rest of the intervals (minus the part of interval in progress which has passed)
+        return 0 if idx >= len(self._ends[pDay]) else self._sums[pDay][-1] - self._sums[pDay][idx] - max(pSecs - self._starts[pDay][idx], 0)
+
+    def getContinuousSeconds(self, pDay, pSecs):
+        """Get seconds available continuously from specified second of the day"""
+        # no intervals
+        if pDay not in self._starts:
+            return 0
+        # last interval which has started
+        idx = bisect_right(self._starts[pDay], pSecs) - 1
+        # time is continuous only if interval is in progress
+        return self._ends[pDay][idx] - pSecs if idx >= 0 and pSecs < self._ends[pDay][idx] else 0
+
+    def getNextIntervalStart(self, pDay, pSecs):
+        """Get start (in seconds from the start of the day) of the first interval which starts after specified second of the day"""
+        # no intervals
+        if pDay not in self._starts:
+            return None
+        # first interval which starts later
+        idx = bisect_right(self._starts[pDay], pSecs)
+        # result
+        return self._starts[pDay][idx] if idx < len(self._starts[pDay]) else None
+
+
+class timekprUserSchedule(object):
+    """Contains weekly (7 days x 24 hours) schedule of allowed hours and time spent for user"""
+
+    # fixed set of attributes, no per instance dict
+    __slots__ = ("act", "smin", "emin", "uacc", "spent", "sleep", "intervals")
+
+    def __init__(self):
+        """Initialize schedule tables"""
+        # size of the tables
+        size = 7 * 24
+        # whether hour is enabled
+        self.act = array("b", [0]) * size
+        # start minute of the hour
+        self.smin = array("b", [0]) * size
+        # end minute of the hour
+        self.emin = array("b", [60]) * size
+        # whether hour is unaccounted
+        self.uacc = array("b", [0]) * size
+        # time spent in hour
+        self.spent = array("l", [0]) * size
+        # time slept (inactive) in hour
+        self.sleep = array("l", [0]) * size
+        # index of allowed intervals
+        self.intervals = timekprIntervalIndex()
+
+    @staticmethod
+    def getDayIdx(pDay):
+        """Get index of the first hour for the day (day is "1" to "7")"""
+        # index of hour 0
+        return (int(pDay) - 1) * 24
+
+    @staticmethod
+    def getHourIdx(pDay, pHour):
+        """Get index of the hour for the day (day is "1" to "7", hour is 0 to 23)"""
+        # index of hour
+        return (int(pDay) - 1) * 24 + pHour
+
+    def setDayHours(self, pDay, pAllowedHours):
+        """Set up allowed hours for the day from configuration (empty hours means day is disabled)"""
+        # first hour of the day
+        dayIdx = self.getDayIdx(pDay)
+        # loop through all hours
+        for rHour in range(0, 23+1):
+            # hour index
+            hourIdx = dayIdx + rHour
+            # hour config
+            hourLimits = pAllowedHours.get(str(rHour))
+            # if hour is allowed
+            if hourLimits is not None:
+                # set up minutes
+                self.act[hourIdx] = 1
+                self.smin[hourIdx] = hourLimits[cons.TK_CTRL_SMIN]
+                self.emin[hourIdx] = hourLimits[cons.TK_CTRL_EMIN]
+                self.uacc[hourIdx] = 1 if hourLimits[cons.TK_CTRL_UACC] else 0
+            # disallowed
+            else:
+                self.act[hourIdx] = 0
+        # rebuild interval index for the day
+        self.intervals.setDayIntervals(pDay, pAllowedHours)
+
+    def resetDaySpent(self, pDay):
+        """Reset time spent and slept for all hours of the day"""
+        # first hour of the day
+        dayIdx = self.getDayIdx(pDay)
+        # clean up hours for this day
+        for rHourIdx in range(dayIdx, dayIdx + 24):
+            # reset spent for hour
+            self.spent[rHourIdx] = 0
+            # reset sleeping
+            self.sleep[rHourIdx] = 0
+
+    def getDaySchedule(self, pDay):
+        """Get printable schedule of the day (for debugging)"""
+        # first hour of the day
+        dayIdx = self.getDayIdx(pDay)
+        # hours which are enabled with their minutes, unaccounted flag and spent / sleep values
+        return ["%i: %i-%i%s (%i/%i)" % (rHourIdx - dayIdx, self.smin[rHourIdx], self.emin[rHourIdx], " !" if self.uacc[rHourIdx] else "", self.spent[rHourIdx], self.sleep[rHourIdx]) for rHourIdx in range(dayIdx, dayIdx + 24) if self.act[rHourIdx]]
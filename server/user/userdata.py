@@ -6,6 +6,7 @@ Created on Aug 28, 2018
 
 # import section
 from datetime import datetime, timedelta, timezone
+import time
 import random
 import string
 import math
@@ -14,6 +15,7 @@ import math
 from timekpr.common.log import log
 from timekpr.common.constants import constants as cons
 from timekpr.server.interface.dbus.logind.user import timekprUserManager
+from timekpr.server.user.schedule import timekprUserSchedule
 from timekpr.common.utils.notifications import timekprNotificationManager
 from timekpr.common.utils.config import timekprUserConfig
 from timekpr.common.utils.config import timekprUserControl
@@ -22,13 +24,17 @@ from timekpr.common.utils.config import timekprUserControl
 class timekprUser(object):
     """Contains all the data for timekpr user"""
 
-    def __init__(self, pBusName, pUserId, pUserName, pUserPath, pTimekprConfig, pPlayTimeConfig):
+    def __init__(self, pBusName, pUserId, pUserName, pUserPath, pTimekprConfig, pPlayTimeConfig, pSpanRecorder, pWorkerWakeUpFn=None):
         """Initialize all stuff for user"""
 
         log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprUser")
 
         # init limit structure
         self._timekprUserData = self._initUserLimits()
+        # init weekly schedule (allowed hours, time spent per hour)
+        self._timekprUserSchedule = timekprUserSchedule()
+        # schedule values for the rest of the day, used for incremental time left calculation
+        self._timeLeftCache = None
 
         # set user data
         self._timekprUserData[cons.TK_CTRL_UID] = pUserId
@@ -38,13 +44,17 @@ class timekprUser(object):
         self._timekprConfig = pTimekprConfig
         # PlayTime option
         self._timekprPlayTimeConfig = pPlayTimeConfig
+        # timing of work phases
+        self._timekprSpanRecorder = pSpanRecorder
+        # ask worker to check users (when something changes)
+        self._workerWakeUpFn = pWorkerWakeUpFn
 
         # set up user properties
         self._timekprUserData[cons.TK_CTRL_SCR_N] = False  # is screensaver running
         self._timekprUserData[cons.TK_CTRL_SCR_K] = None  # verification key
 
         # save the bus
-        self._timekprUserManager = timekprUserManager(self._timekprUserData[cons.TK_CTRL_UNAME], self._timekprUserData[cons.TK_CTRL_UPATH])
+        self._timekprUserManager = timekprUserManager(self._timekprUserData[cons.TK_CTRL_UNAME], self._timekprUserData[cons.TK_CTRL_UPATH], self._timekprConfig.getTimekprSessionEventsEnabled(), pWorkerWakeUpFn)
         # user config
         self._timekprUserConfig = timekprUserConfig(self._timekprConfig.getTimekprConfigDir(), self._timekprUserData[cons.TK_CTRL_UNAME])
         # user control
@@ -58,6 +68,9 @@ class timekprUser(object):
         """Calcualte variables before each method which uses them (idea is not to repeat the calculations)"""
         # establish current time
         self._effectiveDatetime = datetime.now().replace(microsecond=0)
+        # establish current time by monotonic clocks (not affected by system time changes), boot time includes time computer was asleep
+        self._effectiveMonotonic = time.monotonic()
+        self._effectiveBoottime = time.clock_gettime(time.CLOCK_BOOTTIME)
         # get DOW
         self._currentDOW = str(datetime.date(self._effectiveDatetime).isoweekday())
         # get HOD
@@ -100,6 +113,9 @@ class timekprUser(object):
             cons.TK_CTRL_SLEEP  : 0,  # time spent while user was logged in and sleeping
             # checking values
             cons.TK_CTRL_LCHECK : self._effectiveDatetime,  # this is last checked time
+            cons.TK_CTRL_LCHECKM: self._effectiveMonotonic,  # this is last checked time (monotonic clock)
+            cons.TK_CTRL_LCHECKB: self._effectiveBoottime,  # this is last checked time (boot time clock)
+            cons.TK_CTRL_SPENTR : 0,  # this is fractions of a second not yet accounted
             cons.TK_CTRL_LSAVE  : self._effectiveDatetime,  # this is last save time (physical save will be less often as check)
             cons.TK_CTRL_LMOD   : self._effectiveDatetime,  # this is last control save time
             cons.TK_CTRL_LCMOD  : self._effectiveDatetime,  # this is last config save time
@@ -113,15 +129,11 @@ class timekprUser(object):
             cons.TK_CTRL_SCR_R  : 0  # retry count for verification
         }
 
-        # fill up every day and hour
+        # fill up every day (hours are kept in schedule)
         # loop through days
         for i in range(1, 7+1):
             # fill up day
-            limits[str(i)] = {cons.TK_CTRL_NDAY: str(i + 1 if i < 7 else 1), cons.TK_CTRL_PDAY: str(i - 1 if i > 1 else 7), cons.TK_CTRL_LIMITD: None, cons.TK_CTRL_SPENTBD: None, cons.TK_CTRL_LEFTD: None, "0": {cons.TK_CTRL_ACT: True, cons.TK_CTRL_SPENTH: 0, cons.TK_CTRL_SLEEP: 0, cons.TK_CTRL_SMIN: 0, cons.TK_CTRL_EMIN: 60}}
-            # loop through hours
-            for j in range(0, 23+1):
-                # initial limit is whole hour
-                limits[str(i)][str(j)] = {cons.TK_CTRL_ACT: False, cons.TK_CTRL_SPENTH: 0, cons.TK_CTRL_SLEEP: 0, cons.TK_CTRL_SMIN: 0, cons.TK_CTRL_EMIN: 60, cons.TK_CTRL_UACC: False}
+            limits[str(i)] = {cons.TK_CTRL_NDAY: str(i + 1 if i < 7 else 1), cons.TK_CTRL_PDAY: str(i - 1 if i > 1 else 7), cons.TK_CTRL_LIMITD: None, cons.TK_CTRL_SPENTBD: None, cons.TK_CTRL_LEFTD: None}
 
         # ## this section adds additional features ##
         # PlayTime
@@ -141,11 +153,67 @@ class timekprUser(object):
         log.log(cons.TK_LOG_LEVEL_INFO, "de-initialization of \"%s\" DBUS connections" % (self.getUserName()))
         # deinit
         self._timekprUserNotification.deInitUser()
+        self._timekprUserManager.deInitUser()
+        # user processes are not of interest anymore
+        self._timekprPlayTimeConfig.processPlayTimeFilters(self._timekprUserData[cons.TK_CTRL_UID], [])
+
+    def _cacheTimeLeftSchedule(self):
+        """Cache schedule values for the rest of the day after current hour (they change only when hour changes or config is reloaded)"""
+        # interval index
+        intervals = self._timekprUserSchedule.intervals
+        # start of the next hour
+        nextHourSecs = (self._currentHOD + 1) * 3600
+        # available seconds / continous seconds after current hour
+        secondsRest = intervals.getAvailableSeconds(self._currentDOW, nextHourSecs)
+        secondsRestCont = intervals.getContinuousSeconds(self._currentDOW, nextHourSecs)
+        # whether continous time reaches the end of the day
+        contToMidnight = nextHourSecs + secondsRestCont >= cons.TK_LIMIT_PER_DAY
+
+        # save values along with the hour they were calculated for
+        self._timeLeftCache = (self._currentDOW, self._currentHOD, secondsRest, secondsRestCont, contToMidnight)
+
+    def _recalculateTimeLeftIncremental(self):
+        """Recalculate time left from cached schedule values, returns False if full recalculation is needed"""
+        # cached values are valid only for the same hour they were calculated for
+        if self._timeLeftCache is None or self._timeLeftCache[0] != self._currentDOW or self._timeLeftCache[1] != self._currentHOD:
+            return False
+
+        # cached values
+        secondsRest, secondsRestCont, contToMidnight = self._timeLeftCache[2:]
+        # schedule
+        schedule = self._timekprUserSchedule
+        # current hour in schedule
+        hourIdx = schedule.getHourIdx(self._currentDOW, self._currentHOD)
+        # left is least of the limits
+        secondsLeft = max(min(self._timekprUserData[self._currentDOW][cons.TK_CTRL_LIMITD] - self._timekprUserData[self._currentDOW][cons.TK_CTRL_SPENTBD], self._timekprUserData[cons.TK_CTRL_LEFTW], self._timekprUserData[cons.TK_CTRL_LEFTM]), 0)
+        # calculate how many seconds are left in this hour as per configuration
+        secondsLeftHourLimit = max(min(self._secondsLeftHour, schedule.emin[hourIdx] * 60 - self._secondsInHour), 0) if (schedule.act[hourIdx] and schedule.smin[hourIdx] * 60 <= self._secondsInHour) else 0
+        # continous time goes on to next hours only if the rest of this hour is available
+        contHour = secondsLeftHourLimit >= self._secondsLeftHour
+        # continous time available as per configuration
+        secondsLeftCont = secondsLeftHourLimit + (secondsRestCont if contHour else 0)
+
+        # continous time goes on to the next day, that needs full calculation
+        if contHour and contToMidnight and secondsLeft >= secondsLeftCont:
+            return False
+
+        # left for this day
+        self._timekprUserData[self._currentDOW][cons.TK_CTRL_LEFTD] = min(secondsLeft, secondsLeftHourLimit + secondsRest)
+        # left continously
+        self._timekprUserData[cons.TK_CTRL_LEFT] = min(secondsLeft, secondsLeftCont)
+        # next day is not reached (full calculation resets it when there is time left this day)
+        if secondsLeft > 0:
+            self._timekprUserData[self._timekprUserData[self._currentDOW][cons.TK_CTRL_NDAY]][cons.TK_CTRL_LEFTD] = 0
+
+        # debug
+        if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
+            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "incremental, leftInRow: %i, leftDay: %i, lefDay+1: %i" % (self._timekprUserData[cons.TK_CTRL_LEFT], self._timekprUserData[self._currentDOW][cons.TK_CTRL_LEFTD], self._timekprUserData[self._timekprUserData[self._currentDOW][cons.TK_CTRL_NDAY]][cons.TK_CTRL_LEFTD]))
+
+        # done
+        return True
 
     def recalculateTimeLeft(self):
         """Recalculate time left based on spent and configuration"""
-        # reset "lefts"
-        self._timekprUserData[cons.TK_CTRL_LEFT] = 0
         # calculate time left for week
         self._timekprUserData[cons.TK_CTRL_LEFTW] = self._timekprUserData[cons.TK_CTRL_LIMITW] - self._timekprUserData[cons.TK_CTRL_SPENTW]
         # calculate time left for month
@@ -153,8 +221,16 @@ class timekprUser(object):
         # account PlayTime for this day
         self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_LEFTD] = self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_LIMITD] - self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTBD]
 
+        # within the same hour only current hour changes, the rest of the day is taken from cache
+        if self._recalculateTimeLeftIncremental():
+            return
+
+        # reset "lefts"
+        self._timekprUserData[cons.TK_CTRL_LEFT] = 0
         # continous time
         contTime = True
+        # schedule
+        schedule = self._timekprUserSchedule
         # calculate "lefts"
         timesLeft = {cons.TK_CTRL_LEFTD: 0, cons.TK_CTRL_LEFTW: self._timekprUserData[cons.TK_CTRL_LEFTW], cons.TK_CTRL_LEFTM: self._timekprUserData[cons.TK_CTRL_LEFTM]}
 
@@ -175,26 +251,30 @@ class timekprUser(object):
 
             # determine current HOD
             currentHOD = self._currentHOD if self._currentDOW == i else 0
+            # first hour of the day in schedule
+            dayIdx = schedule.getDayIdx(i)
 
             # go through hours for this day
             for j in range(currentHOD, 23+1):
+                # hour in schedule
+                hourIdx = dayIdx + j
                 # reset seconds to add
                 secondsToAddHour = secondsLeftHour = 0
                 # calculate only if hour is enabled
-                if self._timekprUserData[i][str(j)][cons.TK_CTRL_ACT]:
+                if schedule.act[hourIdx]:
                     # certain values need to be calculated as per this hour
                     if self._currentDOW == i and self._currentHOD == j:
                         # this is how many seconds are actually left in hour (as per generic time calculations)
                         secondsLeftHour = self._secondsLeftHour
                         # calculate how many seconds are left in this hour as per configuration
-                        secondsLeftHourLimit = (self._timekprUserData[i][str(j)][cons.TK_CTRL_EMIN] * 60 - self._currentMOH * 60 - self._effectiveDatetime.second) if (self._timekprUserData[i][str(j)][cons.TK_CTRL_SMIN] * 60 <= self._currentMOH * 60 + self._effectiveDatetime.second) else 0
+                        secondsLeftHourLimit = (schedule.emin[hourIdx] * 60 - self._currentMOH * 60 - self._effectiveDatetime.second) if (schedule.smin[hourIdx] * 60 <= self._currentMOH * 60 + self._effectiveDatetime.second) else 0
                     else:
                         # full hour available
                         secondsLeftHour = 3600
                         # calculate how many seconds are left in this hour as per configuration
-                        secondsLeftHourLimit = (self._timekprUserData[i][str(j)][cons.TK_CTRL_EMIN] - self._timekprUserData[i][str(j)][cons.TK_CTRL_SMIN]) * 60
+                        secondsLeftHourLimit = (schedule.emin[hourIdx] - schedule.smin[hourIdx]) * 60
                         # continous time check for start of the hour (needed to see whether any of next hours are continous before adding to available time)
-                        contTime = (contTime and self._timekprUserData[i][str(j)][cons.TK_CTRL_SMIN] == 0)
+                        contTime = (contTime and schedule.smin[hourIdx] == 0)
                     # save seconds to subtract for this hour
                     secondsToAddHour = max(min(secondsLeftHour, secondsLeftHourLimit, secondsLeft), 0)
 
@@ -208,7 +288,7 @@ class timekprUser(object):
 
                 # debug
                 if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
-                    log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "day: %s, hour: %i, enabled: %s, addToHour: %i, contTime: %i, leftD: %i, leftWk: %i, leftMon: %i" % (i, j, self._timekprUserData[i][str(j)][cons.TK_CTRL_ACT], secondsToAddHour, contTime, timesLeft[cons.TK_CTRL_LEFTD], self._timekprUserData[cons.TK_CTRL_LEFTW], self._timekprUserData[cons.TK_CTRL_LEFTM]))
+                    log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "day: %s, hour: %i, enabled: %s, addToHour: %i, contTime: %i, leftD: %i, leftWk: %i, leftMon: %i" % (i, j, bool(schedule.act[hourIdx]), secondsToAddHour, contTime, timesLeft[cons.TK_CTRL_LEFTD], self._timekprUserData[cons.TK_CTRL_LEFTW], self._timekprUserData[cons.TK_CTRL_LEFTM]))
 
                 # adjust left continously
                 self._timekprUserData[cons.TK_CTRL_LEFT] += secondsToAddHour if contTime else 0
@@ -232,6 +312,10 @@ class timekprUser(object):
                     # time is over
                     break
 
+        # cache schedule values for this hour (next calculations in this hour will be incremental)
+        if self._timeLeftCache is None or self._timeLeftCache[0] != self._currentDOW or self._timeLeftCache[1] != self._currentHOD:
+            self._cacheTimeLeftSchedule()
+
         # debug
         if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
             log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "leftInRow: %i, leftDay: %i, lefDay+1: %i" % (self._timekprUserData[cons.TK_CTRL_LEFT], self._timekprUserData[self._currentDOW][cons.TK_CTRL_LEFTD], self._timekprUserData[self._timekprUserData[self._currentDOW][cons.TK_CTRL_NDAY]][cons.TK_CTRL_LEFTD]))
@@ -242,6 +326,8 @@ class timekprUser(object):
 
         # load config
         self._timekprUserConfig.loadUserConfiguration()
+        # schedule may change, time left needs full calculation
+        self._timeLeftCache = None
         # log config
         self._timekprUserConfig.logUserConfiguration()
 
@@ -285,26 +371,8 @@ class timekprUser(object):
             # check if it is enabled as per config
             dayAllowed = rDay in allowedDays
 
-            # loop through all days
-            for rHour in range(0, 23+1):
-                # if day is disabled, it does not matter whether hour is (order of this if is important)
-                if not dayAllowed:
-                    # disallowed
-                    hourAllowed = False
-                # if hour is allowed
-                elif str(rHour) in allowedHours:
-                    # disallowed
-                    hourAllowed = True
-                    # set up minutes
-                    self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_SMIN] = allowedHours[str(rHour)][cons.TK_CTRL_SMIN]
-                    self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_EMIN] = allowedHours[str(rHour)][cons.TK_CTRL_EMIN]
-                    self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_UACC] = allowedHours[str(rHour)][cons.TK_CTRL_UACC]
-                # disallowed
-                else:
-                    hourAllowed = False
-
-                # set up in structure
-                self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_ACT] = hourAllowed
+            # set up hours in schedule (if day is disabled, it does not matter whether hour is)
+            self._timekprUserSchedule.setDayHours(rDay, allowedHours if dayAllowed else {})
 
             # days index
             idx = allowedDaysPT.index(rDay) if rDay in allowedDaysPT else -1
@@ -313,10 +381,8 @@ class timekprUser(object):
             # set up PlayTime limits
             self._timekprUserData[cons.TK_CTRL_PTCNT][rDay][cons.TK_CTRL_LIMITD] = limitsPerWeekdayPT[idx] if idx >= 0 else 0
 
-        # process filters only when PT enabled
-        if self._timekprUserConfig.getUserPlayTimeEnabled():
-            # set up process filters
-            self._timekprPlayTimeConfig.processPlayTimeFilters(self._timekprUserData[cons.TK_CTRL_UID], self._timekprUserConfig.getUserPlayTimeActivities())
+        # process filters only when PT enabled (otherwise there is nothing to look for)
+        self._timekprPlayTimeConfig.processPlayTimeFilters(self._timekprUserData[cons.TK_CTRL_UID], self._timekprUserConfig.getUserPlayTimeActivities() if self._timekprUserConfig.getUserPlayTimeEnabled() else [])
 
         # set up last config mod time
         self._timekprUserData[cons.TK_CTRL_LCMOD] = self._timekprUserConfig.getUserConfigLastModified()
@@ -324,6 +390,7 @@ class timekprUser(object):
         # debug
         if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
             log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "adjustLimitsFromConfig structure: %s" % (str(self._timekprUserData)))
+            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "adjustLimitsFromConfig schedule: %s" % (str({rDay: self._timekprUserSchedule.getDaySchedule(rDay) for rDay in cons.TK_ALLOWED_WEEKDAYS.split(";")})))
 
         # get time limits and send them out if needed
         self.getTimeLimits()
@@ -332,6 +399,9 @@ class timekprUser(object):
         if not pSilent:
             # inform
             self._timekprUserNotification.timeConfigurationChangedNotification(cons.TK_PRIO_IMPORTANT_INFO)
+            # limits changed, check user as soon as possible
+            if self._workerWakeUpFn is not None:
+                self._workerWakeUpFn()
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish adjustLimitsFromConfig")
 
@@ -376,6 +446,8 @@ class timekprUser(object):
 
         # read from config
         self._timekprUserControl.loadUserControl()
+        # time spent may change, time left needs full calculation
+        self._timeLeftCache = None
         # log
         self._timekprUserControl.logUserControl()
 
@@ -394,7 +466,7 @@ class timekprUser(object):
             dayChanged, weekChanged, monthChanged = self._timekprUserControl.getUserDateComponentChanges(self._effectiveDatetime)
 
         # spent this hour
-        spentHour = self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_SPENTH]
+        spentHour = self._timekprUserSchedule.spent[self._timekprUserSchedule.getHourIdx(self._currentDOW, self._currentHOD)]
 
         # if day has changed adjust balance
         self._timekprUserData[self._currentDOW][cons.TK_CTRL_SPENTBD] = spentHour if dayChanged else self._timekprUserControl.getUserTimeSpentBalance() + timeSpentBeforeReload
@@ -415,6 +487,9 @@ class timekprUser(object):
         if not pSilent:
             # inform
             self._timekprUserNotification.timeLeftChangedNotification(cons.TK_PRIO_IMPORTANT_INFO)
+            # time changed, check user as soon as possible
+            if self._workerWakeUpFn is not None:
+                self._workerWakeUpFn()
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish adjustTimeSpentFromControl")
 
@@ -439,16 +514,18 @@ class timekprUser(object):
 
         def _adjustTimeSpentValues(pDay, pHOD, pSecs, pActive):
             """Adjust time spent values"""
+            # hour in schedule
+            hourIdx = self._timekprUserSchedule.getHourIdx(pDay, pHOD)
             # if hour is not accounted, we do not account main time
-            if not pActive or self._timekprUserData[pDay][pHOD][cons.TK_CTRL_UACC]:
+            if not pActive or self._timekprUserSchedule.uacc[hourIdx]:
                 # track sleep time
-                self._timekprUserData[pDay][pHOD][cons.TK_CTRL_SLEEP] += pSecs
+                self._timekprUserSchedule.sleep[hourIdx] += pSecs
 
                 # adjust totals for reporting
                 self._timekprUserData[cons.TK_CTRL_SLEEP] += pSecs
             else:
                 # adjust time spent hour
-                self._timekprUserData[pDay][pHOD][cons.TK_CTRL_SPENTH] += pSecs
+                self._timekprUserSchedule.spent[hourIdx] += pSecs
                 # adjust time spent day balance
                 self._timekprUserData[pDay][cons.TK_CTRL_SPENTBD] += pSecs
                 # adjust time spent day
@@ -463,15 +540,23 @@ class timekprUser(object):
 
         # check if dates have changed
         dayChanged, weekChanged, monthChanged = self._timekprUserControl.getUserDateComponentChanges(self._effectiveDatetime, self._timekprUserData[cons.TK_CTRL_LCHECK])
-        # currentHOD in str
-        currentHODStr = str(self._currentHOD)
-        # get time spent
-        timeSpent = max(int((self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LCHECK]).total_seconds()), 0)
+        # time passed by monotonic clock (it is not affected by system time changes and does not count time computer was asleep)
+        timePassed = self._effectiveMonotonic - self._timekprUserData[cons.TK_CTRL_LCHECKM]
+        # get time spent (whole seconds are accounted, fractions are carried over to next check, so nothing is lost or counted twice)
+        timeSpent = max(int(timePassed + self._timekprUserData[cons.TK_CTRL_SPENTR]), 0)
+        self._timekprUserData[cons.TK_CTRL_SPENTR] = max(timePassed + self._timekprUserData[cons.TK_CTRL_SPENTR] - timeSpent, 0)
+        # time computer was asleep (boot time clock counts that, monotonic does not)
+        timeAsleep = int((self._effectiveBoottime - self._timekprUserData[cons.TK_CTRL_LCHECKB]) - timePassed)
+        # system time change (wall clock compared to real time passed)
+        timeChanged = int((self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LCHECK]).total_seconds() - (self._effectiveBoottime - self._timekprUserData[cons.TK_CTRL_LCHECKB]))
         # adjust last time checked
         self._timekprUserData[cons.TK_CTRL_LCHECK] = self._effectiveDatetime
+        self._timekprUserData[cons.TK_CTRL_LCHECKM] = self._effectiveMonotonic
+        self._timekprUserData[cons.TK_CTRL_LCHECKB] = self._effectiveBoottime
 
         # determine if active
-        userActiveActual, userScreenLocked = self._timekprUserManager.isUserActive(pTimekprConfig, self._timekprUserConfig, self._timekprUserData[cons.TK_CTRL_SCR_N])
+        with self._timekprSpanRecorder.span("logind", self.getUserName()):
+            userActiveActual, userScreenLocked = self._timekprUserManager.isUserActive(pTimekprConfig, self._timekprUserConfig, self._timekprUserData[cons.TK_CTRL_SCR_N])
         userActiveEffective = userActiveActual
         # def PlayTime
         userActivePT = False
@@ -489,34 +574,30 @@ class timekprUser(object):
                     # override
                     userActiveEffective = userActivePT
 
-        # if time spent is very much higher than the default polling time, computer might went to sleep?
-        if timeSpent >= cons.TK_POLLTIME * 15:
-            # sleeping time is added to inactive time (there is a question whether that's OK, disabled currently)
-            log.log(cons.TK_LOG_LEVEL_INFO, "INFO: it appears that computer was put to sleep for %i secs" % (timeSpent))
-            # effectively spent is 0 (we ignore +/- 3 seconds here)
-            timeSpent = 0
-        else:
-            # set time spent for previous hour (this may be triggered only when day changes)
-            if timeSpent > self._secondsInHour:
-                # adjust time values (either inactive or actual time)
-                _adjustTimeSpentValues(self._timekprUserData[self._currentDOW][cons.TK_CTRL_PDAY] if dayChanged else self._currentDOW,
-                    "23" if self._currentHOD == 0 else currentHODStr,
-                    timeSpent - self._secondsInHour,
-                    userActiveEffective)
+        # computer was asleep, that time is not accounted (monotonic clock does not count it)
+        if timeAsleep > 0:
+            log.log(cons.TK_LOG_LEVEL_INFO, "INFO: computer was put to sleep for %i secs" % (timeAsleep))
+        # system time was changed (NTP, DST, manually), that does not affect accounting
+        if abs(timeChanged) >= cons.TK_POLLTIME:
+            log.log(cons.TK_LOG_LEVEL_INFO, "INFO: system time was changed by %i secs" % (timeChanged))
 
-            # adjust time spent for this hour
-            timeSpent = min(timeSpent, self._secondsInHour)
+        # set time spent for previous hour (this may be triggered only when day changes)
+        if timeSpent > self._secondsInHour:
+            # adjust time values (either inactive or actual time)
+            _adjustTimeSpentValues(self._timekprUserData[self._currentDOW][cons.TK_CTRL_PDAY] if dayChanged else self._currentDOW,
+                23 if self._currentHOD == 0 else self._currentHOD,
+                timeSpent - self._secondsInHour,
+                userActiveEffective)
+
+        # adjust time spent for this hour
+        timeSpent = min(timeSpent, self._secondsInHour)
 
         # if there is a day change, we need to adjust time for this day and day after
         if dayChanged:
             ### handle day change
             for rDay in (self._currentDOW, self._timekprUserData[self._currentDOW][cons.TK_CTRL_NDAY]):
                 # clean up hours for this day
-                for rHour in range(0, 23+1):
-                    # reset spent for hour
-                    self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_SPENTH] = 0
-                    # reset sleeping
-                    self._timekprUserData[rDay][str(rHour)][cons.TK_CTRL_SLEEP] = 0
+                self._timekprUserSchedule.resetDaySpent(rDay)
                 # reset balance for day
                 self._timekprUserData[rDay][cons.TK_CTRL_SPENTBD] = 0
                 # reset time spent for this day
@@ -537,7 +618,7 @@ class timekprUser(object):
                 self._timekprUserData[cons.TK_CTRL_SPENTM] = 0
 
         # adjust time values (either sleep or inactive or actual time)
-        _adjustTimeSpentValues(self._currentDOW, currentHODStr, timeSpent, userActiveEffective)
+        _adjustTimeSpentValues(self._currentDOW, self._currentHOD, timeSpent, userActiveEffective)
 
         # count PlayTime if enabled
         if userActiveEffective and userActivePT:
@@ -560,7 +641,8 @@ class timekprUser(object):
         # check if we need to save progress
         if abs((self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LSAVE]).total_seconds()) >= pTimekprConfig.getTimekprSaveTime() or dayChanged:
             # save
-            self.saveSpent()
+            with self._timekprSpanRecorder.span("saveSpent", self.getUserName()):
+                self.saveSpent()
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish adjustTimeSpentActual")
 
@@ -577,11 +659,10 @@ class timekprUser(object):
         # time spent this session / time inactive this session / time available from intervals
         timeSpentThisSession = timeInactiveThisSession = timeAvailableIntervals = 0
 
-        # go through hours for this day
-        for j in range(0, 23+1):
-            # for current day (and enabled hours)
-            if self._timekprUserData[self._currentDOW][str(j)][cons.TK_CTRL_ACT]:
-                timeAvailableIntervals += ((self._timekprUserData[self._currentDOW][str(j)][cons.TK_CTRL_EMIN] - self._timekprUserData[self._currentDOW][str(j)][cons.TK_CTRL_SMIN]) * 60)
+        # schedule
+        schedule = self._timekprUserSchedule
+        # available time from intervals for this day
+        timeAvailableIntervals = schedule.intervals.getTotalSeconds(self._currentDOW)
 
         # totals
         timeSpentThisSession = self._timekprUserData[cons.TK_CTRL_SPENT]
@@ -596,8 +677,9 @@ class timekprUser(object):
         # time spent for week
         timeSpentMonth = self._timekprUserData[cons.TK_CTRL_SPENTM]
         # unaccounted hour
-        isCurrentTimeBetweenInterval = self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_SMIN] <= self._currentMOH <= self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_EMIN]
-        timeUnaccountedHour = self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_UACC] if isCurrentTimeBetweenInterval else False
+        hourIdx = schedule.getHourIdx(self._currentDOW, self._currentHOD)
+        isCurrentTimeBetweenInterval = schedule.smin[hourIdx] <= self._currentMOH <= schedule.emin[hourIdx]
+        timeUnaccountedHour = bool(schedule.uacc[hourIdx]) if isCurrentTimeBetweenInterval else False
         # debug (bt = since boot / restart)
         log.log(cons.TK_LOG_LEVEL_INFO, "get time for \"%s\", tltd %i, tlrow: %i, tspbal: %i, tspbt: %i, tidbt: %i" % (self.getUserName(), timeLeftToday, timeLeftInARow, timeSpentBalance, timeSpentThisSession, timeInactiveThisSession))
 
@@ -630,7 +712,8 @@ class timekprUser(object):
             log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "force: %i, timeValues structure: %s" % (pForceNotifications, timeValues))
 
         # process notifications, if needed
-        self._timekprUserNotification.processTimeLeft(pForceNotifications, timeValues)
+        with self._timekprSpanRecorder.span("signals", self.getUserName()):
+            self._timekprUserNotification.processTimeLeft(pForceNotifications, timeValues)
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish getTimeLeft")
 
@@ -689,7 +772,7 @@ class timekprUser(object):
 
         # if debug
         if log.isDebugEnabled(cons.TK_LOG_LEVEL_EXTRA_DEBUG):
-            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "save spent structure: %s" % (str(self._timekprUserData[self._currentDOW])))
+            log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "save spent structure: %s, hours: %s" % (str(self._timekprUserData[self._currentDOW]), str(self._timekprUserSchedule.getDaySchedule(self._currentDOW))))
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish saveSpent")
 
@@ -697,6 +780,8 @@ class timekprUser(object):
         """Calculate time limits for sendout to clients"""
         # main container
         timeLimits = {}
+        # schedule
+        schedule = self._timekprUserSchedule
 
         # check allowed days
         allowedDays = self._timekprUserConfig.getUserAllowedWeekdays()
@@ -711,19 +796,22 @@ class timekprUser(object):
                 startHour  = endHour = uaccValue = None
                 uaccChanged = False
 
+                # first hour of the day in schedule
+                dayIdx = schedule.getDayIdx(rDay)
+
                 # loop through all days
                 for rHour in range(0, 23+1):
-                    # hour in str
-                    hourStr = str(rHour)
+                    # hour in schedule
+                    hourIdx = dayIdx + rHour
                     # fill up start value
-                    if self._timekprUserData[rDay][hourStr][cons.TK_CTRL_ACT]:
+                    if schedule.act[hourIdx]:
                         # no value (interval was changed)
-                        uaccValue = self._timekprUserData[rDay][hourStr][cons.TK_CTRL_UACC] if uaccValue is None else uaccValue
+                        uaccValue = bool(schedule.uacc[hourIdx]) if uaccValue is None else uaccValue
                         # calc uacc changes
-                        uaccChanged = self._timekprUserData[rDay][hourStr][cons.TK_CTRL_UACC] != uaccValue
+                        uaccChanged = bool(schedule.uacc[hourIdx]) != uaccValue
 
                     # this is needed in case next hour starts with particular minutes, in which case continous interval ends
-                    if startHour is not None and (self._timekprUserData[rDay][hourStr][cons.TK_CTRL_SMIN] != 0 or uaccChanged):
+                    if startHour is not None and (schedule.smin[hourIdx] != 0 or uaccChanged):
                         # fill interval with start and end (because hours are continous, we can count on sequential change)
                         timeLimits[rDay][cons.TK_CTRL_INT].append([int(startHour), int(endHour), uaccValue])
                         # restart hour intervals
@@ -731,18 +819,18 @@ class timekprUser(object):
                         uaccChanged = False
 
                     # if hour is enabled for use, we count the interval
-                    if self._timekprUserData[rDay][hourStr][cons.TK_CTRL_ACT]:
+                    if schedule.act[hourIdx]:
                         # uacc value
-                        uaccValue = self._timekprUserData[rDay][hourStr][cons.TK_CTRL_UACC]
+                        uaccValue = bool(schedule.uacc[hourIdx])
                         # set start hour only if it has not beed set up, that is to start the interval
                         if startHour is None:
                             # start
-                            startHour = int(((cons.TK_DATETIME_START + timedelta(hours=rHour, minutes=self._timekprUserData[rDay][hourStr][cons.TK_CTRL_SMIN])) - cons.TK_DATETIME_START).total_seconds())
+                            startHour = int(((cons.TK_DATETIME_START + timedelta(hours=rHour, minutes=schedule.smin[hourIdx])) - cons.TK_DATETIME_START).total_seconds())
                         # end
-                        endHour = int(((cons.TK_DATETIME_START + timedelta(hours=rHour, minutes=self._timekprUserData[rDay][hourStr][cons.TK_CTRL_EMIN])) - cons.TK_DATETIME_START).total_seconds())
+                        endHour = int(((cons.TK_DATETIME_START + timedelta(hours=rHour, minutes=schedule.emin[hourIdx])) - cons.TK_DATETIME_START).total_seconds())
 
                     # interval ends if hour is not allowed or this is the end of the day
-                    if (not self._timekprUserData[rDay][hourStr][cons.TK_CTRL_ACT] and startHour is not None) or self._timekprUserData[rDay][hourStr][cons.TK_CTRL_EMIN] != 60:
+                    if (not schedule.act[hourIdx] and startHour is not None) or schedule.emin[hourIdx] != 60:
                         # fill interval with start and end (because end interval is unfinished (break in continuity))
                         timeLimits[rDay][cons.TK_CTRL_INT].append([int(startHour), int(endHour), uaccValue])
                         # restart hour intervals
@@ -857,26 +945,38 @@ class timekprUser(object):
         hrs = self._timekprUserConfig.getUserWakeupHourInterval()
         hrFrom = int(hrs[0])
         hrTo = int(hrs[1])
-        # loop through all hours for today
-        for rHour in range(self._currentHOD, 23+1):
-            # check if hour is enabled
-            if self._timekprUserData[self._currentDOW][str(rHour)][cons.TK_CTRL_ACT]:
-                # if current hour, we need to check whether it's possible to use it (check +one minute ahead)
-                if rHour == self._currentHOD and self._currentMOH + 1 >= self._timekprUserData[self._currentDOW][str(rHour)][cons.TK_CTRL_SMIN]:
-                    # start can not be used as it is in the past
-                    continue
-                # only if wakeup interval is right
-                elif hrFrom <= rHour <= hrTo:
-                    # check if we have interval
-                    res = int(datetime(self._effectiveDatetime.year, self._effectiveDatetime.month, self._effectiveDatetime.day, rHour, self._timekprUserData[self._currentDOW][str(rHour)][cons.TK_CTRL_SMIN]).strftime("%s"))
-                # this is it
-                break
+        # next interval which starts later than now (check +one minute ahead)
+        intervalStart = self._timekprUserSchedule.intervals.getNextIntervalStart(self._currentDOW, self._currentHOD * 3600 + (self._currentMOH + 1) * 60)
+        # only if wakeup interval is right
+        if intervalStart is not None and hrFrom <= intervalStart // 3600 <= hrTo:
+            # check if we have interval
+            res = int((datetime(self._effectiveDatetime.year, self._effectiveDatetime.month, self._effectiveDatetime.day) + timedelta(seconds=intervalStart)).strftime("%s"))
         # msg if none found
         if res is None:
             log.log(cons.TK_LOG_LEVEL_INFO, "there is no next interval available today for user \"%s\"" % (self.getUserName()))
         # return
         return res
 
+    def getNextCheckDelay(self, pUserActive):
+        """Calculate how many seconds can pass until something changes for user (intervals, limits, notifications or saving)"""
+        # current hour
+        hourIdx = self._timekprUserSchedule.getHourIdx(self._currentDOW, self._currentHOD)
+        # next interval boundary is either start / end minute in this hour or start of the next hour
+        delays = [self._secondsLeftHour] + [rMin * 60 - self._secondsInHour for rMin in (self._timekprUserSchedule.smin[hourIdx], self._timekprUserSchedule.emin[hourIdx]) if rMin * 60 > self._secondsInHour]
+        # saving
+        delays.append(self._timekprConfig.getTimekprSaveTime() - (self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LSAVE]).total_seconds())
+        # time runs out only if user is active
+        if pUserActive:
+            # restrictions kick in when termination time is reached
+            delays.append(self._timekprUserData[cons.TK_CTRL_LEFT] - self._timekprConfig.getTimekprTerminationTime())
+            # notifications
+            delays.append(self._timekprUserNotification.getNextNotificationDelay(self._timekprUserData[cons.TK_CTRL_LEFT]))
+            # PlayTime activities can start any time
+            if self._isPlayTimeEnabledAccountedActive(pSilent=True)[0]:
+                delays.append(0)
+        # result
+        return max(int(min(delays)), 0)
+
     def setPlayTimeActiveActivityCnt(self, pActiveActivityCnt):
         """This sets count of active activities"""
         self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTLSTC] = pActiveActivityCnt